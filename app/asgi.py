@@ -0,0 +1,18 @@
+"""
+멀티 워커(uvicorn --workers N) 실행용 ASGI 진입점.
+
+실행 예:
+    WORKERS=4 SHARED_STORE_URL=redis://localhost:6379/0 python app/main.py
+    uvicorn asgi:app --app-dir app --workers 4 --port 8000
+"""
+from config import settings
+from logger_config import get_logger, setup_logging
+
+# 왜: 워커 프로세스는 main.py의 __main__ 블록을 거치지 않으므로 로깅 설정을 여기서 한다.
+setup_logging(settings.LOG_LEVEL)
+
+from main import create_http_app  # noqa: E402
+
+app = create_http_app()
+
+get_logger("app.asgi").info("워커 ASGI 앱 로드 완료")
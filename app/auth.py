@@ -1,5 +1,16 @@
+import asyncio
+import hmac
+import threading
+
 import msal
+from fastmcp.server.lifespan import lifespan
+
 from config import settings
+from logger_config import get_logger
+from shared_store import get_shared_store
+from token_cache import file_token_cache
+
+logger = get_logger("app.auth")
 
 AZURE_CLIENT_ID = settings.AZURE_CLIENT_ID
 AZURE_CLIENT_SECRET = settings.AZURE_CLIENT_SECRET
@@ -13,8 +24,59 @@ AUTHORITY = f"https://login.microsoftonline.com/{AZURE_TENANT_ID}"
 # SCOPES = ["Mail.Read"]
 SCOPES = ["https://graph.microsoft.com/.default"]
 
+# 워커 간 공유 토큰 캐시 키. client-credentials 토큰은 앱 단위이므로 모든 워커가 같은 토큰을 쓴다.
+TOKEN_CACHE_KEY = "msal:token_cache"
+# client-credentials 토큰 수명(약 60~90분)보다 길게 두어, 캐시 항목 만료는 MSAL이 판단하게 한다.
+TOKEN_CACHE_TTL_SECONDS = 2 * 60 * 60
 
 
+def is_admin_token(value: str | None) -> bool:
+    """
+    운영자용 도구에 넘어온 토큰이 ADMIN_TOKEN과 같은지 확인한다. ADMIN_TOKEN이 비어 있으면 항상 거부한다.
+    """
+    expected = settings.ADMIN_TOKEN
+    if not expected or not value:
+        return False
+    # 왜: 일반 비교는 앞부분이 맞는 길이만큼 빨리/늦게 끝나 토큰을 한 글자씩 추측할 수 있다.
+    return hmac.compare_digest(value.encode("utf-8"), expected.encode("utf-8"))
+
+_token_cache = msal.SerializableTokenCache()
+_cache_lock = threading.Lock()
+_msal_app: msal.ConfidentialClientApplication | None = None
+
+
+def _get_msal_app() -> msal.ConfidentialClientApplication:
+    # 왜: 호출마다 앱을 새로 만들면 인메모리 캐시가 매번 비어서 acquire_token_silent가 항상 실패한다.
+    global _msal_app
+    if _msal_app is None:
+        _msal_app = msal.ConfidentialClientApplication(
+            AZURE_CLIENT_ID,
+            authority=AUTHORITY,
+            client_credential=AZURE_CLIENT_SECRET,
+            token_cache=_token_cache,
+        )
+    return _msal_app
+
+
+def _load_shared_cache() -> None:
+    blob = get_shared_store().get(TOKEN_CACHE_KEY)
+    if blob:
+        _token_cache.deserialize(blob.decode("utf-8"))
+    elif file_token_cache is not None:
+        # 왜: 재시작 직후엔 메모리 공유 저장소가 비어 있으므로, 파일에 남은 토큰으로 발급 왕복을 건너뛴다.
+        text = file_token_cache.load()
+        if text:
+            _token_cache.deserialize(text)
+
+
+def _save_shared_cache() -> None:
+    if _token_cache.has_state_changed:
+        serialized = _token_cache.serialize()
+        get_shared_store().set(TOKEN_CACHE_KEY, serialized.encode("utf-8"), TOKEN_CACHE_TTL_SECONDS)
+        if file_token_cache is not None:
+            file_token_cache.save(serialized)
+        _token_cache.has_state_changed = False
+
 
 def get_access_token():
     """
@@ -40,23 +102,30 @@ def get_access_token():
     # # 여기서 Level 1 때 설정한 리디렉션 URI가 백그라운드에서 사용됩니다.
     # result = app.acquire_token_interactive(scopes=SCOPES)
 
-    #1. MSAL 퍼블릭 클라이어느 앱 초기화
-    app = msal.ConfidentialClientApplication(
-        AZURE_CLIENT_ID,
-        authority=AUTHORITY,
-        client_credential=AZURE_CLIENT_SECRET,
-    )
-
-    # 캐시에서 토큰 확인
-    result = app.acquire_token_silent(SCOPES, account=None)
-
-    if not result:
-        # 캐시에 없으면 서버 대 서버 통신으로 즉시 발급 (브라우저 X)
-        print("🔄 서버 자격 증명으로 새 토큰을 요청합니다...")
-        result = app.acquire_token_for_client(scopes=SCOPES)
+    #1. MSAL 컨피덴셜 클라이언트 앱 (프로세스 단위 1개, 공유 토큰 캐시 연결)
+    app = _get_msal_app()
+
+    with _cache_lock:
+        # 캐시에서 토큰 확인
+        result = app.acquire_token_silent(SCOPES, account=None)
+
+        if not result:
+            # 다른 워커가 이미 발급해 둔 토큰이 있는지 공유 저장소에서 확인한다.
+            _load_shared_cache()
+            result = app.acquire_token_silent(SCOPES, account=None)
+
+        if not result:
+            # 왜: 여러 워커가 동시에 시작하면 모두 토큰을 요청하게 되므로, 공유 락으로 한 워커만 발급한다.
+            with get_shared_store().lock("msal:token_refresh"):
+                _load_shared_cache()
+                result = app.acquire_token_silent(SCOPES, account=None)
+                if not result:
+                    # 캐시에 없으면 서버 대 서버 통신으로 즉시 발급 (브라우저 X)
+                    logger.info("token_request_for_client")
+                    result = app.acquire_token_for_client(scopes=SCOPES)
+                    _save_shared_cache()
     
     if "access_token" in result:
-        print("✅ 토큰 발급 성공!")
         return result["access_token"]
     else:
         error_msg = result.get('error_description', '알 수 없는 오류')
@@ -66,25 +135,23 @@ async def async_get_access_token():
     """
     비동기로 MSAL의 access_token을 가져옵니다.
     """
-    app = msal.ConfidentialClientApplication(
-        AZURE_CLIENT_ID,
-        authority=AUTHORITY,
-        client_credential=AZURE_CLIENT_SECRET,
-    )
-    # 캐시에서 토큰 확인
-    result = app.acquire_token_silent(SCOPES, account=None)
-
-    if not result:
-        # 캐시에 없으면 서버 대 서버 통신으로 즉시 발급 (브라우저 X)
-        print("🔄 서버 자격 증명으로 새 토큰을 요청합니다...")
-        result = app.acquire_token_for_client(scopes=SCOPES)
-    
-    if "access_token" in result:
-        print("✅ 토큰 발급 성공!")
-        return result["access_token"]
-    else:
-        error_msg = result.get('error_description', '알 수 없는 오류')
-        raise Exception(f"로그인 실패: {error_msg}")    
+    # 왜: MSAL 호출은 동기 네트워크 I/O이므로 이벤트 루프를 막지 않도록 스레드에서 실행하고,
+    # get_access_token과 같은 공유 캐시/락 경로를 그대로 탄다.
+    return await asyncio.to_thread(get_access_token)
+
+
+@lifespan
+async def token_prewarm_lifespan(server):
+    """
+    TOKEN_PREWARM_ON_STARTUP이면 트래픽을 받기 전에 토큰을 캐시에 올려 둔다.
+    """
+    if settings.TOKEN_PREWARM_ON_STARTUP:
+        try:
+            await async_get_access_token()
+        except Exception as e:
+            # 이유: 인증 서버 장애로 서버 기동까지 막지 않는다. 첫 도구 호출에서 다시 발급을 시도한다.
+            logger.warning("token_prewarm_failed error=%s", e)
+    yield {}
 
 
 # 단독 실행 테스트용 코드
@@ -0,0 +1,354 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from config import settings
+from graph_client import graph_request
+from logger_config import get_logger
+from memory import estimate_size, memory_budget
+from metrics import metrics
+from scheduling import parse_graph_datetime, resolve_timezone
+
+logger = get_logger("app.calendar")
+
+UTC = timezone.utc
+UTC_ZONE = ZoneInfo("UTC")
+
+# 목록 조회 결과에 포함하는 필드(기존 live 조회의 $select와 동일하게 맞춘다)
+LIST_EVENT_KEYS = ("id", "subject", "start", "end", "organizer", "location")
+
+# 왜: 캐시에 쌓이는 시간을 UTC로 통일해야 live 조회 결과(기본 UTC)와 같은 형태로 돌려줄 수 있다.
+DELTA_PREFER = 'outlook.timezone="UTC", outlook.body-content-type="text", odata.maxpagesize=100'
+
+# 일정 1건의 구간(dict 항목 + datetime 2개) + 인덱스 항목이 차지하는 대략의 메모리(바이트)
+_INTERVAL_ENTRY_BYTES = 300
+
+
+def parse_query_datetime(value: str) -> datetime:
+    """도구 입력 ISO 8601 문자열. 오프셋이 없으면 Graph calendarView와 같이 UTC로 본다."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+def _event_interval(event: dict[str, Any]) -> tuple[datetime, datetime] | None:
+    start, end = event.get("start") or {}, event.get("end") or {}
+    if not start.get("dateTime") or not end.get("dateTime"):
+        return None
+    return (
+        parse_graph_datetime(start["dateTime"], resolve_timezone(start.get("timeZone"), UTC_ZONE)),
+        parse_graph_datetime(end["dateTime"], resolve_timezone(end.get("timeZone"), UTC_ZONE)),
+    )
+
+
+def _is_blocking(event: dict[str, Any]) -> bool:
+    # 취소된 일정과 "약속 없음(free)"으로 표시된 일정은 겹쳐도 충돌로 보지 않는다.
+    return not event.get("isCancelled") and str(event.get("showAs", "busy")).lower() != "free"
+
+
+class IntervalIndex:
+    """
+    시작 시각 순으로 정렬한 배열 위에 만든 정적 증강 구간 트리(augmented interval tree).
+
+    배열 [lo, hi)의 가운데 항목을 노드로 보고, 노드마다 하위 트리의 최대 종료 시각을 둔다.
+    조회 구간 [qs, qe)에 대해 최대 종료 시각 <= qs인 하위 트리와 시작 시각 >= qe인 오른쪽은 건너뛰므로
+    조회는 O(log n + k·log n)이다.
+
+    이유: 전역 최대 일정 길이로 후보를 좁히면 며칠짜리 일정 하나만 있어도 모든 조회가 O(n)이 된다.
+    동기화 때마다 rebuild로 통째로 다시 만들므로 삽입/삭제/회전은 필요 없다.
+    """
+
+    def __init__(self) -> None:
+        self._items: list[tuple[datetime, datetime, str]] = []
+        self._max_end: list[datetime] = []
+
+    def rebuild(self, intervals: dict[str, tuple[datetime, datetime]]) -> None:
+        self._items = sorted((start, end, event_id) for event_id, (start, end) in intervals.items())
+        self._max_end = [end for _, end, _ in self._items]
+        self._build(0, len(self._items))
+
+    def _build(self, lo: int, hi: int) -> datetime | None:
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        for child in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child is not None and child > self._max_end[mid]:
+                self._max_end[mid] = child
+        return self._max_end[mid]
+
+    def overlapping(self, start: datetime, end: datetime) -> list[str]:
+        """[start, end)와 겹치는 일정 id를 시작 시각 순으로 돌려준다."""
+        found: list[str] = []
+        self._collect(0, len(self._items), start, end, found)
+        return found
+
+    def _collect(self, lo: int, hi: int, start: datetime, end: datetime, found: list[str]) -> None:
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self._max_end[mid] <= start:
+            return  # 이 하위 트리의 일정은 모두 조회 시작 전에 끝난다.
+        self._collect(lo, mid, start, end, found)
+        s, e, event_id = self._items[mid]
+        if s >= end:
+            return  # 이 노드와 오른쪽 하위 트리는 모두 조회 끝 이후에 시작한다.
+        if e > start:
+            found.append(event_id)
+        self._collect(mid + 1, hi, start, end, found)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class UserCalendar:
+    """사용자 한 명의 동기화 창(window) 안 일정과 delta 상태."""
+
+    def __init__(self, my_email: str) -> None:
+        self.my_email = my_email
+        self.events: dict[str, dict[str, Any]] = {}
+        self.intervals: dict[str, tuple[datetime, datetime]] = {}
+        self.index = IntervalIndex()
+        self.delta_link: str | None = None
+        self.window: tuple[datetime, datetime] | None = None
+        self.synced_at = 0.0  # monotonic
+        self.full_synced_at = 0.0
+        self.stale = True
+        self.lock = asyncio.Lock()
+        # 동기화 때마다 다시 잰 대략의 메모리 크기(바이트). 메모리 예산 계산용
+        self.size_bytes = 0
+
+    def upsert(self, event: dict[str, Any]) -> None:
+        event_id = event.get("id")
+        interval = _event_interval(event)
+        if not event_id or interval is None:
+            return
+        self.events[event_id] = event
+        self.intervals[event_id] = interval
+
+    def remove(self, event_id: str) -> None:
+        self.events.pop(event_id, None)
+        self.intervals.pop(event_id, None)
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        return self.window is not None and self.window[0] <= start and end <= self.window[1]
+
+
+class CalendarStore:
+    """
+    사용자별 일정 로컬 캐시. calendarView/delta로 동기화 창 안의 일정을 유지한다.
+
+    - 조회 시 마지막 동기화가 staleness 시간 이내면 Graph 호출 없이 로컬 인덱스에서 응답한다.
+    - 그보다 오래됐으면 deltaLink로 변경분만 받아 반영한다.
+    - 동기화 창 밖 구간은 None을 돌려주며, 호출부가 live 조회로 대체한다.
+    """
+
+    def __init__(self, max_users: int, staleness_seconds: float, past_days: int, future_days: int) -> None:
+        self._users: OrderedDict[str, UserCalendar] = OrderedDict()
+        self._max_users = max_users
+        self._staleness_seconds = staleness_seconds
+        self._past_days = past_days
+        self._future_days = future_days
+
+    def _user(self, my_email: str) -> UserCalendar:
+        key = my_email.lower()
+        calendar = self._users.get(key)
+        if calendar is None:
+            calendar = self._users[key] = UserCalendar(key)
+            # 왜: 사용자 수만큼 일정이 메모리에 쌓이므로 가장 오래 안 쓴 사용자부터 내린다.
+            while len(self._users) > self._max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(key)
+        return calendar
+
+    def mark_stale(self, my_email: str) -> None:
+        """다음 조회 때 delta를 다시 받도록 표시한다(쓰기/변경 알림 이후 호출)."""
+        calendar = self._users.get(my_email.lower())
+        if calendar is not None:
+            calendar.stale = True
+
+    def remove_event(self, my_email: str, event_id: str) -> None:
+        """삭제 직후 캐시에서 바로 뺀다(delta 반영 전에도 삭제된 일정이 보이지 않도록)."""
+        calendar = self._users.get(my_email.lower())
+        if calendar is None:
+            return
+        calendar.remove(event_id)
+        calendar.index.rebuild(calendar.intervals)
+        calendar.stale = True
+
+    def clear(self) -> None:
+        self._users.clear()
+
+    def memory_bytes(self) -> int:
+        return sum(calendar.size_bytes for calendar in list(self._users.values()))
+
+    def shrink(self, target_bytes: int) -> int:
+        """가장 오래 안 쓴 사용자부터 캐시를 내린다(다음 조회 때 전체 동기화)."""
+        freed = 0
+        current = self.memory_bytes()
+        while self._users and current - freed > target_bytes:
+            _, calendar = self._users.popitem(last=False)
+            freed += calendar.size_bytes
+        return freed
+
+    def _next_window(self) -> tuple[datetime, datetime]:
+        today = datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - timedelta(days=self._past_days), today + timedelta(days=self._future_days)
+
+    async def _sync(self, calendar: UserCalendar) -> None:
+        now = time.monotonic()
+        # 동기화 창은 최초 동기화 시점 기준으로 고정되므로 하루에 한 번은 창을 다시 잡는다.
+        full = calendar.delta_link is None or now - calendar.full_synced_at > 86400
+        if full:
+            window = self._next_window()
+            url = f"/users/{calendar.my_email}/calendarView/delta"
+            params: dict[str, Any] | None = {
+                "startDateTime": window[0].strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "endDateTime": window[1].strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+        else:
+            url, params = calendar.delta_link, None
+
+        changes: list[dict[str, Any]] = []
+        while True:
+            response = await graph_request("GET", url, params=params, headers={"Prefer": DELTA_PREFER})
+            if response.status_code == 410 and not full:
+                # deltaLink 만료(syncStateNotFound): 처음부터 다시 동기화한다.
+                logger.info("calendar_delta_expired user=%s", calendar.my_email)
+                calendar.delta_link = None
+                await self._sync(calendar)
+                return
+            response.raise_for_status()
+            data = response.json()
+            changes.extend(data.get("value", []))
+            if data.get("@odata.nextLink"):
+                url, params = data["@odata.nextLink"], None
+                continue
+            delta_link = data.get("@odata.deltaLink")
+            break
+
+        if full:
+            calendar.events.clear()
+            calendar.intervals.clear()
+            calendar.window = window
+            calendar.full_synced_at = now
+        for change in changes:
+            if "@removed" in change:
+                calendar.remove(change.get("id", ""))
+            else:
+                calendar.upsert(change)
+        calendar.index.rebuild(calendar.intervals)
+        calendar.delta_link = delta_link
+        calendar.synced_at = now
+        calendar.stale = False
+        calendar.size_bytes = estimate_size(calendar.events) + len(calendar.intervals) * _INTERVAL_ENTRY_BYTES
+        memory_budget.enforce()
+        metrics.counter("calendar_sync_total", {"kind": "full" if full else "delta"}).inc()
+        logger.debug("calendar_synced user=%s full=%s changes=%d events=%d", calendar.my_email, full, len(changes), len(calendar.events))
+
+    async def _fresh(self, my_email: str) -> UserCalendar:
+        calendar = self._user(my_email)
+        if not calendar.stale and time.monotonic() - calendar.synced_at < self._staleness_seconds:
+            return calendar
+        async with calendar.lock:
+            # 락을 기다리는 동안 앞선 요청이 동기화를 끝냈을 수 있다.
+            if calendar.stale or time.monotonic() - calendar.synced_at >= self._staleness_seconds:
+                await self._sync(calendar)
+        return calendar
+
+    def _cached(self, my_email: str) -> UserCalendar | None:
+        """동기화 없이 이미 받아 둔 캐시만 돌려준다(없으면 None)."""
+        calendar = self._users.get(my_email.lower())
+        return calendar if calendar is not None and calendar.window is not None else None
+
+    async def query_range(self, my_email: str, start: datetime, end: datetime, limit: int) -> list[dict[str, Any]] | None:
+        """
+        [start, end)와 겹치는 일정을 시작 시각 순으로 돌려준다. 동기화 창 밖이면 None.
+        """
+        calendar = self._cached(my_email)
+        window = calendar.window if calendar is not None else self._next_window()
+        # 왜: 창 밖 구간 조회 한 번 때문에 전체 동기화를 돌리지 않도록 동기화 전에 먼저 확인한다.
+        if not (window[0] <= start and end <= window[1]):
+            metrics.counter("calendar_cache_total", {"result": "out_of_window"}).inc()
+            return None
+        calendar = await self._fresh(my_email)
+        if not calendar.covers(start, end):
+            metrics.counter("calendar_cache_total", {"result": "out_of_window"}).inc()
+            return None
+        metrics.counter("calendar_cache_total", {"result": "hit"}).inc()
+        ids = calendar.index.overlapping(start, end)[:limit]
+        return [{k: calendar.events[i].get(k) for k in LIST_EVENT_KEYS} for i in ids]
+
+    async def get_event(self, my_email: str, event_id: str) -> dict[str, Any] | None:
+        """
+        캐시에 있는 일정을 돌려준다. 없으면 None(창 밖 일정일 수 있으므로 호출부가 live 조회).
+        단건 조회 때문에 전체 동기화를 시작하지는 않으며, 이미 동기화된 사용자만 캐시에서 응답한다.
+        """
+        if self._cached(my_email) is None:
+            return None
+        calendar = await self._fresh(my_email)
+        event = calendar.events.get(event_id)
+        metrics.counter("calendar_cache_total", {"result": "hit" if event else "miss"}).inc()
+        return event
+
+    async def find_conflicts(
+        self, my_email: str, start: datetime, end: datetime, exclude_id: str | None = None
+    ) -> tuple[list[dict[str, Any]], str]:
+        """
+        [start, end)와 겹치는 "바쁨" 일정을 찾는다.
+
+        캐시가 동기화돼 있고 구간이 창 안이면 로컬 인덱스로, 아니면(콜드 캐시) 해당 구간만 live calendarView로 조회한다.
+        이유: 충돌 확인 한 번 때문에 전체 delta 동기화를 시작하는 것보다 좁은 구간 조회가 훨씬 싸다.
+
+        Returns:
+            (충돌 일정 요약 목록, 조회 출처 "cache" 또는 "live")
+        """
+        calendar = self._cached(my_email)
+        if calendar is not None and calendar.covers(start, end):
+            calendar = await self._fresh(my_email)
+            events = [calendar.events[i] for i in calendar.index.overlapping(start, end)]
+            source = "cache"
+        else:
+            response = await graph_request(
+                "GET",
+                f"/users/{my_email}/calendarView",
+                params={
+                    "startDateTime": start.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "endDateTime": end.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "$top": 20,
+                    "$select": "id,subject,start,end,showAs,isCancelled",
+                },
+                headers={"Prefer": 'outlook.timezone="UTC"'},
+            )
+            response.raise_for_status()
+            # calendarView는 경계에 맞닿은 일정도 돌려줄 수 있으므로 실제로 겹치는 일정만 남긴다.
+            events = [
+                event
+                for event in response.json().get("value", [])
+                if (interval := _event_interval(event)) is not None and interval[0] < end and interval[1] > start
+            ]
+            source = "live"
+
+        metrics.counter("calendar_conflict_check_total", {"source": source}).inc()
+        conflicts = [
+            {
+                "id": event.get("id", ""),
+                "subject": event.get("subject", "(제목 없음)"),
+                "start": (event.get("start") or {}).get("dateTime", ""),
+                "end": (event.get("end") or {}).get("dateTime", ""),
+            }
+            for event in events
+            if event.get("id") != exclude_id and _is_blocking(event)
+        ]
+        return conflicts, source
+
+
+calendar_store = CalendarStore(
+    max_users=settings.CALENDAR_CACHE_MAX_USERS,
+    staleness_seconds=settings.CALENDAR_CACHE_STALENESS_SECONDS,
+    past_days=settings.CALENDAR_SYNC_PAST_DAYS,
+    future_days=settings.CALENDAR_SYNC_FUTURE_DAYS,
+)
+memory_budget.register("calendar", calendar_store)
@@ -12,6 +12,140 @@ class Settings(BaseSettings):
     DEFAULT_USER_EMAIL: str
     LOG_LEVEL: str
 
+    # HTTP 서버 실행 설정
+    HTTP_HOST: str = "127.0.0.1"
+    HTTP_PORT: int = 8000
+    # 1보다 크면 uvicorn 멀티 워커로 실행한다(asgi.py 참고).
+    WORKERS: int = 1
+    # HTTP 전송 모드
+    # - session: streamable-http + SSE 응답 + 세션 관리(기본값)
+    # - stateless: 세션 없이 요청마다 일반 JSON 응답(배치 에이전트 등 단발성 호출용)
+    HTTP_MODE: str = "session"
+
+    # 응답 압축(Accept-Encoding 협상). br/zstd는 brotli/zstandard 패키지가 설치된 경우에만 사용
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_ENCODINGS: str = "zstd,br,gzip"
+    COMPRESSION_LEVEL: int = 6
+
+    # 요청 단위 on-demand 프로파일링(cProfile). 꺼져 있으면 미들웨어 자체를 등록하지 않는다
+    # - TOKEN: 요청 헤더 x-profile-token 값이 이것과 같으면 그 요청을 프로파일링. 비우면 헤더 트리거 사용 안 함
+    # - DIR: <시각>-<request_id>.prof/.txt 저장 위치
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str = ""
+    PROFILE_DIR: str = "profiles"
+
+    # 운영자용 도구(profile_next_requests 등) 호출 시 admin_token 인자로 넘겨야 하는 값.
+    # 비워 두면 운영자용 도구는 항상 거부된다(MCP 클라이언트라면 누구나 부를 수 있으므로 기본은 잠금)
+    ADMIN_TOKEN: str = ""
+
+    # 이벤트 루프 지연 측정 / 루프를 막는 호출 감지
+    # - INTERVAL_SECONDS: 지연 측정 주기. 결과는 GET /metrics의 event_loop_lag_seconds(p50/p90/p99)
+    # - BLOCK_THRESHOLD_SECONDS: 루프가 이 시간 이상 멈추면 스택 샘플 + request_id/도구 이름을 경고 로그로 남긴다
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_SECONDS: float = 0.5
+    LOOP_BLOCK_THRESHOLD_SECONDS: float = 0.1
+
+    # 워커 하나가 프로세스 메모리 캐시(메모리 공유 저장소의 메일 상세/To Do 목록 캐시, 일정 캐시)에 쓸 수 있는 총량(MB).
+    # 넘으면 큰 캐시부터 오래된 항목을 내린다. 0이면 크기만 보고한다(get_memory_report, GET /metrics의 cache_memory_bytes)
+    CACHE_MEMORY_BUDGET_MB: int = 64
+
+    # MCP 도구 호출 마감 시간(초). 토큰 발급/Graph 호출 timeout이 남은 시간으로 줄어든다
+    # - TOOL_TIMEOUT_OVERRIDES: 도구별 기본값(예: find_meeting_times=45,search_emails_across_mailboxes=60)
+    # - 클라이언트가 요청 _meta.timeoutMs를 보내면 그 값을 쓰되 TOOL_MAX_TIMEOUT_SECONDS를 넘지 않는다
+    TOOL_TIMEOUT_SECONDS: float = 30.0
+    TOOL_MAX_TIMEOUT_SECONDS: float = 120.0
+    TOOL_TIMEOUT_OVERRIDES: str = "search_emails_across_mailboxes=60,find_meeting_times=45,create_todo_tasks_bulk=60"
+
+    # MCP 도구 동시 실행 제한(admission control). 0 이하면 해당 범위는 제한하지 않는다
+    # - TOOL/USER/SESSION_CONCURRENCY: 도구별, 사용자(my_email)별, 클라이언트 세션별 동시 실행 수
+    # - TOOL_LIMITS: 도구별 한도 재정의(예: search_emails_across_mailboxes=2)
+    # - MAX_QUEUE / QUEUE_TIMEOUT_SECONDS: 한도가 찼을 때 기다릴 수 있는 호출 수와 최대 대기 시간. 넘으면 즉시 거절
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_TOOL_CONCURRENCY: int = 16
+    ADMISSION_USER_CONCURRENCY: int = 4
+    ADMISSION_SESSION_CONCURRENCY: int = 4
+    ADMISSION_TOOL_LIMITS: str = "search_emails_across_mailboxes=2,find_meeting_times=4"
+    ADMISSION_MAX_QUEUE: int = 8
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 5.0
+
+    # 쓰기 도구 멱등 처리. TTL 안에 같은 키(클라이언트 _meta.idempotencyKey 또는 같은 인자)로 다시 호출하면
+    # Graph를 호출하지 않고 저장된 결과를 돌려준다
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: int = 600
+    IDEMPOTENCY_TOOLS: str = (
+        "send_my_email,create_draft,reply_to_email,create_calendar_event,create_todo_task,create_todo_tasks_bulk"
+    )
+
+    # 동시에 들어온 동일한 Graph GET 요청을 HTTP 호출 하나로 합친다(single-flight)
+    GRAPH_SINGLE_FLIGHT_ENABLED: bool = True
+
+    # Graph 회로 차단기: 전송 오류/5xx가 FAILURE_THRESHOLD번 연속되면 RESET_SECONDS 동안 호출하지 않고 바로 실패한다(0이면 끔)
+    GRAPH_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    GRAPH_CIRCUIT_RESET_SECONDS: float = 30.0
+
+    # GET /readyz 백그라운드 점검 주기(초)와 준비 상태로 볼 최대 이벤트 루프 지연(초)
+    READINESS_CHECK_INTERVAL_SECONDS: float = 15.0
+    READINESS_MAX_LOOP_LAG_SECONDS: float = 0.5
+
+    # MSAL 토큰 캐시 파일(암호화). 비우면 파일에 보관하지 않는다(재시작 시 토큰 재발급)
+    # - ENCRYPTION_KEY: 파일 암호화 비밀값. 비우면 AZURE_CLIENT_SECRET에서 키를 만든다
+    # - PREWARM_ON_STARTUP: 서버 시작 시 트래픽을 받기 전에 토큰을 미리 발급/로드
+    TOKEN_CACHE_FILE: str = ""
+    TOKEN_CACHE_ENCRYPTION_KEY: str = ""
+    TOKEN_PREWARM_ON_STARTUP: bool = False
+
+    # 메일 상세(본문) 캐시 유지 시간(초)
+    MESSAGE_CACHE_TTL_SECONDS: int = 600
+
+    # 일정 로컬 캐시(calendarView/delta 동기화)
+    # - 동기화 창: 오늘 기준 과거 PAST_DAYS ~ 미래 FUTURE_DAYS. 창 밖 구간은 live 조회
+    # - STALENESS_SECONDS: 마지막 동기화 후 이 시간 안의 조회는 Graph 호출 없이 응답
+    CALENDAR_CACHE_ENABLED: bool = True
+    CALENDAR_CACHE_STALENESS_SECONDS: float = 60.0
+    CALENDAR_CACHE_MAX_USERS: int = 100
+    CALENDAR_SYNC_PAST_DAYS: int = 7
+    CALENDAR_SYNC_FUTURE_DAYS: int = 60
+
+    # To Do 목록 이름 -> id 캐시 유지 시간(초), 일괄 생성 최대 작업 수
+    TODO_LIST_CACHE_TTL_SECONDS: int = 300
+    TODO_BULK_MAX_TASKS: int = 100
+
+    # 목록 조회 후 상위 N개 메일 상세 미리 가져오기(prefetch)
+    # - MAX_CONCURRENCY: prefetch에 쓸 최대 동시 Graph 호출 수(가득 차 있으면 건너뜀)
+    # - MAX_BYTES_PER_SECOND: prefetch로 받는 본문 크기 상한(초당 바이트)
+    # - 세션 id가 없는 호출은 prefetch하지 않는다(세션 종료 시 취소할 수 없어서).
+    #   세션 종료 취소는 같은 워커에서만 동작한다(HTTP_MODE=stateless/다중 워커에서는 보장되지 않음).
+    PREFETCH_ENABLED: bool = False
+    PREFETCH_TOP_N: int = 3
+    PREFETCH_MAX_CONCURRENCY: int = 2
+    PREFETCH_MAX_BYTES_PER_SECOND: int = 262144
+
+    # 메일 폴더 내보내기(start_mailbox_export) 파일/체크포인트 저장 위치
+    EXPORT_DIR: str = "exports"
+
+    # 다중 메일함 동시 검색(fan-out) 제한
+    FANOUT_MAX_CONCURRENCY: int = 8
+    FANOUT_MAX_MAILBOXES: int = 100
+    FANOUT_TIMEOUT_SECONDS: float = 10.0
+
+    # Graph 변경 알림 구독(캐시 무효화용)
+    # - NOTIFICATION_URL: Graph가 호출할 공개 https 주소(예: https://mcp.example.com/graph/notifications). 비우면 구독하지 않음
+    # - NOTIFICATION_CLIENT_STATE: 알림 검증용 비밀값. 비우면 워커들이 공유 저장소에서 하나를 정해 사용
+    # - NOTIFICATION_USERS: 구독할 사용자(콤마 구분). 비우면 DEFAULT_USER_EMAIL
+    # - NOTIFICATION_RESOURCES: mail,events,todo 중 구독할 종류
+    NOTIFICATION_URL: str = ""
+    NOTIFICATION_CLIENT_STATE: str = ""
+    NOTIFICATION_USERS: str = ""
+    NOTIFICATION_RESOURCES: str = "mail,events,todo"
+    # 구독 유지 시간(분, Graph 상한 4230분보다 짧게), 만료 몇 초 전에 갱신할지, 점검 주기(초)
+    SUBSCRIPTION_LIFETIME_MINUTES: int = 4200
+    SUBSCRIPTION_RENEW_BEFORE_SECONDS: int = 3600
+    SUBSCRIPTION_CHECK_INTERVAL_SECONDS: int = 600
+
+    # 워커 간 공유 저장소. 비우면 프로세스 메모리, redis://host:6379/0 형태면 Redis 사용
+    SHARED_STORE_URL: str = ""
+    SHARED_STORE_PREFIX: str = "mcp-mail:"
 
 
 settings = Settings()
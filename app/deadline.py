@@ -0,0 +1,50 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+# 현재 MCP 도구 호출의 마감 시각(time.monotonic 기준). None이면 마감 없음
+_deadline: ContextVar[float | None] = ContextVar("tool_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """도구 호출 마감 시간이 지나 더 이상 Graph 호출을 하지 않을 때 올린다."""
+
+
+@contextmanager
+def deadline_scope(seconds: float | None) -> Iterator[None]:
+    """
+    블록 안의 코드(와 그 안에서 만든 작업)에 마감 시간을 건다. None이면 마감을 해제한다.
+
+    이미 더 이른 마감이 걸려 있으면 그쪽을 유지한다(중첩 시 짧은 쪽 우선).
+    """
+    if seconds is None:
+        token = _deadline.set(None)
+    else:
+        new_deadline = time.monotonic() + seconds
+        current = _deadline.get()
+        token = _deadline.set(new_deadline if current is None else min(current, new_deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """남은 시간(초). 마감이 없으면 None, 지났으면 0."""
+    current = _deadline.get()
+    if current is None:
+        return None
+    return max(0.0, current - time.monotonic())
+
+
+def bound_timeout(timeout: float) -> float:
+    """
+    한 구간(토큰 발급, Graph 호출 등)의 timeout을 남은 시간으로 줄인다. 이미 마감이 지났으면 DeadlineExceeded.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("도구 호출 마감 시간이 지났습니다.")
+    return min(timeout, left)
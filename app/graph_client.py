@@ -0,0 +1,229 @@
+import asyncio
+import time
+from typing import Any
+
+import httpx
+
+from auth import SCOPES, async_get_access_token
+from config import settings
+from deadline import DeadlineExceeded, bound_timeout, deadline_scope, remaining
+from logger_config import get_logger
+from metrics import metrics
+
+logger = get_logger("app.graph")
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+DEFAULT_TIMEOUT_SECONDS = 15.0
+
+# 응답 내용을 바꾸는 요청 헤더. single-flight 키에 포함해야 다른 형식의 응답을 공유하지 않는다.
+_VARYING_HEADERS = ("accept", "prefer", "consistencylevel")
+
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+# single-flight 키 -> 진행 중인 GET 작업과 대기 중인 호출 수
+_inflight: dict[tuple, "_Flight"] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Graph 호출용 공유 AsyncClient를 돌려준다.
+
+    이유: 요청마다 AsyncClient를 새로 만들면 TLS 핸드셰이크와 커넥션을 재사용하지 못한다.
+    httpx 클라이언트는 생성된 이벤트 루프에 묶이므로 루프가 바뀌면(테스트 등) 새로 만든다.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT_SECONDS)
+        _client_loop = loop
+    return _client
+
+
+class CircuitOpenError(RuntimeError):
+    """Graph 호출이 연속으로 실패해 회로가 열려 있어 호출하지 않을 때 올린다."""
+
+
+class CircuitBreaker:
+    """
+    Graph 장애 시 호출을 빠르게 실패시키는 회로 차단기(워커 단위).
+
+    - closed: 정상. 전송 오류/5xx가 failure_threshold번 연속되면 open
+    - open: reset_seconds 동안 Graph를 호출하지 않고 CircuitOpenError
+    - half_open: 그 뒤 호출 하나만 보내 보고, 성공하면 closed, 실패하면 다시 open
+    이유: Graph 장애 중에 모든 도구 호출이 HTTP timeout까지 기다리면 마감 시간과 동시 실행 슬롯을 다 써 버린다.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        # 0 이하면 회로를 열지 않는다.
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("graph_circuit state=%s failures=%d", state, self.failures)
+            metrics.counter("graph_circuit_transitions_total", {"state": state}).inc()
+            self.state = state
+
+    def before_call(self) -> None:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                raise CircuitOpenError("Graph 호출이 연속으로 실패해 잠시 호출을 멈췄습니다. 잠시 후 다시 시도하세요.")
+            self._transition("half_open")
+        if self.state == "half_open":
+            if self._probing:
+                raise CircuitOpenError("Graph 연결 상태를 확인하는 중입니다. 잠시 후 다시 시도하세요.")
+            self._probing = True
+
+    def record(self, success: bool) -> None:
+        self._probing = False
+        if success:
+            self.failures = 0
+            self._transition("closed")
+            return
+        self.failures += 1
+        if self.state == "half_open" or (self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            self._transition("open")
+
+    def abandon(self) -> None:
+        # 취소/마감 초과처럼 Graph 상태와 무관하게 끝난 호출. half_open 확인 기회만 돌려준다.
+        self._probing = False
+
+
+circuit = CircuitBreaker(settings.GRAPH_CIRCUIT_FAILURE_THRESHOLD, settings.GRAPH_CIRCUIT_RESET_SECONDS)
+
+
+def graph_url(path: str) -> str:
+    # nextLink/deltaLink처럼 Graph가 돌려준 절대 URL은 그대로 사용한다.
+    return path if path.startswith("https://") else f"{GRAPH_BASE_URL}{path}"
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+def _flight_key(path: str, params: dict[str, Any] | None, headers: dict[str, str] | None) -> tuple:
+    varying = tuple(
+        sorted((k.lower(), v) for k, v in (headers or {}).items() if k.lower() in _VARYING_HEADERS)
+    )
+    return (
+        id(asyncio.get_running_loop()),
+        graph_url(path),
+        tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())),
+        varying,
+        tuple(SCOPES),
+    )
+
+
+async def _send(
+    method: str,
+    path: str,
+    params: dict[str, Any] | None,
+    headers: dict[str, str] | None,
+    json: Any,
+    timeout: float,
+) -> httpx.Response:
+    # 왜: 토큰 발급도 도구 호출 마감 시간 안에서만 기다린다. 남은 시간이 없으면 Graph 호출 없이 실패한다.
+    left = remaining()
+    if left is None:
+        token = await async_get_access_token()
+    else:
+        try:
+            token = await asyncio.wait_for(async_get_access_token(), bound_timeout(left))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("토큰 발급 중 도구 호출 마감 시간이 지났습니다.") from None
+    request_headers = {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/json",
+    }
+    if headers:
+        request_headers.update(headers)
+
+    circuit.before_call()
+    try:
+        response = await get_http_client().request(
+            method,
+            graph_url(path),
+            params=params,
+            headers=request_headers,
+            json=json,
+            timeout=bound_timeout(timeout),
+        )
+    except httpx.TransportError:
+        circuit.record(False)
+        raise
+    except BaseException:
+        circuit.abandon()
+        raise
+    circuit.record(response.status_code < 500)
+    return response
+
+
+async def _coalesced_get(
+    path: str,
+    params: dict[str, Any] | None,
+    headers: dict[str, str] | None,
+    timeout: float,
+) -> httpx.Response:
+    """
+    같은 GET(메일함/URL/파라미터/응답 형식 헤더/토큰 scope)이 이미 진행 중이면 그 결과를 함께 기다린다.
+
+    - 실제 HTTP 호출은 별도 작업으로 돌리고 호출자는 shield로 기다린다.
+      한 호출자가 취소돼도 다른 호출자의 결과는 그대로 받는다.
+    - 기다리는 호출자가 모두 취소되거나 마감을 넘기면 그때 HTTP 호출도 취소한다.
+    - 공유 호출에는 첫 호출자의 마감을 걸지 않고, 호출자마다 자기 마감까지만 기다린다.
+    - 응답 본문은 공유하지만 JSON 디코딩은 호출자마다 한다(호출부가 디코딩 결과를 고쳐 쓰는 경우가 있어서).
+    """
+    key = _flight_key(path, params, headers)
+    flight = _inflight.get(key)
+    if flight is None:
+        with deadline_scope(None):
+            task = asyncio.create_task(_send("GET", path, params, headers, None, timeout))
+        flight = _inflight[key] = _Flight(task)
+        task.add_done_callback(lambda _t: _inflight.pop(key, None) if _inflight.get(key) is flight else None)
+        metrics.counter("graph_singleflight_total", {"result": "leader"}).inc()
+    else:
+        metrics.counter("graph_singleflight_total", {"result": "coalesced"}).inc()
+
+    flight.waiters += 1
+    try:
+        left = remaining()
+        if left is None:
+            return await asyncio.shield(flight.task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.task), bound_timeout(left))
+        except asyncio.TimeoutError:
+            if flight.task.done():
+                raise
+            raise DeadlineExceeded("Graph 응답 대기 중 도구 호출 마감 시간이 지났습니다.") from None
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            flight.task.cancel()
+
+
+async def graph_request(
+    method: str,
+    path: str,
+    *,
+    params: dict[str, Any] | None = None,
+    headers: dict[str, str] | None = None,
+    json: Any = None,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+) -> httpx.Response:
+    """
+    토큰을 붙여 Microsoft Graph를 호출한다. 상태 코드 처리는 호출부에서 한다.
+
+    동시에 들어온 동일한 GET은 HTTP 호출 하나를 공유한다(GRAPH_SINGLE_FLIGHT_ENABLED).
+    도구 호출 마감(deadline.py)이 있으면 토큰 발급과 HTTP timeout을 남은 시간으로 줄인다.
+    """
+    if method.upper() == "GET" and settings.GRAPH_SINGLE_FLIGHT_ENABLED:
+        return await _coalesced_get(path, params, headers, timeout)
+    return await _send(method, path, params, headers, json, timeout)
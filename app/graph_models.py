@@ -0,0 +1,161 @@
+import json
+from abc import abstractmethod
+from collections.abc import Mapping
+from typing import Any, Iterator, TypeVar
+
+try:
+    import orjson
+except ImportError:  # requirements.txt에 있지만, 없는 환경에서는 표준 json으로 디코딩한다.
+    orjson = None
+
+M = TypeVar("M", bound="GraphModel")
+
+
+def loads(data: bytes | str) -> Any:
+    """Graph 응답 본문(bytes) 전체를 dict/list로 디코딩한다. orjson이 있으면 사용한다."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class GraphModel(Mapping):
+    """
+    Graph 응답 1건에서 도구가 쓰는 필드만 뽑아 둔 __slots__ 모델.
+
+    이유: 원본 중첩 dict를 목록 길이만큼 들고 다니며 `.get(...).get(...)`으로 꺼내는 대신,
+    본문 전체를 디코딩한 직후 필요한 값만 복사해 두고 디코딩된 dict는 버린다(디코딩 자체는 전체 필드를 읽는다).
+    Mapping을 구현하므로 렌더러(renderers.py)에 그대로 넘긴다.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    @abstractmethod
+    def from_graph(cls: type[M], raw: dict[str, Any]) -> M:
+        """디코딩된 Graph 응답 1건(dict)에서 필요한 필드만 뽑아 모델을 만든다."""
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Message(GraphModel):
+    """메일 목록 항목(제목/발신자/수신일시/미리보기)."""
+
+    __slots__ = ("id", "subject", "sender", "sender_name", "received", "is_read", "preview")
+
+    @classmethod
+    def from_graph(cls, raw: dict[str, Any]) -> "Message":
+        self = cls.__new__(cls)
+        sender = (raw.get("sender") or {}).get("emailAddress") or {}
+        preview = raw.get("bodyPreview")
+        self.id = raw.get("id", "")
+        self.subject = raw.get("subject", "(제목 없음)")
+        self.sender = sender.get("address", "")
+        self.sender_name = sender.get("name", "알 수 없음")
+        self.received = raw.get("receivedDateTime", "")
+        self.is_read = raw.get("isRead")
+        self.preview = preview.replace("\n", " ").strip()[:120] if preview is not None else None
+        return self
+
+
+class Event(GraphModel):
+    """일정 1건. attendees/body는 $select에 없으면 None."""
+
+    __slots__ = ("id", "subject", "start", "end", "location", "organizer", "attendees", "body")
+
+    @classmethod
+    def from_graph(cls, raw: dict[str, Any]) -> "Event":
+        self = cls.__new__(cls)
+        attendees = raw.get("attendees")
+        body = raw.get("body")
+        self.id = raw.get("id", "")
+        self.subject = raw.get("subject", "(제목 없음)")
+        self.start = (raw.get("start") or {}).get("dateTime", "")
+        self.end = (raw.get("end") or {}).get("dateTime", "")
+        self.location = (raw.get("location") or {}).get("displayName", "")
+        self.organizer = ((raw.get("organizer") or {}).get("emailAddress") or {}).get("name", "")
+        self.attendees = (
+            [(a.get("emailAddress") or {}).get("address", "") for a in attendees] if attendees is not None else None
+        )
+        self.body = body.get("content", "") if body is not None else None
+        return self
+
+
+class Attachment(GraphModel):
+    """첨부파일 메타데이터(이름/크기/형식/확장자 분류)."""
+
+    __slots__ = ("name", "size", "content_type", "extension")
+
+    @classmethod
+    def from_graph(cls, raw: dict[str, Any]) -> "Attachment":
+        self = cls.__new__(cls)
+        name = raw.get("name", "Unknown")
+        self.name = name
+        self.size = raw.get("size", 0)
+        self.content_type = raw.get("contentType")
+        self.extension = name.split(".")[-1].upper() if "." in name else "알 수 없음"
+        return self
+
+
+class MessageDetail(GraphModel):
+    """
+    메일 1건의 상세(발신자/스레드 id/본문/첨부 메타데이터). 상세 조회와 스레드 조회가 함께 쓴다.
+    body는 $select에 없으면 None, attachments는 hasAttachments가 아니면 빈 목록.
+    """
+
+    __slots__ = ("id", "subject", "sender", "sender_name", "received", "conversation_id", "body", "attachments")
+
+    @classmethod
+    def from_graph(cls, raw: dict[str, Any]) -> "MessageDetail":
+        self = cls.__new__(cls)
+        sender = (raw.get("sender") or {}).get("emailAddress") or {}
+        body = raw.get("body")
+        self.id = raw.get("id", "")
+        self.subject = raw.get("subject", "(제목 없음)")
+        self.sender = sender.get("address", "")
+        self.sender_name = sender.get("name", "알 수 없음")
+        self.received = raw.get("receivedDateTime", "")
+        self.conversation_id = raw.get("conversationId", "")
+        self.body = (body.get("content") or "") if body is not None else None
+        self.attachments = (
+            [Attachment.from_graph(a) for a in raw.get("attachments") or []] if raw.get("hasAttachments") else []
+        )
+        return self
+
+
+class TodoTask(GraphModel):
+    """To Do 작업 1건."""
+
+    __slots__ = ("id", "title", "status", "due")
+
+    @classmethod
+    def from_graph(cls, raw: dict[str, Any]) -> "TodoTask":
+        self = cls.__new__(cls)
+        due = raw.get("dueDateTime")
+        self.id = raw.get("id", "")
+        self.title = raw.get("title", "(제목 없음)")
+        self.status = raw.get("status", "")
+        self.due = due.get("dateTime", "") if due else ""
+        return self
+
+
+def decode_values(content: bytes, model: type[M]) -> list[M]:
+    """목록 응답({"value": [...]}) 본문을 디코딩한 뒤 항목마다 모델로 옮긴다."""
+    return [model.from_graph(raw) for raw in loads(content).get("value", [])]
+
+
+def decode_one(content: bytes, model: type[M]) -> M:
+    """단건 응답 본문을 디코딩한 뒤 모델로 옮긴다."""
+    return model.from_graph(loads(content))
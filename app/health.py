@@ -0,0 +1,120 @@
+import asyncio
+import time
+from contextlib import suppress
+from typing import Any
+
+import httpx
+from fastmcp.server.lifespan import lifespan
+
+from auth import async_get_access_token
+from config import settings
+from graph_client import GRAPH_BASE_URL, circuit, get_http_client
+from logger_config import get_logger
+from loop_monitor import loop_monitor
+from metrics import metrics
+
+logger = get_logger("app.health")
+
+# 점검 한 번에 구간별로 기다리는 최대 시간(초)
+CHECK_TIMEOUT_SECONDS = 5.0
+
+
+class HealthChecker:
+    """
+    readiness 판단에 필요한 점검(토큰, Graph 연결, 회로 상태, 루프 지연)을 백그라운드에서 주기적으로 돌린다.
+
+    이유: 로드밸런서 probe마다 토큰 발급/Graph 호출을 하면 probe가 느려지고 Graph 호출량만 늘어난다.
+    /readyz는 마지막 점검 결과(snapshot)만 읽어 I/O 없이 응답한다.
+    """
+
+    def __init__(self, interval: float, max_loop_lag: float) -> None:
+        self.interval = interval
+        self.max_loop_lag = max_loop_lag
+        self._checks: dict[str, dict[str, Any]] = {}
+        self._checked_at: float | None = None  # monotonic
+
+    async def _check_token(self) -> dict[str, Any]:
+        try:
+            await asyncio.wait_for(async_get_access_token(), CHECK_TIMEOUT_SECONDS)
+        except Exception as e:
+            return {"ok": False, "error": type(e).__name__}
+        return {"ok": True}
+
+    async def _check_graph(self) -> dict[str, Any]:
+        # 왜: 연결 가능 여부만 보므로 토큰 없이 보낸다. 401 같은 응답도 Graph가 응답했다는 뜻이다.
+        started = time.perf_counter()
+        try:
+            response = await get_http_client().get(f"{GRAPH_BASE_URL}/", timeout=CHECK_TIMEOUT_SECONDS)
+        except httpx.HTTPError as e:
+            return {"ok": False, "error": type(e).__name__}
+        return {
+            "ok": response.status_code < 500,
+            "status": response.status_code,
+            "latency_ms": round((time.perf_counter() - started) * 1000.0, 1),
+        }
+
+    def _check_circuit(self) -> dict[str, Any]:
+        return {"ok": circuit.state != "open", "state": circuit.state, "failures": circuit.failures}
+
+    def _check_loop(self) -> dict[str, Any]:
+        p99 = metrics.histogram("event_loop_lag_seconds").percentile(0.99)
+        lag = loop_monitor.last_lag
+        return {
+            "ok": lag <= self.max_loop_lag,
+            "lag_ms": round(lag * 1000.0, 1),
+            "p99_ms": round(p99 * 1000.0, 1) if p99 is not None else None,
+        }
+
+    async def run_checks(self) -> None:
+        token, graph = await asyncio.gather(self._check_token(), self._check_graph())
+        self._checks = {
+            "token": token,
+            "graph": graph,
+            "circuit": self._check_circuit(),
+            "event_loop": self._check_loop(),
+        }
+        self._checked_at = time.monotonic()
+        for name, check in self._checks.items():
+            metrics.gauge("readiness_check_ok", {"check": name}).set(1 if check["ok"] else 0)
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                await self.run_checks()
+            except Exception:
+                logger.exception("readiness_check_failed")
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> dict[str, Any]:
+        """마지막 점검 결과. 회로/루프 지연은 값만 읽으면 되므로 매번 최신 값으로 채운다."""
+        if self._checked_at is None:
+            return {"ready": False, "status": "starting", "checks": {}}
+        age = time.monotonic() - self._checked_at
+        checks = {**self._checks, "circuit": self._check_circuit(), "event_loop": self._check_loop()}
+        # 점검 루프가 멈췄으면(점검이 3주기 넘게 갱신되지 않음) 결과를 믿지 않는다.
+        fresh = age <= self.interval * 3 + CHECK_TIMEOUT_SECONDS
+        ready = fresh and all(check["ok"] for check in checks.values())
+        return {
+            "ready": ready,
+            "status": "ready" if ready else ("stale" if not fresh else "not_ready"),
+            "checked_seconds_ago": round(age, 1),
+            "checks": checks,
+        }
+
+
+health_checker = HealthChecker(settings.READINESS_CHECK_INTERVAL_SECONDS, settings.READINESS_MAX_LOOP_LAG_SECONDS)
+
+
+@lifespan
+async def health_lifespan(server):
+    """
+    서버가 떠 있는 동안 readiness 점검 루프를 돌린다.
+    """
+    task = asyncio.create_task(health_checker.run_forever())
+    try:
+        yield {}
+    finally:
+        task.cancel()
+        # 왜: 취소만 하고 기다리지 않으면 루프가 닫힐 때 "Task was destroyed but it is pending" 경고가 남는다.
+        with suppress(asyncio.CancelledError):
+            await task
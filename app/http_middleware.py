@@ -1,12 +1,15 @@
 import json
+import logging
 import time
-from typing import Any
+import zlib
+from typing import Any, Callable, Sequence
 from uuid import uuid4
 
 from starlette.datastructures import Headers, MutableHeaders
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from logger_config import clear_request_id, get_logger, set_request_id
+from logger_config import clear_request_id, get_logger, get_request_id, set_request_id
+from metrics import metrics
 
 logger = get_logger("app.http")
 
@@ -30,6 +33,7 @@ SENSITIVE_KEY_HINTS = {
     "password",
     "body",
     "my_email",
+    "mailbox",
     "to_address",
     "cc_address",
 }
@@ -37,6 +41,13 @@ SENSITIVE_KEY_HINTS = {
 # 과도한 본문 로그로 성능/비용/보안 리스크가 커지는 것을 막기 위한 상한선.
 MAX_BODY_LOG_BYTES = 4096
 
+# 로드밸런서가 몇 초마다 호출하는 경로. 성공 응답은 DEBUG로만 남긴다.
+# 이유: probe 로그가 INFO 로그의 대부분을 차지해 실제 요청 로그를 찾기 어려워진다.
+PROBE_PATHS = {"/healthz", "/readyz"}
+
+# 이 헤더 값이 PROFILING_TOKEN과 같으면 해당 요청을 프로파일링한다.
+PROFILE_HEADER = "x-profile-token"
+
 
 def _is_sensitive_key(key: str) -> bool:
     key_lower = key.lower()
@@ -165,7 +176,9 @@ class RequestIdMiddleware:
             elapsed_ms = (time.perf_counter() - started) * 1000.0
             raw_body = b"".join(body_chunks)
 
-            logger.info(
+            level = logging.DEBUG if path in PROBE_PATHS and status_code < 400 else logging.INFO
+            logger.log(
+                level,
                 "http_request method=%s path=%s status=%s elapsed_ms=%.1f client_ip=%s headers=%s payload=%s",
                 method,
                 path,
@@ -178,3 +191,300 @@ class RequestIdMiddleware:
 
             # 이유: clear를 빼먹으면 다음 요청 로그에 이전 request_id가 섞일 수 있다.
             clear_request_id()
+
+
+class ProfilingMiddleware:
+    """
+    트리거된 요청 하나를 cProfile로 측정한다(profiling.py 참고). 측정 파일 이름은 x-profile-file 응답 헤더로 알려준다.
+
+    이유: RequestIdMiddleware 안쪽에 두어 request_id를 파일 이름에 쓰고, 안쪽 미들웨어/MCP 처리/
+    토큰 발급 대기/Graph 호출/응답 포맷팅까지 한 번에 측정한다.
+
+    profiler는 profiling.RequestProfiler(should_profile/output_name/profile)를 생성자로만 받는다.
+    이 모듈이 profiling(-> config)을 import하지 않아야 설정 없이도 벤치마크에서 불러 쓸 수 있다.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: Any) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if not self.profiler.should_profile(Headers(scope=scope).get(PROFILE_HEADER)):
+            await self.app(scope, receive, send)
+            return
+
+        name = self.profiler.output_name(get_request_id())
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(raw=message["headers"])["x-profile-file"] = f"{name}.prof"
+            await send(message)
+
+        async with self.profiler.profile(name):
+            await self.app(scope, receive, send_wrapper)
+
+
+# ---------------------------------------------------------------------------
+# 세션 종료 알림
+# ---------------------------------------------------------------------------
+
+class SessionEndMiddleware:
+    """
+    세션 종료 요청(DELETE + mcp-session-id)이 성공하면 등록된 콜백에 세션 id를 알린다.
+
+    이유: 세션 단위로 돌던 백그라운드 작업(prefetch 등)을 세션이 끝나는 즉시 정리하기 위함.
+    """
+
+    def __init__(self, app: ASGIApp, callbacks: Sequence[Callable[[str], Any]]) -> None:
+        self.app = app
+        self.callbacks = list(callbacks)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") != "DELETE":
+            await self.app(scope, receive, send)
+            return
+
+        session_id = Headers(scope=scope).get("mcp-session-id")
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        if session_id and 200 <= status_code < 300:
+            for callback in self.callbacks:
+                try:
+                    callback(session_id)
+                except Exception:
+                    logger.exception("session_end_callback_failed session_id=%s", session_id)
+
+
+# ---------------------------------------------------------------------------
+# 응답 압축
+# ---------------------------------------------------------------------------
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성: 없으면 br 협상에서 제외한다.
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # 선택 의존성: 없으면 zstd 협상에서 제외한다.
+    zstandard = None
+
+
+class _GzipEncoder:
+    def __init__(self, level: int) -> None:
+        # 16 + MAX_WBITS: zlib 헤더 대신 gzip 헤더/트레일러를 쓴다.
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        out = self._obj.compress(data)
+        if flush:
+            out += self._obj.flush(zlib.Z_SYNC_FLUSH)
+        return out
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, level: int) -> None:
+        self._obj = brotli.Compressor(quality=min(level, 11))
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        out = self._obj.process(data)
+        if flush:
+            out += self._obj.flush()
+        return out
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int) -> None:
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        out = self._obj.compress(data)
+        if flush:
+            out += self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return out
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def _available_encoders() -> dict[str, Any]:
+    encoders: dict[str, Any] = {"gzip": _GzipEncoder}
+    if brotli is not None:
+        encoders["br"] = _BrotliEncoder
+    if zstandard is not None:
+        encoders["zstd"] = _ZstdEncoder
+    return encoders
+
+
+def _negotiate_encoding(accept_encoding: str, preferred: list[str]) -> str | None:
+    # 이유: q=0은 "사용 금지"라는 뜻이므로 단순 포함 검사만 하면 안 된다.
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+
+    for encoding in preferred:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Accept-Encoding 협상 기반 응답 압축(gzip, 설치 시 br/zstd).
+
+    - 일반 응답: minimum_size 미만이면 압축하지 않는다(작은 응답은 CPU 대비 이득이 없다).
+    - SSE(text/event-stream): 이벤트 단위로 flush하며 스트리밍 압축해 실시간성을 유지한다.
+    - 압축률/CPU 시간은 metrics에 기록한다.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        encodings: tuple[str, ...] = ("zstd", "br", "gzip"),
+        level: int = 6,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        available = _available_encoders()
+        self.encoders = {name: available[name] for name in encodings if name in available}
+        self.preferred = [name for name in encodings if name in self.encoders]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.preferred:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = _negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.preferred)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """
+    응답 1건의 압축 상태를 관리한다. http.response.start는 첫 본문을 보고 압축 여부를 정할 때까지 보류한다.
+    """
+
+    def __init__(self, owner: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.owner = owner
+        self.encoding = encoding
+        self._send = send
+        self._start: Message | None = None
+        self._encoder: Any = None
+        self._streaming = False
+        self._passthrough = False
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._cpu_seconds = 0.0
+
+    async def send(self, message: Message) -> None:
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "").lower()
+            # 이미 인코딩된 응답은 다시 압축하지 않는다.
+            if "content-encoding" in headers:
+                self._passthrough = True
+                await self._send(message)
+                return
+            self._streaming = content_type.startswith("text/event-stream")
+            self._start = message
+            if self._streaming:
+                await self._begin_compressed()
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._start is not None and not self._streaming:
+            # 첫 본문이 전부이고 작으면 압축 없이 그대로 보낸다.
+            if not more_body and len(body) < self.owner.minimum_size:
+                start, self._start = self._start, None
+                self._passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+            await self._begin_compressed()
+
+        await self._send(
+            {
+                "type": "http.response.body",
+                "body": self._compress(body, more_body),
+                "more_body": more_body,
+            }
+        )
+        if not more_body:
+            self._record_metrics()
+
+    async def _begin_compressed(self) -> None:
+        start, self._start = self._start, None
+        headers = MutableHeaders(raw=start["headers"])
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["content-length"]
+        self._encoder = self.owner.encoders[self.encoding](self.owner.level)
+        await self._send(start)
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        cpu_started = time.thread_time()
+        if more_body:
+            # SSE는 이벤트가 클라이언트에 즉시 도착해야 하므로 청크마다 flush한다.
+            out = self._encoder.compress(body, flush=self._streaming)
+        else:
+            out = self._encoder.compress(body, flush=False) + self._encoder.finish()
+        self._cpu_seconds += time.thread_time() - cpu_started
+        self._bytes_in += len(body)
+        self._bytes_out += len(out)
+        return out
+
+    def _record_metrics(self) -> None:
+        labels = {"encoding": self.encoding, "stream": "sse" if self._streaming else "plain"}
+        metrics.counter("http_compression_responses_total", labels).inc()
+        metrics.counter("http_compression_bytes_in_total", labels).inc(self._bytes_in)
+        metrics.counter("http_compression_bytes_out_total", labels).inc(self._bytes_out)
+        if self._bytes_out:
+            metrics.histogram("http_compression_ratio", labels).observe(self._bytes_in / self._bytes_out)
+        metrics.histogram("http_compression_cpu_ms", labels).observe(self._cpu_seconds * 1000.0)
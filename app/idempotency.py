@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator
+
+from logger_config import get_logger
+from metrics import metrics
+
+logger = get_logger("app.idempotency")
+
+# 처리 중 표시. 결과가 저장되면 {"status": "done", "result": ...}로 바뀐다.
+_PENDING = {"status": "pending"}
+
+# 현재 도구 호출이 실제로 쓰기를 마쳤는지 기록하는 목록. 멱등 처리 중인 호출에서만 설정된다.
+_write_marker: ContextVar[list[bool] | None] = ContextVar("idempotent_write", default=None)
+
+
+@contextmanager
+def track_write() -> Iterator[list[bool]]:
+    """블록 안에서 mark_write_done()이 불렸는지 담을 목록을 돌려준다(비어 있으면 쓰기 없음)."""
+    written: list[bool] = []
+    token = _write_marker.set(written)
+    try:
+        yield written
+    finally:
+        _write_marker.reset(token)
+
+
+def mark_write_done() -> None:
+    """
+    쓰기 도구가 Graph 쓰기(발송/생성)에 성공한 직후 부른다.
+
+    이유: 충돌 안내/목록 없음/입력값 오류처럼 아무것도 쓰지 않은 응답까지 저장하면,
+    원인을 고치고 같은 인자로 다시 호출해도 저장된 안내만 돌려받고 실제로는 생성되지 않는다.
+    """
+    written = _write_marker.get()
+    if written is not None:
+        written.append(True)
+
+
+def idempotency_key(tool: str, arguments: dict[str, Any] | None, client_key: str | None = None) -> str:
+    """
+    멱등 키를 만든다. 클라이언트가 준 키가 있으면 그것을, 없으면 도구 인자 전체의 해시를 쓴다.
+
+    클라이언트 키도 도구 이름/사용자와 묶어, 다른 도구나 다른 메일함의 결과를 돌려주지 않게 한다.
+    """
+    arguments = arguments or {}
+    if client_key:
+        basis = f"{tool}\0{arguments.get('my_email') or ''}\0{client_key}"
+    else:
+        basis = f"{tool}\0" + json.dumps(arguments, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return "idem:" + hashlib.sha256(basis.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    멱등 키별 결과를 공유 저장소에 TTL로 보관한다.
+
+    - 처음 온 호출이 pending 표시를 add(NX)로 잡고 실행한다. 성공 결과만 저장하고 실패하면 표시를 지운다.
+    - 같은 키의 동시 호출은 첫 호출이 끝날 때까지 기다렸다가 저장된 결과를 받는다
+      (같은 워커는 Future로, 다른 워커는 저장소 polling으로).
+    - 첫 호출이 실패하면 기다리던 호출 중 하나가 다시 실행한다.
+    """
+
+    def __init__(self, ttl_seconds: float, pending_ttl_seconds: float, poll_interval: float = 0.1) -> None:
+        self.ttl_seconds = ttl_seconds
+        # 실행 중인 워커가 죽어도 이 시간이 지나면 다른 호출이 다시 실행할 수 있다.
+        self.pending_ttl_seconds = pending_ttl_seconds
+        self.poll_interval = poll_interval
+        self._local: dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        (결과, 재사용 여부)를 돌려준다. func 결과는 JSON으로 저장할 수 있어야 한다.
+        """
+        # 왜: shared_store는 config를 읽으므로, 미들웨어 모듈이 설정 없이 import되도록(벤치마크) 호출 시점에 가져온다.
+        from shared_store import get_shared_store
+
+        store = get_shared_store()
+        waited = False
+        while True:
+            entry = await store.async_get_json(key)
+            if entry and entry.get("status") == "done":
+                metrics.counter("idempotency_total", {"result": "waited" if waited else "hit"}).inc()
+                return entry["result"], True
+
+            local = self._local.get(key)
+            if local is not None:
+                waited = True
+                await asyncio.shield(local)
+                continue
+
+            if await store.async_add(key, json.dumps(_PENDING).encode("utf-8"), self.pending_ttl_seconds):
+                break
+
+            # 왜: 다른 워커가 같은 키를 처리 중이다. 끝나서 결과가 저장되거나 pending이 만료될 때까지 기다린다.
+            waited = True
+            await asyncio.sleep(self.poll_interval)
+
+        done = asyncio.get_running_loop().create_future()
+        self._local[key] = done
+        try:
+            result = await func()
+        except BaseException:
+            await store.async_delete(key)
+            raise
+        else:
+            await store.async_set_json(key, {"status": "done", "result": result}, self.ttl_seconds)
+            metrics.counter("idempotency_total", {"result": "miss"}).inc()
+            return result, False
+        finally:
+            self._local.pop(key, None)
+            # 기다리던 호출은 깨어나서 저장소를 다시 확인한다(성공이면 결과 재사용, 실패면 직접 실행).
+            done.set_result(None)
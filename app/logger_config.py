@@ -23,6 +23,11 @@ def set_request_id(request_id: str) -> None:
 def clear_request_id() -> None:
     _request_id_ctx.set("-")
 
+
+def get_request_id() -> str:
+    return _request_id_ctx.get()
+
+
 def setup_logging(log_level: str = "INFO") -> None:
     """
     앱 전체에서 공통으로 사용할 콘솔 로그 포맷을 설정한다.
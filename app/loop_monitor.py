@@ -0,0 +1,168 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from types import FrameType
+from typing import Iterator
+
+from fastmcp.server.lifespan import lifespan
+
+from logger_config import get_logger, get_request_id
+from metrics import metrics
+
+logger = get_logger("app.loop")
+
+# 스택 샘플에 남길 최대 프레임 수(안쪽부터)
+STACK_SAMPLE_FRAMES = 30
+
+# 도구를 처리 중인 코루틴 프레임 -> (request_id, 도구 이름). 루프 스레드가 기록하고 감시 스레드가 읽는다.
+_activity: dict[FrameType, tuple[str, str]] = {}
+
+
+@contextmanager
+def track_activity(tool_name: str) -> Iterator[None]:
+    """
+    with 블록을 연 코루틴 프레임에 요청/도구를 기록한다. 루프를 막은 요청을 감시 스레드가 찾을 때 쓴다.
+
+    이유: 막힌 순간 루프 스레드의 스택에는 실행 중인 작업의 코루틴 프레임들이 이어져 있으므로,
+    스택을 바깥쪽으로 따라가다 기록된 프레임을 만나면 그 요청이 루프를 막고 있는 것이다.
+    asyncio 내부의 "현재 작업" 테이블(버전마다 구현이 다름)에 기대지 않는다.
+    """
+    frame = sys._getframe(2)  # 0: 이 제너레이터, 1: contextlib __enter__, 2: with를 연 코루틴
+    _activity[frame] = (get_request_id(), tool_name)
+    try:
+        yield
+    finally:
+        _activity.pop(frame, None)
+
+
+def _find_activity(frame: FrameType | None) -> tuple[str, str]:
+    while frame is not None:
+        activity = _activity.get(frame)
+        if activity is not None:
+            return activity
+        frame = frame.f_back
+    return "-", "-"
+
+
+class LoopMonitor:
+    """
+    이벤트 루프 지연(lag) 측정 + 루프를 오래 막는 콜백 감지.
+
+    - 측정: 루프 안의 작업이 interval마다 sleep하고, 예정보다 늦게 깨어난 시간을 event_loop_lag_seconds에 기록한다.
+    - 감지: 별도 스레드가 루프에 넣은 ping이 block_threshold 이상 처리되지 않으면, 그 순간 루프 스레드의
+      스택과 실행 중인 작업의 request_id/도구 이름을 로그로 남긴다(멈춤 1회당 1번).
+    """
+
+    def __init__(self, interval: float, block_threshold: float) -> None:
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        # 감시 스레드가 루프에 넣은 ping 콜백의 전송 시각. 루프가 처리하면 None으로 돌아간다.
+        self._ping_sent: float | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self.last_lag = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._ping_sent = None
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    async def _probe(self) -> None:
+        histogram = metrics.histogram("event_loop_lag_seconds")
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.last_lag = max(0.0, now - expected)
+            histogram.observe(self.last_lag)
+
+    def _ack(self) -> None:
+        self._ping_sent = None
+
+    def _watch(self) -> None:
+        # 왜: 루프가 막혀 있는 동안에는 루프 안의 어떤 코드도 돌 수 없으므로 감지는 다른 스레드에서 한다.
+        # 루프에 ping 콜백을 넣고, block_threshold 안에 처리되지 않으면 그 순간의 스택을 뜬다.
+        check_every = max(0.01, self.block_threshold / 2)
+        reported = False
+        while not self._stopped.wait(check_every):
+            sent = self._ping_sent
+            if sent is None:
+                reported = False
+                self._ping_sent = time.monotonic()
+                try:
+                    self._loop.call_soon_threadsafe(self._ack)
+                except RuntimeError:  # 루프가 닫혔다.
+                    return
+                continue
+            stalled = time.monotonic() - sent
+            if stalled >= self.block_threshold and not reported:
+                reported = True
+                try:
+                    self._report(stalled)
+                except Exception:
+                    logger.exception("event_loop_block_report_failed")
+
+    def _report(self, stalled: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame, limit=STACK_SAMPLE_FRAMES)) if frame is not None else "-"
+        # 같은 스택에서 track_activity가 기록한 프레임을 찾아 요청/도구를 알아낸다.
+        request_id, tool_name = _find_activity(frame)
+        metrics.counter("event_loop_blocked_total", {"tool": tool_name}).inc()
+        logger.warning(
+            "event_loop_blocked stalled_ms=%.0f request_id=%s tool=%s\n%s",
+            stalled * 1000.0,
+            request_id,
+            tool_name,
+            stack,
+        )
+
+
+# 측정 주기/감지 기준은 lifespan에서 설정 값으로 채운다.
+loop_monitor = LoopMonitor(interval=0.5, block_threshold=0.1)
+
+
+@lifespan
+async def loop_monitor_lifespan(server):
+    """
+    LOOP_MONITOR_ENABLED이면 서버가 떠 있는 동안 이벤트 루프 지연 측정/막힘 감지를 돌린다.
+    """
+    # 왜: 이 모듈은 mcp_midleware(track_activity)가 import하므로, 설정 없이도 불러올 수 있게 config는 여기서 읽는다.
+    from config import settings
+
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.interval = settings.LOOP_MONITOR_INTERVAL_SECONDS
+        loop_monitor.block_threshold = settings.LOOP_BLOCK_THRESHOLD_SECONDS
+        loop_monitor.start()
+    try:
+        yield {}
+    finally:
+        await loop_monitor.stop()
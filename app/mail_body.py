@@ -0,0 +1,193 @@
+import base64
+import hashlib
+import json
+import re
+
+# 회신/전달 시 메일 클라이언트가 끼워 넣는 "이전 메일" 구분선.
+# 이 줄부터 아래는 이전 스레드의 인용이므로 잘라낸다.
+_HISTORY_MARKERS = [
+    re.compile(r"^-{2,}\s*(original message|원본 메시지|forwarded message|전달된 메시지)\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^_{10,}\s*$"),  # Outlook 회신 구분선
+    re.compile(r"^on .{5,200} wrote:\s*$", re.IGNORECASE),
+    re.compile(r"^.{2,200}(님이 작성|님이 씀)\s*:?\s*$"),
+]
+
+# "From:/Sent:" 헤더 블록이 연속으로 나오면 인용 시작으로 본다.
+_HEADER_FROM = re.compile(r"^\s*(from|보낸 사람)\s*:", re.IGNORECASE)
+_HEADER_NEXT = re.compile(r"^\s*(sent|date|to|보낸 날짜|받는 사람|날짜)\s*:", re.IGNORECASE)
+
+# 서명 시작 표시. RFC 3676 구분자("-- ")와 모바일 기본 서명만 다룬다(본문 오탐을 피하기 위해 보수적으로).
+_SIGNATURE_MARKERS = [
+    re.compile(r"^--\s?$"),
+    re.compile(r"^(sent from my .+|.+에서 보냄)\s*$", re.IGNORECASE),
+]
+
+# 청크 경계를 줄바꿈에 맞추기 위해 뒤로 물러날 수 있는 최대 비율
+_CHUNK_BACKTRACK_RATIO = 0.2
+
+
+def strip_quoted_history(text: str) -> str:
+    """
+    회신 본문에서 인용된 이전 메일(구분선 이후, '>' 인용줄)을 제거한다.
+    """
+    lines = text.splitlines()
+    kept: list[str] = []
+    for idx, line in enumerate(lines):
+        stripped = line.strip()
+        if any(p.match(stripped) for p in _HISTORY_MARKERS):
+            break
+        if _HEADER_FROM.match(stripped) and idx + 1 < len(lines) and _HEADER_NEXT.match(lines[idx + 1].strip()):
+            break
+        if stripped.startswith(">"):
+            continue
+        kept.append(line)
+    return "\n".join(kept).rstrip()
+
+
+def strip_signature(text: str) -> str:
+    lines = text.splitlines()
+    for idx in range(len(lines) - 1, -1, -1):
+        if any(p.match(lines[idx].strip()) for p in _SIGNATURE_MARKERS):
+            return "\n".join(lines[:idx]).rstrip()
+    return text
+
+
+def clean_body(text: str) -> str:
+    """
+    LLM 컨텍스트 절약용 본문 정리: 인용 이력 -> 서명 순으로 제거하고 연속 빈 줄을 하나로 줄인다.
+    """
+    cleaned = strip_signature(strip_quoted_history(text))
+    return re.sub(r"\n{3,}", "\n\n", cleaned).strip()
+
+
+def chunk_text(text: str, offset: int, max_chars: int) -> tuple[str, int | None]:
+    """
+    offset부터 최대 max_chars 글자를 잘라 돌려준다. 남은 본문이 있으면 다음 offset도 함께 돌려준다.
+
+    이유: 문장 중간에서 끊기면 LLM이 다음 청크와 이어 읽기 어려우므로 가능하면 줄바꿈에서 자른다.
+    """
+    if offset >= len(text):
+        return "", None
+
+    end = offset + max_chars
+    if end >= len(text):
+        return text[offset:], None
+
+    newline = text.rfind("\n", offset, end)
+    if newline != -1 and newline >= end - int(max_chars * _CHUNK_BACKTRACK_RATIO):
+        end = newline + 1
+    return text[offset:end], end
+
+
+def _message_tag(message_id: str) -> str:
+    # message_id는 길이가 150자 안팎이라 cursor에는 짧은 해시만 넣는다.
+    return hashlib.sha256(message_id.encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(message_id: str, offset: int, stripped: bool) -> str:
+    raw = json.dumps({"m": _message_tag(message_id), "o": offset, "s": int(stripped)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, message_id: str) -> tuple[int, bool]:
+    """
+    cursor를 (offset, 인용 제거 여부)로 푼다.
+
+    이유: offset은 특정 메일 본문 기준이므로, 다른 메일의 cursor를 넘기면 엉뚱한 위치부터 읽게 된다.
+    cursor를 만든 메일과 message_id가 다르면 ValueError를 낸다.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        offset, stripped, tag = int(data["o"]), bool(data["s"]), data["m"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"잘못된 cursor 값입니다: {cursor}") from e
+    if tag != _message_tag(message_id):
+        raise ValueError("cursor가 이 메일(message_id)의 것이 아닙니다. 같은 메일의 '다음 cursor'를 사용하세요.")
+    return offset, stripped
+
+
+# 이 길이(정규화 후) 미만의 줄은 "안녕하세요", "감사합니다"처럼 메일마다 반복될 수 있으므로
+# 해시 일치만으로 지우지 않고, 앞뒤 줄이 지워질 때만 함께 지운다.
+_DEDUPE_MIN_LINE_CHARS = 12
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize_line(line: str) -> str:
+    # 인용 표시('>')와 공백 차이를 무시해야 회신마다 달라지는 인용 형식에서도 같은 줄로 본다.
+    return _WHITESPACE.sub(" ", line.strip().lstrip(">").strip()).lower()
+
+
+def _is_quote_scaffolding(line: str) -> bool:
+    stripped = line.strip()
+    return any(p.match(stripped) for p in _HISTORY_MARKERS) or bool(
+        _HEADER_FROM.match(stripped) or _HEADER_NEXT.match(stripped) or re.match(r"^\s*(subject|제목)\s*:", stripped, re.IGNORECASE)
+    )
+
+
+def dedupe_thread_bodies(bodies: list[str]) -> list[tuple[str, int]]:
+    """
+    시간순으로 정렬된 스레드 본문들에서 앞선 메일에 이미 나온 인용 내용을 지운다.
+
+    각 줄을 정규화한 뒤 해시를 집합에 넣어 두고, 뒤 메일에서 같은 해시의 긴 줄을 지운다(줄 수에 선형).
+    짧은 줄과 인용 머리글(From:/보낸 사람: 등)은 가장 가까운 앞뒤 긴 줄이 모두 지워질 때만 함께 지운다.
+
+    Returns:
+        메일별 (정리된 본문, 지운 줄 수)
+    """
+    seen: set[int] = set()
+    results: list[tuple[str, int]] = []
+
+    for body in bodies:
+        lines = body.splitlines()
+        normalized = [_normalize_line(line) for line in lines]
+        hashes = [hash(n) for n in normalized]
+        # True: 지움, False: 유지, None: 짧은 줄/머리글(앞뒤 판단에 따름)
+        decisions: list[bool | None] = []
+        scaffolding: list[bool] = []
+        for line, norm, h in zip(lines, normalized, hashes):
+            is_scaffolding = _is_quote_scaffolding(line)
+            scaffolding.append(is_scaffolding)
+            if len(norm) < _DEDUPE_MIN_LINE_CHARS or is_scaffolding:
+                decisions.append(None)
+            else:
+                decisions.append(h in seen)
+
+        # 인용 머리글(From:/-----Original Message----- 등)은 바로 뒤 긴 줄이 중복이면 함께 지운다.
+        # 본문 끝은 "지움"으로 본다(인용 뒤 꼬리 정리).
+        nxt = True
+        for idx in range(len(lines) - 1, -1, -1):
+            if scaffolding[idx]:
+                decisions[idx] = nxt
+            elif decisions[idx] is not None:
+                nxt = decisions[idx]
+
+        # 짧은 줄은 가장 가까운 앞/뒤 판정 줄이 모두 지워질 때만 지운다.
+        # 본문 시작은 "유지"로 본다(인용 위에 쓴 짧은 답장 "확인했습니다." 보존).
+        prev_drop: list[bool] = []
+        last = False
+        for decision in decisions:
+            prev_drop.append(last)
+            if decision is not None:
+                last = decision
+
+        kept: list[str] = []
+        removed = 0
+        nxt = True
+        for idx in range(len(lines) - 1, -1, -1):
+            decision = decisions[idx]
+            if decision is not None:
+                drop = nxt = decision
+            else:
+                drop = prev_drop[idx] and nxt
+            if drop:
+                removed += 1
+            else:
+                kept.append(lines[idx])
+        kept.reverse()
+
+        # 왜: 본문 안에서 지운 줄이 다음 메일의 중복 판정에도 쓰이도록, 이 메일의 긴 줄 해시를 모두 등록한다.
+        seen.update(h for h, norm in zip(hashes, normalized) if len(norm) >= _DEDUPE_MIN_LINE_CHARS)
+        results.append((re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip(), removed))
+
+    return results
@@ -0,0 +1,382 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from config import settings
+from deadline import deadline_scope
+from graph_client import graph_request
+from graph_models import loads
+from logger_config import get_logger
+from metrics import metrics
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # 선택 의존성: 없으면 parquet 형식은 쓸 수 없다.
+    pyarrow = None
+    pq = None
+
+logger = get_logger("app.export")
+
+EXPORT_FORMATS = ("jsonl", "parquet")
+# 메일 목록 한 페이지 크기. 페이지 하나가 메모리에 올라가는 최대 단위다.
+EXPORT_PAGE_SIZE = 100
+# 스로틀링(429/503/504) 시 같은 페이지를 다시 요청하는 최대 횟수와 최대 대기 시간(초)
+EXPORT_MAX_RETRIES = 5
+EXPORT_RETRY_MAX_WAIT_SECONDS = 30.0
+
+_SELECT = (
+    "id,conversationId,subject,from,toRecipients,ccRecipients,receivedDateTime,sentDateTime,"
+    "isRead,hasAttachments,importance,bodyPreview"
+)
+
+
+def export_job_id(my_email: str, folder: str, fmt: str, include_body: bool, include_attachments: bool) -> str:
+    # 왜: 같은 조건으로 다시 시작하면 같은 id가 나와야 체크포인트에서 이어서 받을 수 있다.
+    basis = f"{my_email.lower()}\0{folder}\0{fmt}\0{int(include_body)}\0{int(include_attachments)}"
+    return hashlib.sha1(basis.encode("utf-8")).hexdigest()[:12]
+
+
+def _addresses(recipients: list[dict[str, Any]] | None) -> list[str]:
+    return [(r.get("emailAddress") or {}).get("address", "") for r in recipients or []]
+
+
+def export_record(raw: dict[str, Any]) -> dict[str, Any]:
+    """Graph 메일 1건을 내보내기 행(평평한 컬럼)으로 바꾼다."""
+    sender = (raw.get("from") or {}).get("emailAddress") or {}
+    record = {
+        "id": raw.get("id", ""),
+        "conversation_id": raw.get("conversationId", ""),
+        "subject": raw.get("subject") or "",
+        "sender": sender.get("address", ""),
+        "sender_name": sender.get("name", ""),
+        "to": _addresses(raw.get("toRecipients")),
+        "cc": _addresses(raw.get("ccRecipients")),
+        "received": raw.get("receivedDateTime", ""),
+        "sent": raw.get("sentDateTime", ""),
+        "is_read": bool(raw.get("isRead")),
+        "has_attachments": bool(raw.get("hasAttachments")),
+        "importance": raw.get("importance", ""),
+        "preview": raw.get("bodyPreview") or "",
+    }
+    if "body" in raw:
+        record["body"] = (raw.get("body") or {}).get("content", "")
+    if "attachments" in raw:
+        record["attachments"] = [
+            {"name": a.get("name", ""), "size": a.get("size", 0), "content_type": a.get("contentType") or ""}
+            for a in raw.get("attachments") or []
+        ]
+    return record
+
+
+def _retry_after_seconds(value: str | None, default: float) -> float:
+    # Retry-After는 초 또는 HTTP 날짜일 수 있다. 날짜처럼 숫자가 아니면 지수 백오프 값을 쓴다.
+    try:
+        return max(float(value), 0.0) if value is not None else default
+    except ValueError:
+        return default
+
+
+def _write_json_atomic(path: Path, data: dict[str, Any]) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+class MailboxExport:
+    """
+    폴더 하나의 메일을 페이지 단위로 받아 파일에 이어 쓰는 내보내기 작업.
+
+    - 메모리: 한 번에 한 페이지(EXPORT_PAGE_SIZE건)만 들고 있는다.
+    - 체크포인트: 페이지를 디스크에 쓰고(fsync) 나서 다음 페이지 링크/건수/파일 위치를 원자적으로 기록한다.
+    - 재개: 체크포인트 이후에 쓰다 만 데이터(jsonl 꼬리, parquet 조각)는 지우고 저장된 링크부터 다시 받는다.
+    - 갱신: 완료된 작업을 다시 돌리면 마지막으로 받은 수신 시각 이후 메일만 이어 쓴다. restart=True면 파일을 지우고 처음부터 받는다.
+    - 파일 쓰기/fsync/parquet 변환은 이벤트 루프를 막지 않도록 스레드에서 한다.
+    """
+
+    def __init__(
+        self,
+        export_dir: str | os.PathLike,
+        my_email: str,
+        folder: str,
+        fmt: str = "jsonl",
+        include_body: bool = False,
+        include_attachments: bool = False,
+    ) -> None:
+        self.my_email = my_email
+        self.folder = folder
+        self.fmt = fmt
+        self.include_body = include_body
+        self.include_attachments = include_attachments
+        self.job_id = export_job_id(my_email, folder, fmt, include_body, include_attachments)
+        self.dir = Path(export_dir)
+        suffix = "jsonl" if fmt == "jsonl" else "parquet"
+        self.output_path = self.dir / f"{self.job_id}.{suffix}"
+        self.checkpoint_path = self.dir / f"{self.job_id}.checkpoint.json"
+        # 왜: 생성자는 루프 위에서 불리므로 디스크를 읽지 않는다. 체크포인트는 load()로 스레드에서 읽는다.
+        self.state = self._initial_state()
+        self._loaded = False
+        self.error: str | None = None
+
+    def _initial_state(self) -> dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "my_email": self.my_email,
+            "folder": self.folder,
+            "format": self.fmt,
+            "include_body": self.include_body,
+            "include_attachments": self.include_attachments,
+            "next_link": None,
+            "exported": 0,
+            "bytes": 0,
+            "parts": 0,
+            "elapsed_seconds": 0.0,
+            # 마지막으로 쓴 메일의 수신 시각과 그 시각에 받은 메일 id(갱신 시 ge 필터로 겹치는 메일을 거른다)
+            "last_received": "",
+            "last_received_ids": [],
+            "completed": False,
+        }
+
+    def _load_checkpoint(self) -> dict[str, Any]:
+        state = self._initial_state()
+        try:
+            # 이전 버전 체크포인트에 없는 키는 기본값으로 둔다.
+            state.update(json.loads(self.checkpoint_path.read_text(encoding="utf-8")))
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            logger.warning("export_checkpoint_invalid job_id=%s", self.job_id)
+        return state
+
+    async def load(self) -> None:
+        """체크포인트를 스레드에서 읽어 state에 반영한다."""
+        self.state = await asyncio.to_thread(self._load_checkpoint)
+        self._loaded = True
+
+    def _first_request(self, since: str = "") -> tuple[str, dict[str, Any]]:
+        select = _SELECT + (",body" if self.include_body else "")
+        params: dict[str, Any] = {
+            "$top": EXPORT_PAGE_SIZE,
+            "$select": select,
+            # 왜: 오래된 메일부터 받아야 내보내는 동안 새로 도착한 메일 때문에 페이지가 밀리지 않는다.
+            "$orderby": "receivedDateTime asc",
+        }
+        if since:
+            # Graph는 $orderby 속성이 $filter에도 같은 순서로 있어야 하므로 receivedDateTime 하나로만 거른다.
+            params["$filter"] = f"receivedDateTime ge {since}"
+        if self.include_attachments:
+            params["$expand"] = "attachments($select=name,size,contentType)"
+        return f"/users/{self.my_email}/mailFolders/{self.folder}/messages", params
+
+    async def _fetch_page(self, url: str, params: dict[str, Any] | None) -> dict[str, Any]:
+        headers = {"Prefer": 'outlook.body-content-type="text"'} if self.include_body else None
+        attempt = 0
+        while True:
+            response = await graph_request("GET", url, params=params, headers=headers, timeout=60.0)
+            if response.status_code not in (429, 503, 504) or attempt >= EXPORT_MAX_RETRIES:
+                break
+            wait = min(_retry_after_seconds(response.headers.get("Retry-After"), 2 ** attempt), EXPORT_RETRY_MAX_WAIT_SECONDS)
+            logger.info("export_throttled job_id=%s status=%s wait=%.1fs", self.job_id, response.status_code, wait)
+            await asyncio.sleep(wait)
+            attempt += 1
+        response.raise_for_status()
+        return loads(response.content)
+
+    def _reset(self) -> None:
+        # 처음부터 다시 받기 위해 출력 파일과 체크포인트를 지운다.
+        if self.output_path.is_dir():
+            shutil.rmtree(self.output_path)
+        else:
+            self.output_path.unlink(missing_ok=True)
+        self.checkpoint_path.unlink(missing_ok=True)
+
+    def _truncate_to_checkpoint(self) -> None:
+        # 체크포인트 뒤에 쓰인 데이터는 다시 받을 것이므로 버린다.
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if self.fmt == "jsonl":
+            if self.output_path.exists():
+                with open(self.output_path, "r+b") as f:
+                    f.truncate(self.state["bytes"])
+            return
+        if self.output_path.is_dir():
+            for part in self.output_path.glob("part-*.parquet"):
+                if int(part.stem.split("-")[1]) >= self.state["parts"]:
+                    part.unlink()
+
+    def _write_page(self, records: list[dict[str, Any]]) -> None:
+        if self.fmt == "jsonl":
+            with open(self.output_path, "ab") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                    f.write(b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+                self.state["bytes"] = f.tell()
+            return
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        part_path = self.output_path / f"part-{self.state['parts']:05d}.parquet"
+        pq.write_table(pyarrow.Table.from_pylist(records), part_path)
+        self.state["bytes"] += part_path.stat().st_size
+        self.state["parts"] += 1
+
+    def _new_records(self, page: dict[str, Any]) -> list[dict[str, Any]]:
+        # 갱신 요청은 ge 필터라 마지막 수신 시각의 메일이 다시 오므로, 이미 쓴 id는 건너뛴다.
+        seen = set(self.state["last_received_ids"])
+        records = [export_record(raw) for raw in page.get("value", [])]
+        return [r for r in records if not (r["received"] == self.state["last_received"] and r["id"] in seen)]
+
+    def _advance_position(self, records: list[dict[str, Any]]) -> None:
+        for record in records:
+            if record["received"] != self.state["last_received"]:
+                self.state["last_received"] = record["received"]
+                self.state["last_received_ids"] = []
+            self.state["last_received_ids"].append(record["id"])
+
+    async def run(self, restart: bool = False) -> dict[str, Any]:
+        """
+        체크포인트에서 이어서 끝까지 내보낸다.
+        완료된 작업이면 마지막 수신 시각 이후 새 메일만 이어 받고, restart=True면 처음부터 다시 받는다.
+        """
+        if self.fmt == "parquet" and pyarrow is None:
+            raise RuntimeError("parquet 형식은 pyarrow 패키지가 필요합니다.")
+
+        if restart:
+            await asyncio.to_thread(self._reset)
+        if restart or not self._loaded:
+            await self.load()
+        if self.state["completed"]:
+            self.state["completed"] = False
+            self.state["next_link"] = None
+        await asyncio.to_thread(self._truncate_to_checkpoint)
+
+        if self.state["next_link"]:
+            url, params = self.state["next_link"], None
+        else:
+            # 처음 시작이거나, 완료 후 갱신이거나, 마지막 페이지를 쓰고 완료 표시 전에 멈춘 경우.
+            url, params = self._first_request(self.state["last_received"])
+
+        started = time.monotonic()
+        base_elapsed = self.state["elapsed_seconds"]
+        while url:
+            page = await self._fetch_page(url, params)
+            records = self._new_records(page)
+            if records:
+                await asyncio.to_thread(self._write_page, records)
+                self._advance_position(records)
+            self.state["exported"] += len(records)
+            self.state["next_link"] = page.get("@odata.nextLink")
+            self.state["elapsed_seconds"] = round(base_elapsed + time.monotonic() - started, 3)
+            await asyncio.to_thread(_write_json_atomic, self.checkpoint_path, self.state)
+            metrics.counter("export_messages_total").inc(len(records))
+            url, params = self.state["next_link"], None
+
+        self.state["completed"] = True
+        await asyncio.to_thread(_write_json_atomic, self.checkpoint_path, self.state)
+        logger.info(
+            "export_completed job_id=%s exported=%d bytes=%d elapsed=%.1fs",
+            self.job_id,
+            self.state["exported"],
+            self.state["bytes"],
+            self.state["elapsed_seconds"],
+        )
+        return self.state
+
+    def status(self) -> dict[str, Any]:
+        elapsed = self.state["elapsed_seconds"] or 0.0
+        return {
+            "job_id": self.job_id,
+            "folder": self.folder,
+            "format": self.fmt,
+            "output": str(self.output_path),
+            "exported": self.state["exported"],
+            "bytes": self.state["bytes"],
+            "completed": self.state["completed"],
+            "messages_per_second": round(self.state["exported"] / elapsed, 1) if elapsed else None,
+            "bytes_per_second": round(self.state["bytes"] / elapsed) if elapsed else None,
+            "error": self.error,
+        }
+
+
+class ExportManager:
+    """
+    내보내기 작업을 백그라운드로 실행하고 상태를 조회한다. 같은 조건의 작업은 하나만 돈다(실행 중이면 restart도 무시).
+    """
+
+    def __init__(self, export_dir: str) -> None:
+        self.export_dir = export_dir
+        self._jobs: dict[str, MailboxExport] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def start(
+        self,
+        my_email: str,
+        folder: str,
+        fmt: str,
+        include_body: bool,
+        include_attachments: bool,
+        restart: bool = False,
+    ) -> MailboxExport:
+        job = MailboxExport(self.export_dir, my_email, folder, fmt, include_body, include_attachments)
+        running = self._tasks.get(job.job_id)
+        if running is not None and not running.done():
+            return self._jobs[job.job_id]
+        # 이유: 바로 돌려주는 status()가 이전까지 진행한 건수를 보여주도록 시작 전에 체크포인트를 읽는다.
+        await job.load()
+        self._jobs[job.job_id] = job
+        # 왜: 도구 호출 마감 시간(contextvar)이 백그라운드 작업에 이어지면 내보내기가 중간에 끊긴다.
+        with deadline_scope(None):
+            task = asyncio.create_task(self._run(job, restart))
+        self._tasks[job.job_id] = task
+        return job
+
+    async def _run(self, job: MailboxExport, restart: bool) -> None:
+        try:
+            await job.run(restart)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 체크포인트는 남아 있으므로 같은 조건으로 다시 시작하면 이어서 받는다.
+            job.error = str(e)
+            logger.warning("export_failed job_id=%s error=%s", job.job_id, e)
+
+    async def get(self, job_id: str) -> MailboxExport | None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        # 재시작 뒤에는 체크포인트 파일로 상태를 복원한다.
+        path = Path(self.export_dir) / f"{job_id}.checkpoint.json"
+        try:
+            state = json.loads(await asyncio.to_thread(path.read_text, encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        job = MailboxExport(
+            self.export_dir,
+            state["my_email"],
+            state["folder"],
+            state["format"],
+            state.get("include_body", False),
+            state.get("include_attachments", False),
+        )
+        job.state.update(state)
+        job._loaded = True
+        return job
+
+    def is_running(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        return task is not None and not task.done()
+
+
+export_manager = ExportManager(settings.EXPORT_DIR)
@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import itertools
+from typing import Any
+
+import httpx
+
+from config import settings
+from graph_client import graph_request
+from graph_models import MessageDetail, decode_one, loads
+from logger_config import get_logger
+from mail_body import clean_body
+from metrics import metrics
+from shared_store import get_shared_store
+
+logger = get_logger("app.mail")
+
+# 같은 메일을 동시에 여러 번 요청해도 Graph 호출/본문 가공은 한 번만 하도록 키별 락을 둔다.
+_detail_locks: dict[str, asyncio.Lock] = {}
+
+
+def _detail_key(my_email: str, message_id: str) -> str:
+    return f"mail:detail:{my_email.lower()}:{message_id}"
+
+
+async def is_message_detail_cached(my_email: str, message_id: str) -> bool:
+    return await get_shared_store().async_get(_detail_key(my_email, message_id)) is not None
+
+
+async def invalidate_message_detail(my_email: str, message_id: str) -> None:
+    await get_shared_store().async_delete(_detail_key(my_email, message_id))
+
+
+async def load_message_detail(my_email: str, message_id: str) -> dict[str, Any] | None:
+    """
+    메일 상세(헤더, 첨부 메타데이터, 원문 본문, 정리된 본문)를 캐시에서 읽거나 Graph에서 한 번 가져온다.
+
+    Returns:
+        메일 상세 dict. 메일이 없으면(404) None.
+    """
+    store = get_shared_store()
+    key = _detail_key(my_email, message_id)
+
+    cached = await store.async_get_json(key)
+    if cached is not None:
+        metrics.counter("mail_detail_cache_total", {"result": "hit"}).inc()
+        return cached
+
+    lock = _detail_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            # 락을 기다리는 동안 앞선 요청이 캐시를 채웠을 수 있다.
+            cached = await store.async_get_json(key)
+            if cached is not None:
+                metrics.counter("mail_detail_cache_total", {"result": "hit"}).inc()
+                return cached
+
+            metrics.counter("mail_detail_cache_total", {"result": "miss"}).inc()
+            response = await graph_request(
+                "GET",
+                f"/users/{my_email}/messages/{message_id}",
+                # 첨부파일 메타데이터 조회를 위해 /attachments 확장 사용
+                params={"$expand": "attachments($select=name,size)"},
+                # 본문을 텍스트로 바로 받기 위해 Prefer: outlook.body-content-type="text" 헤더 활용
+                headers={"Prefer": 'outlook.body-content-type="text"'},
+            )
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+
+            email = decode_one(response.content, MessageDetail)
+            body = email.body or ""
+            # 캐시(JSON)에 넣으므로 모델을 평평한 dict로 옮긴다.
+            detail = {
+                "id": email.id or message_id,
+                "subject": email.subject,
+                "sender": email.sender or "알 수 없음",
+                "received": email.received,
+                "conversation_id": email.conversation_id,
+                "attachments": [{"name": att.name, "size": att.size} for att in email.attachments],
+                "body": body,
+                # 왜: 인용/서명 제거는 본문 길이에 비례하는 비용이므로 캐시에 넣기 전에 한 번만 한다.
+                "clean_body": clean_body(body),
+            }
+            await store.async_set_json(key, detail, settings.MESSAGE_CACHE_TTL_SECONDS)
+            return detail
+    finally:
+        if not lock.locked():
+            _detail_locks.pop(key, None)
+
+
+async def fetch_conversation(
+    my_email: str, conversation_id: str, limit: int
+) -> tuple[list[MessageDetail], bool]:
+    """
+    같은 conversationId의 최근 메일을 최대 limit개 가져와 받은시간 오름차순으로 돌려준다.
+
+    Returns:
+        (메일 목록, 잘림 여부). 스레드에 limit개보다 많은 메일이 있으면 가장 최근 limit개만 담고 True.
+    """
+    # 따옴표가 들어간 id도 OData 문자열 규칙대로 이스케이프한다.
+    conversation = conversation_id.replace(chr(39), chr(39) * 2)
+    url = f"/users/{my_email}/messages"
+    params: dict[str, Any] | None = {
+        # 왜: conversationId 필터에 $orderby만 붙이면 Graph가 InefficientFilter로 거절한다.
+        # 정렬 속성(receivedDateTime)을 $filter 맨 앞에 두면 서버 정렬이 허용되어 최신 메일부터 받을 수 있다.
+        "$filter": f"receivedDateTime ge 1900-01-01T00:00:00Z and conversationId eq '{conversation}'",
+        "$orderby": "receivedDateTime desc",
+        "$top": limit,
+        "$select": "id,subject,sender,receivedDateTime,body",
+    }
+    messages: list[MessageDetail] = []
+    next_link = None
+    while url and len(messages) < limit:
+        response = await graph_request("GET", url, params=params, headers={"Prefer": 'outlook.body-content-type="text"'})
+        response.raise_for_status()
+        page = loads(response.content)
+        messages.extend(MessageDetail.from_graph(raw) for raw in page.get("value", []))
+        # Graph가 $top보다 작은 페이지를 줄 수 있으므로 limit을 채울 때까지 다음 페이지를 따라간다.
+        next_link = page.get("@odata.nextLink")
+        url, params = next_link, None
+    truncated = len(messages) > limit or (len(messages) == limit and next_link is not None)
+    messages = messages[:limit]
+    messages.reverse()
+    return messages, truncated
+
+
+async def search_mailbox(mailbox: str, keyword: str, limit: int) -> list[dict[str, Any]]:
+    """
+    메일함 하나에서 키워드 검색 결과를 최신순으로 돌려준다. 각 항목에는 mailbox 키가 붙는다.
+    """
+    response = await graph_request(
+        "GET",
+        f"/users/{mailbox}/messages",
+        params={
+            # 왜: $search는 따옴표로 감싼 검색어를 요구하므로 쿼리 문자열을 명시적으로 구성한다.
+            "$search": f"\"{keyword}\"",
+            "$top": limit,
+            "$select": "id,subject,sender,receivedDateTime,bodyPreview",
+        },
+        # 왜: Graph에서 $search 사용 시 ConsistencyLevel 헤더가 필요하다.
+        headers={"ConsistencyLevel": "eventual"},
+    )
+    response.raise_for_status()
+    emails = loads(response.content).get("value", [])
+    for email in emails:
+        email["mailbox"] = mailbox
+    # $search 결과는 관련도 순이므로 k-way merge 전에 메일함별로 최신순 정렬한다.
+    emails.sort(key=lambda e: e.get("receivedDateTime", ""), reverse=True)
+    return emails
+
+
+def merge_by_received(result_lists: list[list[dict[str, Any]]], limit: int) -> list[dict[str, Any]]:
+    """
+    메일함별로 최신순 정렬된 목록들을 k-way merge로 합쳐 상위 limit건만 돌려준다.
+
+    이유: 전체를 합쳐 다시 정렬하지 않고 heap으로 앞에서부터 limit건만 꺼내면 O(limit·log k)로 끝난다.
+    """
+    merged = heapq.merge(*result_lists, key=lambda e: e.get("receivedDateTime", ""), reverse=True)
+    return list(itertools.islice(merged, limit))
+
+
+async def fan_out_search(
+    mailboxes: list[str],
+    keyword: str,
+    limit_per_mailbox: int,
+    total_limit: int,
+    max_concurrency: int,
+    timeout_seconds: float,
+) -> tuple[list[dict[str, Any]], dict[str, str]]:
+    """
+    여러 메일함을 동시에 검색하고 수신시간 기준으로 병합한다.
+
+    Returns:
+        (병합된 메일 목록, 실패한 메일함 -> 실패 사유). 일부 메일함이 실패/타임아웃이어도 나머지 결과는 돌려준다.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def search_one(mailbox: str) -> list[dict[str, Any]]:
+        async with semaphore:
+            # 왜: 타임아웃은 세마포어 대기 시간을 빼고 실제 Graph 호출 시간에만 적용한다.
+            return await asyncio.wait_for(search_mailbox(mailbox, keyword, limit_per_mailbox), timeout_seconds)
+
+    outcomes = await asyncio.gather(*(search_one(mailbox) for mailbox in mailboxes), return_exceptions=True)
+
+    succeeded: list[list[dict[str, Any]]] = []
+    failures: dict[str, str] = {}
+    for mailbox, outcome in zip(mailboxes, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            failures[mailbox] = f"timeout({timeout_seconds:g}s)"
+        elif isinstance(outcome, httpx.HTTPStatusError):
+            failures[mailbox] = f"HTTP {outcome.response.status_code}"
+        elif isinstance(outcome, BaseException):
+            failures[mailbox] = str(outcome) or type(outcome).__name__
+        else:
+            succeeded.append(outcome)
+
+    metrics.counter("mail_fanout_mailboxes_total", {"result": "ok"}).inc(len(succeeded))
+    metrics.counter("mail_fanout_mailboxes_total", {"result": "failed"}).inc(len(failures))
+    if failures:
+        logger.warning("mail_fanout_partial failed=%s total=%s", len(failures), len(mailboxes))
+
+    return merge_by_received(succeeded, total_limit), failures
@@ -1,22 +1,140 @@
 from fastmcp import FastMCP
 from config import settings
-import requests
+import asyncio
 import httpx
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from typing import Optional, Annotated
-from auth import get_access_token
+from auth import async_get_access_token, is_admin_token, token_prewarm_lifespan
+from health import health_checker, health_lifespan
+from loop_monitor import loop_monitor_lifespan
+from memory import memory_budget, memory_report, set_tracing
 import json
 from logger_config import setup_logging, get_logger
 from starlette.middleware import Middleware
-from http_middleware import RequestIdMiddleware
-from mcp_midleware import MCPLoggingMiddleware
+from starlette.requests import Request
+from fastmcp.server.dependencies import get_context
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from http_middleware import CompressionMiddleware, ProfilingMiddleware, RequestIdMiddleware, SessionEndMiddleware
+from idempotency import IdempotencyStore, mark_write_done
+from mcp_midleware import AdmissionControlMiddleware, DeadlineMiddleware, IdempotencyMiddleware, MCPLoggingMiddleware
+from shared_store import build_session_state_store
+from metrics import metrics
+from mail_body import chunk_text, decode_cursor, dedupe_thread_bodies, encode_cursor
+from mail_service import fan_out_search, fetch_conversation, load_message_detail
+from graph_client import graph_request
+from mail_export import EXPORT_FORMATS, export_manager
+from graph_models import Attachment, Event, Message, TodoTask, decode_one, decode_values, loads
+from calendar_store import calendar_store, parse_query_datetime
+from prefetch import prefetcher
+from profiling import profiler
+from subscriptions import WEBHOOK_PATH, subscription_lifespan, subscription_manager
+from todo_service import create_tasks_batch, invalidate_task_lists, load_task_lists, resolve_task_list_id
+from scheduling import GET_SCHEDULE_BATCH_SIZE, MAX_SCHEDULE_RANGE_DAYS, find_common_slots
+from renderers import (
+    FIELDS_DESCRIPTION,
+    OUTPUT_FORMAT_DESCRIPTION,
+    OutputFormat,
+    render_detail,
+    render_list,
+    render_message,
+    render_notice,
+    SEPARATOR,
+    format_size,
+    parse_fields,
+    project,
+    to_json,
+)
 
 
 AZURE_CLIENT_ID = settings.AZURE_CLIENT_ID
 AZURE_TENANT_ID = settings.AZURE_TENANT_ID
 DEFAULT_USER_EMAIL = settings.DEFAULT_USER_EMAIL
 LOG_LEVEL = settings.LOG_LEVEL
+# cursor만 넘어오고 max_chars가 없을 때 사용할 기본 청크 크기
+MAX_BODY_CHUNK_CHARS = 2000
+WORKERS = settings.WORKERS
+HTTP_MODE = settings.HTTP_MODE.lower()
+
+if HTTP_MODE not in ("session", "stateless"):
+    raise ValueError(f"HTTP_MODE는 'session' 또는 'stateless' 이어야 합니다: {settings.HTTP_MODE}")
+
+# 왜: 멀티 워커에서는 세션 상태를 공유 저장소(Redis)에 두어야 어느 워커가 요청을 받아도 같은 상태를 본다.
+mcp = FastMCP(
+    "Demo FastMCP",
+    session_state_store=build_session_state_store(),
+    # 서버 시작/실행 동안의 작업(토큰 prewarm, 변경 알림 구독 갱신 등)
+    lifespan=token_prewarm_lifespan | subscription_lifespan | loop_monitor_lifespan | health_lifespan,
+)
+
+def _schedule_prefetch(my_email: str, emails: list[Message]) -> None:
+    """
+    목록 조회 결과 상위 메일의 상세를 백그라운드로 미리 캐시에 올린다(PREFETCH_ENABLED일 때만).
+    """
+    if not settings.PREFETCH_ENABLED or not emails:
+        return
+    try:
+        session_id = get_context().session_id
+    except RuntimeError:
+        session_id = None
+    prefetcher.schedule(my_email, [email.id for email in emails], session_id)
+
+
+# 도구별 text 형식 출력 필드 (라벨, 레코드 키)
+MAIL_WITH_SENDER_NAME_FIELDS = [
+    ("제목", "subject"),
+    ("보낸사람", lambda r: f"{r['sender_name']} <{r['sender']}>"),
+    ("받은시간", "received"),
+]
+MAIL_LIST_FIELDS = [
+    ("제목", "subject"),
+    ("message_id", "id"),
+    ("보낸사람", lambda r: r["sender"] or "알 수 없음"),
+    ("받은시간", "received"),
+]
+MAIL_SEARCH_FIELDS = [
+    ("제목", "subject"),
+    ("message_id", "id"),
+    ("보낸사람", "sender"),
+    ("받은시간", "received"),
+    ("미리보기", "preview"),
+]
+MAIL_BY_SENDER_FIELDS = [
+    ("제목", "subject"),
+    ("message_id", "id"),
+    ("받은시간", "received"),
+    ("미리보기", "preview"),
+]
+
+
+def _attachments_text(record: dict) -> str:
+    items = [f"{att['name']} ({format_size(att['size'])})" for att in record.get("attachments") or []]
+    return f"[{', '.join(items)}]" if items else "없음"
+
+
+MAIL_DETAIL_FIELDS = [
+    ("제목", "subject"),
+    ("발신자", "sender"),
+    ("수신일시", "received"),
+    ("첨부파일", _attachments_text),
+]
+
+
+EVENT_LIST_FIELDS = [
+    ("", "subject"),
+    ("id", "id"),
+    ("start", "start"),
+    ("end", "end"),
+    ("location", "location"),
+]
+EVENT_DETAIL_FIELDS = [
+    ("제목", "subject"),
+    ("시간", lambda r: f"{r['start']} ~ {r['end']}"),
+    ("장소", "location"),
+    ("주최자", "organizer"),
+    ("참석자", lambda r: ", ".join(filter(None, r["attendees"] or [])) or "없음"),
+]
 
-mcp = FastMCP("Demo FastMCP")
 
 @mcp.tool
 def add(a: int, b: int) -> int:
@@ -24,20 +142,102 @@ def add(a: int, b: int) -> int:
     return a + b
 
 @mcp.tool()
-def ping() -> str:
+async def ping() -> str:
     """
     서버가 정상적으로 구성 되었는지 확인하는 테스트 툴 입니다.
     """
-    token = get_access_token()
-    print(f"token: {token}")
+    # 왜: 토큰은 로그/응답에 남기지 않고 발급 여부만 알려준다. 로드밸런서 점검은 GET /healthz, /readyz를 쓴다.
+    await async_get_access_token()
 
-    return f"pong 메일 읽기 서버 준비 완료. (Client ID 로드 상태: {bool(AZURE_CLIENT_ID)} / token: {token:30} )"
+    return f"pong 메일 읽기 서버 준비 완료. (Client ID 로드 상태: {bool(AZURE_CLIENT_ID)} / 토큰 발급: 성공)"
+
+
+def _admin_denied(output_format: OutputFormat) -> str:
+    return render_notice(
+        "운영자 토큰이 올바르지 않거나 서버에 ADMIN_TOKEN이 설정되어 있지 않습니다.",
+        output_format=output_format,
+        status="forbidden",
+    )
 
 
 @mcp.tool()
-def search_my_emails(
+def profile_next_requests(
+    admin_token: Annotated[str, "운영자 토큰 (서버 설정 ADMIN_TOKEN 값)"],
+    count: Annotated[int, "프로파일링할 다음 HTTP 요청 수 (1에서 20 사이, 0이면 예약 취소)"] = 1,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+) -> str:
+    """
+    (운영자용) 이 워커가 받는 다음 N개 HTTP 요청을 cProfile로 측정하도록 예약합니다.
+
+    결과는 서버의 PROFILE_DIR에 <시각>-<request_id>.prof/.txt로 저장되고, 응답 헤더 x-profile-file로 파일 이름을 알려줍니다.
+    멀티 워커 환경에서는 이 호출을 처리한 워커에만 적용됩니다.
+    """
+    if not is_admin_token(admin_token):
+        return _admin_denied(output_format)
+    if not settings.PROFILING_ENABLED:
+        return render_notice(
+            "프로파일링이 꺼져 있습니다. PROFILING_ENABLED=true로 서버를 다시 시작하세요.",
+            output_format=output_format,
+            status="disabled",
+        )
+    armed = profiler.arm(max(0, min(count, 20)))
+    return render_notice(
+        f"다음 {armed}개 요청을 프로파일링합니다. 저장 위치: {settings.PROFILE_DIR}",
+        output_format=output_format,
+        status="ok",
+    )
+
+
+def _memory_report_text(report: dict) -> str:
+    rss = format_size(report["rss_bytes"]) if report["rss_bytes"] is not None else "알 수 없음"
+    budget = format_size(report["cache_budget_bytes"]) if report["cache_budget_bytes"] > 0 else "제한 없음"
+    lines = [
+        f"RSS: {rss}",
+        f"캐시 합계: {format_size(report['cache_total_bytes'])} / 예산 {budget}",
+    ]
+    lines += [f"  - {name}: {format_size(size)}" for name, size in report["caches"].items()]
+    lines += [SEPARATOR, "객체 수 상위:"]
+    lines += [f"  - {name}: {count:,}" for name, count in report["object_counts"].items()]
+    lines.append(SEPARATOR)
+    traced = report["tracemalloc"]
+    if traced is None:
+        lines.append("tracemalloc: 꺼짐 (trace=true로 켠 뒤 다시 조회하면 할당 상위 위치를 보여줍니다)")
+    else:
+        lines.append(f"tracemalloc: 현재 {format_size(traced['current_bytes'])}, 최대 {format_size(traced['peak_bytes'])}")
+        lines += [f"  - {item['location']}: {format_size(item['bytes'])} ({item['count']:,}개)" for item in traced["top"]]
+    return "\n".join(lines)
+
+
+@mcp.tool()
+async def get_memory_report(
+    admin_token: Annotated[str, "운영자 토큰 (서버 설정 ADMIN_TOKEN 값)"],
+    top: Annotated[int, "객체 수/할당 위치 상위 몇 개를 보여줄지 (1에서 50 사이, 기본값: 15)"] = 15,
+    trace: Annotated[Optional[bool], "true면 tracemalloc 할당 추적을 켜고, false면 끕니다. 비우면 현재 상태 유지"] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+) -> str:
+    """
+    (운영자용) 이 워커의 메모리 사용 현황(RSS, 캐시별 크기와 예산, 타입별 객체 수, tracemalloc 할당 상위 위치)을 조회합니다.
+
+    tracemalloc은 켜 둔 이후의 할당만 보이며, 켜져 있는 동안 모든 할당이 느려지므로 확인 후 trace=false로 끕니다.
+    """
+    # 왜: 보고에는 서버 파일 경로가 담기고 trace=true는 워커의 모든 할당을 느리게 하므로 운영자만 부를 수 있다.
+    if not is_admin_token(admin_token):
+        return _admin_denied(output_format)
+    if trace is not None:
+        set_tracing(trace)
+    # 왜: 모든 객체를 훑는 gc.get_objects()/tracemalloc 스냅샷이 이벤트 루프를 수백 ms씩 막지 않도록 스레드에서 만든다.
+    report = await asyncio.to_thread(memory_report, memory_budget, max(1, min(top, 50)))
+    if output_format == "json":
+        return to_json(report)
+    return _memory_report_text(report)
+
+
+@mcp.tool()
+async def search_my_emails(
     limit: Annotated[int, "가져올 이메일의 최대 개수 (1에서 50 사이의 정수, 기본값: 5)"] = 5,
-    my_email: Annotated[Optional[str], "메일을 조회할 사용자의 이메일 주소 (예: no-reply@microsoft.com). 특정인 지정이 없으면 비워둡니다."] = None
+    my_email: Annotated[Optional[str], "메일을 조회할 사용자의 이메일 주소 (예: no-reply@microsoft.com). 특정인 지정이 없으면 비워둡니다."] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     사용자의 최근 메일을 검색하여 읽어옵니다.
@@ -59,10 +259,7 @@ def search_my_emails(
         my_email=DEFAULT_USER_EMAIL
 
     try:
-        # 1. Access Token 발급 (캐시가 있으면 바로 가져옴)
-        token = get_access_token()
-
-        # 2. Microsoft Graph API 요청 설정
+        # 1. Microsoft Graph API 요청 설정
         # /me/messages: 내 메일함 엔드포인트
         # /user/{email_adress}/messages: email_adress 사용자의 메일주소
         # $top: 가져올 개수
@@ -72,44 +269,34 @@ def search_my_emails(
         # 받은 편지함 inbox로 조회하면 Outlook의 "규칙(Rules)" 으로 아동된 메일이 안됨
         # from/emailAddress/address ne '{my_email}' -> 보낸 사람이 '나'와 다른 경우만 조회 (즉, 수신 메일만)
         # 쿼리 파라미터로 처리하여 API 단계에서 거릅니다.
-        endpoint = (
-            f"https://graph.microsoft.com/v1.0/users/{my_email}/messages?"
-            f"$top={limit}&"
-            f"$filter=from/emailAddress/address ne '{my_email}'&"
-            f"$select=subject,sender,receivedDateTime"
-
-
-        )
-
-
-        headers = {
-            "Authorization" : f"Bearer {token}",
-            "Accept" : "application/json",
-            "ConsistencyLevel": "eventual"  # Optional: 실시간이 아닌 인덱싱으로 검색 = 데이터가 많은거 조회 할 때 넣는 옵션 속도는 향상되느 정확도가 떨어질 수 있으므로 빼도 됨
+        params = {
+            "$top": limit,
+            "$filter": f"from/emailAddress/address ne '{my_email}'",
+            "$select": "id,subject,sender,receivedDateTime",
         }
 
-        # 3. API 호출
-        response = requests.get(endpoint,headers=headers)
+        # 2. API 호출 (토큰 발급/HTTP timeout은 도구 호출 마감 시간 안에서만 기다린다)
+        # 왜: 동기 requests 호출은 이벤트 루프를 막고 클라이언트가 취소해도 끊을 수 없다.
+        response = await graph_request(
+            "GET",
+            f"/users/{my_email}/messages",
+            params=params,
+            # Optional: 실시간이 아닌 인덱싱으로 검색 = 데이터가 많은거 조회 할 때 넣는 옵션 속도는 향상되느 정확도가 떨어질 수 있으므로 빼도 됨
+            headers={"ConsistencyLevel": "eventual"},
+        )
         response.raise_for_status() # 에러 발생 시 예외 처리
 
-        print(json.dumps(response.json(), indent=2, ensure_ascii=False))
-
-        emails = response.json().get("value",[])
+        emails = decode_values(response.content, Message)
 
         # 5. LLM이 읽기 좋게 문자열로 포매팅
-        result_text = f"총 {len(emails)}개의 최근 메일을 찾았습니다:\n\n"
-        for i, email in enumerate(emails, 1):
-            sender_name = email.get("sender", {}).get("emailAddress", {}).get("name", "알 수 없음")
-            sender_address = email.get("sender", {}).get("emailAddress", {}).get("address", "")
-            subject = email.get("subject", "(제목 없음)")
-            received_time = email.get("receivedDateTime", "")
-
-            result_text += f"{i}. 제목: {subject}\n"
-            result_text += f"   보낸사람: {sender_name} <{sender_address}>\n"
-            result_text += f"   받은시간: {received_time}\n"
-            result_text += "-" * 30 + "\n"
-
-        return result_text
+        return render_list(
+            emails,
+            output_format=output_format,
+            fields=fields,
+            header=f"총 {len(emails)}개의 최근 메일을 찾았습니다:",
+            empty_message="총 0개의 최근 메일을 찾았습니다",
+            text_fields=MAIL_WITH_SENDER_NAME_FIELDS,
+        )
 
     except Exception as e:
         raise RuntimeError(f"메일 로드 실패: {str(e)}")
@@ -119,7 +306,9 @@ async def get_messages(
     folder: Annotated[str, "조회할 메일함 폴더 (예: 'inbox', 'sentitems', 'archive')"] = "inbox",
     top: Annotated[int, "조회 개수 (1~50, 기본값: 10)"] = 10,
     filter_query: Annotated[Optional[str], "OData 지원 필터링 문자열 (MS Graph API 호환). 예: 'receivedDateTime ge 2026-02-19T00:00:00Z', 'isRead eq false'"] = None,
-    my_email: Annotated[Optional[str], "메일을 조회할 사용자의 이메일 주소. 특정인 지정이 없으면 비워둡니다."] = None
+    my_email: Annotated[Optional[str], "메일을 조회할 사용자의 이메일 주소. 특정인 지정이 없으면 비워둡니다."] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     특정 폴더에서 메일 목록을 조회합니다. 필터링 조건을 적용할 수 있습니다.
@@ -133,6 +322,8 @@ async def get_messages(
         - top (int): 조회할 개수 (최대 50).
         - filter_query (str, optional): OData 쿼리 문자열.
         - my_email (str, optional): 대상 사용자 이메일.
+        - output_format (str, optional): "text" 또는 "json".
+        - fields (str, optional): json 형식에서 반환할 필드 (id,subject,sender,sender_name,received).
 
     Returns:
         str: 다음과 같은 메일 목록 요약 텍스트 형식입니다.
@@ -147,9 +338,6 @@ async def get_messages(
             my_email = DEFAULT_USER_EMAIL
 
         safe_top = max(1, min(top, 50))
-        token = get_access_token()
-
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/mailFolders/{folder}/messages"
 
         params = {
             "$top": safe_top,
@@ -160,37 +348,31 @@ async def get_messages(
         if filter_query:
             params["$filter"] = filter_query
 
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-            "ConsistencyLevel": "eventual",
-        }
-
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(endpoint, headers=headers, params=params)
+        response = await graph_request(
+            "GET",
+            f"/users/{my_email}/mailFolders/{folder}/messages",
+            params=params,
+            headers={"ConsistencyLevel": "eventual"},
+        )
 
         if response.status_code != 200:
-            return f"메일 목록 조회 실패(HTTP {response.status_code}): {response.text}"
-
-        emails = response.json().get("value", [])
-
-        if not emails:
-            return f"{folder} 폴더에 조건에 맞는 메일이 없습니다."
-
-        lines = [f"총 {len(emails)}개의 메일을 찾았습니다:\n"]
-        for idx, email in enumerate(emails, 1):
-            subject = email.get("subject", "(제목 없음)")
-            sender = email.get("sender", {}).get("emailAddress", {}).get("address", "알 수 없음")
-            received = email.get("receivedDateTime", "")
-            message_id = email.get("id", "")
+            return render_notice(
+                f"메일 목록 조회 실패(HTTP {response.status_code}): {response.text}",
+                output_format=output_format,
+                status="error",
+            )
 
-            lines.append(f"{idx}. 제목: {subject}")
-            lines.append(f"   message_id: {message_id}")
-            lines.append(f"   보낸사람: {sender}")
-            lines.append(f"   받은시간: {received}")
-            lines.append("-" * 30)
+        emails = decode_values(response.content, Message)
+        _schedule_prefetch(my_email, emails)
 
-        return "\n".join(lines)
+        return render_list(
+            emails,
+            output_format=output_format,
+            fields=fields,
+            header=f"총 {len(emails)}개의 메일을 찾았습니다:",
+            empty_message=f"{folder} 폴더에 조건에 맞는 메일이 없습니다.",
+            text_fields=MAIL_LIST_FIELDS,
+        )
 
     except Exception as e:
         raise RuntimeError(f"메일 목록 조회 실패: {str(e)}")
@@ -199,7 +381,12 @@ async def get_messages(
 @mcp.tool()
 async def get_message_detail_by_id(
     message_id: Annotated[str, "조회할 원본 메일의 고유 ID. get_messages나 search_emails를 통해 얻은 목록 중 하나를 선택하여 입력합니다."],
-    my_email: Annotated[Optional[str], "메일을 조회할 사용자의 이메일 주소. 특정인 지정이 없으면 비워둡니다."] = None
+    my_email: Annotated[Optional[str], "메일을 조회할 사용자의 이메일 주소. 특정인 지정이 없으면 비워둡니다."] = None,
+    max_chars: Annotated[Optional[int], "본문 최대 글자 수. 지정하면 인용된 이전 메일/서명을 제거하고 이 길이만큼만 반환하며, 남은 본문은 cursor로 이어서 조회합니다."] = None,
+    cursor: Annotated[Optional[str], "이전 호출 결과의 '다음 cursor' 값. 본문의 다음 청크를 조회할 때 max_chars와 함께 입력합니다."] = None,
+    strip_quotes: Annotated[bool, "max_chars 사용 시 인용된 이전 메일/서명 제거 여부 (기본값: True)"] = True,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     특정 원본 메일의 고유 ID를 이용해 해당 이메일의 전체 세부 정보와 첨부파일 메타데이터를 조회합니다.
@@ -207,10 +394,16 @@ async def get_message_detail_by_id(
     [LLM 에이전트 사용 가이드]
     1. 단일 메일을 상세히 읽어야 할 때 (예: 답장 작성 전 내용 분석, 긴 일러두기 파악, 첨부파일 유무 확인) 사용합니다.
     2. 이 도구를 호출하기 전에 먼저 `get_messages` 혹은 `search_emails` 도구를 사용하여 목록에서 원하는 메일의 `message_id`를 알아내야 합니다.
+    3. 긴 스레드는 `max_chars`(예: 2000)를 지정해 앞부분만 읽고, 더 필요할 때만 결과의 `다음 cursor`로 이어서 조회합니다.
 
     Args:
         - message_id (str): 대상 메일 고유 ID.
         - my_email (str, optional): 대상 사용자 이메일.
+        - max_chars (int, optional): 본문 최대 글자 수.
+        - cursor (str, optional): 다음 청크 조회용 cursor.
+        - strip_quotes (bool, optional): 인용/서명 제거 여부.
+        - output_format (str, optional): "text" 또는 "json".
+        - fields (str, optional): json 형식에서 반환할 필드 (id,subject,sender,received,attachments,body,next_cursor).
 
     Returns:
         str: 다음과 같이 반환됩니다.
@@ -220,61 +413,67 @@ async def get_message_detail_by_id(
              첨부파일: [보고서.pdf (2.3MB)]
              본문:
              (긴 스레드의 전체 텍스트 본문 내용...)
+             max_chars 사용 시 본문 뒤에 "다음 cursor: ..." 줄이 붙습니다(남은 본문이 없으면 생략).
     """
     try:
         if my_email is None or my_email == "":
             my_email = DEFAULT_USER_EMAIL
 
-        token = get_access_token()
-
-        # 본문을 텍스트로 바로 받기 위해 Prefer: outlook.body-content-type="text" 헤더 활용
-        # 첨부파일 메타데이터 조회를 위해 /attachments 확장 사용
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/messages/{message_id}?$expand=attachments($select=name,size)"
+        offset = 0
+        if cursor:
+            try:
+                offset, strip_quotes = decode_cursor(cursor, message_id)
+            except ValueError as e:
+                return render_notice(str(e), output_format=output_format, status="invalid_argument")
+
+        if settings.PREFETCH_ENABLED and not cursor:
+            prefetcher.record_access(my_email, message_id)
+
+        # 왜: 본문은 메일당 한 번만 받아 가공하고, 청크 조회/재조회는 캐시에서 처리한다.
+        email = await load_message_detail(my_email, message_id)
+        if email is None:
+            return render_notice(
+                f"해당 메일을 찾을 수 없습니다. message_id를 확인해주세요: {message_id}",
+                output_format=output_format,
+            )
 
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-            "Prefer": 'outlook.body-content-type="text"'
+        if max_chars is None and cursor is None:
+            body_content = email["body"]
+            next_offset = None
+        else:
+            budget = max(1, max_chars or MAX_BODY_CHUNK_CHARS)
+            full_text = email["clean_body"] if strip_quotes else email["body"]
+            body_content, next_offset = chunk_text(full_text, offset, budget)
+
+        record = {
+            "id": email["id"],
+            "subject": email["subject"],
+            "sender": email["sender"],
+            "received": email["received"],
+            "attachments": email["attachments"],
+            "body": body_content,
+            "offset": offset if cursor else None,
+            "next_cursor": encode_cursor(message_id, next_offset, strip_quotes) if next_offset is not None else None,
         }
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(endpoint, headers=headers)
+        if output_format != "text":
+            return render_detail(record, output_format=output_format, fields=fields, text_fields=[])
 
-        if response.status_code == 404:
-            return f"해당 메일을 찾을 수 없습니다. message_id를 확인해주세요: {message_id}"
-
-        response.raise_for_status()
+        if cursor:
+            # 이어 읽기 청크는 헤더를 반복하지 않아 payload를 줄인다.
+            result_text = f"본문 (계속, {offset}자 이후):\n{body_content}"
+        else:
+            result_text = render_detail(
+                record,
+                output_format=output_format,
+                fields=fields,
+                text_fields=MAIL_DETAIL_FIELDS,
+                body_label="본문",
+                body_key="body",
+            )
 
-        email = response.json()
-
-        subject = email.get("subject", "(제목 없음)")
-        sender = email.get("sender", {}).get("emailAddress", {}).get("address", "알 수 없음")
-        received = email.get("receivedDateTime", "")
-        body_content = email.get("body", {}).get("content", "")
-
-        attachments_info = []
-        if email.get("hasAttachments", False):
-            attachments = email.get("attachments", [])
-            for att in attachments:
-                name = att.get("name", "Unknown")
-                size = att.get("size", 0)
-                if size >= 1024 * 1024:
-                    size_str = f"{size / (1024 * 1024):.1f}MB"
-                elif size >= 1024:
-                    size_str = f"{size / 1024:.1f}KB"
-                else:
-                    size_str = f"{size}B"
-                attachments_info.append(f"{name} ({size_str})")
-
-        att_str = f"[{', '.join(attachments_info)}]" if attachments_info else "없음"
-
-        result_text = f"제목: {subject}\n"
-        result_text += f"발신자: {sender}\n"
-        result_text += f"수신일시: {received}\n"
-        result_text += f"첨부파일: {att_str}\n"
-        result_text += "-" * 30 + "\n"
-        result_text += "본문:\n"
-        result_text += body_content
+        if record["next_cursor"]:
+            result_text = result_text.rstrip("\n") + f"\n\n다음 cursor: {record['next_cursor']}"
 
         return result_text
 
@@ -282,9 +481,98 @@ async def get_message_detail_by_id(
         raise RuntimeError(f"메일 상세 조회 실패: {str(e)}")
 
 
+@mcp.tool()
+async def get_conversation_thread(
+    message_id: Annotated[Optional[str], "스레드에 속한 메일 하나의 message_id (conversation_id를 모를 때 사용)"] = None,
+    conversation_id: Annotated[Optional[str], "스레드(conversationId). 알고 있으면 message_id 대신 사용"] = None,
+    my_email: Annotated[Optional[str], "메일을 조회할 사용자의 이메일 주소. 특정인 지정이 없으면 비워둡니다."] = None,
+    limit: Annotated[int, "가져올 최근 메일 수(1~50). 스레드가 더 길면 가장 최근 메일만 가져옵니다"] = 25,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
+) -> str:
+    """
+    메일 스레드 전체를 한 번에 시간순으로 조회합니다. 각 메일에서 앞선 메일의 인용 내용은 제거됩니다.
+
+    [LLM 에이전트 사용 가이드]
+    1. 스레드(회신 흐름)를 읽어야 할 때 메일마다 get_message_detail_by_id를 반복 호출하지 말고 이 도구를 사용합니다.
+    2. message_id 또는 conversation_id 중 하나는 반드시 필요합니다.
+
+    Args:
+        - message_id (str, optional): 스레드에 속한 메일 ID
+        - conversation_id (str, optional): 스레드 ID
+        - my_email (str, optional): 대상 사용자 이메일
+        - limit (int, optional): 가져올 최근 메일 수. 스레드가 더 길면 잘렸다는 안내(json은 truncated=true)가 붙습니다.
+
+    Returns:
+        str: [순번] 보낸사람 / 받은시간 / message_id 와 인용이 제거된 본문이 시간순으로 이어진 텍스트
+    """
+    try:
+        if my_email is None or my_email == "":
+            my_email = DEFAULT_USER_EMAIL
+
+        if not conversation_id:
+            if not message_id:
+                return render_notice(
+                    "message_id 또는 conversation_id 중 하나는 필요합니다.",
+                    output_format=output_format,
+                    status="invalid_argument",
+                )
+            # 상세 캐시에 conversation_id가 있으므로 이미 읽은 메일이면 Graph 호출 없이 찾는다.
+            detail = await load_message_detail(my_email, message_id)
+            if detail is None or not detail.get("conversation_id"):
+                return render_notice(
+                    f"해당 메일을 찾을 수 없습니다. message_id를 확인해주세요: {message_id}",
+                    output_format=output_format,
+                )
+            conversation_id = detail["conversation_id"]
+
+        messages, truncated = await fetch_conversation(my_email, conversation_id, max(1, min(limit, 50)))
+        deduped = dedupe_thread_bodies([message.body or "" for message in messages])
+
+        records = [
+            {
+                "id": message.id,
+                "subject": message.subject,
+                "sender": message.sender,
+                "sender_name": message.sender_name,
+                "received": message.received,
+                "body": body,
+                "removed_lines": removed_lines,
+            }
+            for message, (body, removed_lines) in zip(messages, deduped)
+        ]
+
+        if output_format == "json":
+            return to_json(
+                {
+                    "conversation_id": conversation_id,
+                    "count": len(records),
+                    "truncated": truncated,
+                    "items": [project(r, parse_fields(fields)) for r in records],
+                }
+            )
+
+        if not records:
+            return "해당 스레드의 메일을 찾을 수 없습니다."
+
+        lines = [f"스레드 메일 {len(records)}개 (제목: {records[0]['subject']})\n"]
+        if truncated:
+            lines.insert(0, f"스레드에 메일이 더 있어 가장 최근 {len(records)}개만 보여줍니다. 더 보려면 limit을 늘리세요(최대 50).")
+        for idx, record in enumerate(records, 1):
+            lines.append(f"[{idx}] {record['sender_name']} <{record['sender']}> / {record['received']} / message_id: {record['id']}")
+            lines.append(record["body"] or "(새 내용 없음)")
+            lines.append(SEPARATOR)
+        return "\n".join(lines)
+
+    except Exception as e:
+        raise RuntimeError(f"메일 스레드 조회 실패: {str(e)}")
+
+
 @mcp.tool()
 async def search_unread_mail(
-    my_email: Annotated[Optional[str], "메일을 조회할 사용자의 이메일 주소 (예: no-reply@microsoft.com). 특정인 지정이 없으면 비워둡니다."] = None
+    my_email: Annotated[Optional[str], "메일을 조회할 사용자의 이메일 주소 (예: no-reply@microsoft.com). 특정인 지정이 없으면 비워둡니다."] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     사용자의 최근 메일을 검색하여 읽어옵니다.
@@ -305,57 +593,40 @@ async def search_unread_mail(
         if my_email == None or my_email=="":
             my_email=DEFAULT_USER_EMAIL
 
-        # 1. Access Token 발급 (캐시가 있으면 바로 가져옴)
-        token = get_access_token()
-
-        # 2. Microsoft Graph API 요청 설정
-        # URL 설명:
+        # 1. Microsoft Graph API 요청 설정
+        # 파라미터 설명:
         # $filter=isRead eq false : 읽지 않은(false) 메일만 필터링
-        # $top={limit} : 최대 n개만 가져오기
         # $select=... : 필요한 필드만 선택 (성능 최적화)
         # $orderby=receivedDateTime desc : 최신순 정렬 (기본값이지만 명시적으로 적는 것이 좋음)
-        endpoint = (
-            f"https://graph.microsoft.com/v1.0/users/{my_email}/messages?"
-            f"$filter=isRead eq false&"
-            f"$select=subject,sender,receivedDateTime,isRead&"
-            f"$orderby=receivedDateTime desc"
-        )
-
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "ConsistencyLevel": "eventual" # Optional: 실시간이 아닌 인덱싱으로 검색 = 데이터가 많은거 조회 할 때 넣는 옵션 속도는 향상되느 정확도가 떨어질 수 있으므로 빼도 됨
+        params = {
+            "$filter": "isRead eq false",
+            "$select": "id,subject,sender,receivedDateTime,isRead",
+            "$orderby": "receivedDateTime desc",
         }
 
-        # 3. API 호출
-        async with httpx.AsyncClient() as client:
-            response = await client.get(endpoint, headers=headers)
+        # 2. API 호출 (토큰은 graph_client가 캐시에서 붙인다)
+        # 왜: 공유 메일함의 안 읽은 메일 목록처럼 여러 세션이 동시에 같은 조회를 하면 HTTP 호출 하나를 공유한다.
+        response = await graph_request(
+            "GET",
+            f"/users/{my_email}/messages",
+            params=params,
+            # Optional: 실시간이 아닌 인덱싱으로 검색 = 데이터가 많은거 조회 할 때 넣는 옵션 속도는 향상되느 정확도가 떨어질 수 있으므로 빼도 됨
+            headers={"ConsistencyLevel": "eventual"},
+        )
 
         if response.status_code == 200:
-
-            print(json.dumps(response.json(), indent=2, ensure_ascii=False))
-
-            emails = response.json().get("value",[])
-
-            if len(emails)==0:
-                return "읽지 않은 메일이 없습니다."
-
-            result_text = f"총 {len(emails)}개의 최근 메일을 찾았습니다:\n\n"
-            for i, email in enumerate(emails, 1):
-                sender_name = email.get("sender", {}).get("emailAddress", {}).get("name", "알 수 없음")
-                sender_address = email.get("sender", {}).get("emailAddress", {}).get("address", "")
-                subject = email.get("subject", "(제목 없음)")
-                received_time = email.get("receivedDateTime", "")
-
-                result_text += f"{i}. 제목: {subject}\n"
-                result_text += f"   보낸사람: {sender_name} <{sender_address}>\n"
-                result_text += f"   받은시간: {received_time}\n"
-                result_text += "-" * 30 + "\n"
-
-            return result_text
+            emails = decode_values(response.content, Message)
+
+            return render_list(
+                emails,
+                output_format=output_format,
+                fields=fields,
+                header=f"총 {len(emails)}개의 최근 메일을 찾았습니다:",
+                empty_message="읽지 않은 메일이 없습니다.",
+                text_fields=MAIL_WITH_SENDER_NAME_FIELDS,
+            )
         else:
             # 에러 처리
-            print(f"Error: {response.status_code}, {response.text}")
             response.raise_for_status() # 에러 발생 시 예외 처리
 
     except Exception as e:
@@ -368,6 +639,8 @@ async def search_emails_by_keyword(
     keyword: Annotated[str, "검색할 키워드(예: invoice, 회의, 장애)"],
     limit: Annotated[int, "조회 개수(1~50)"] = 10,
     my_email: Annotated[Optional[str], "조회할 사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     키워드 기반으로 사용자의 최근 메일을 검색하여 읽어옵니다.
@@ -391,51 +664,36 @@ async def search_emails_by_keyword(
 
         clean_keyword = keyword.strip()
         if not clean_keyword:
-            return "keyword는 비어 있을 수 없습니다."
+            return render_notice("keyword는 비어 있을 수 없습니다.", output_format=output_format, status="invalid_argument")
 
         safe_limit = max(1, min(limit, 50))
-        token = get_access_token()
 
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/messages"
         params = {
             # 왜: $search는 따옴표로 감싼 검색어를 요구하므로 쿼리 문자열을 명시적으로 구성한다.
             "$search": f"\"{clean_keyword}\"",
             "$top": safe_limit,
             "$select": "id,subject,sender,receivedDateTime,bodyPreview",
         }
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
+        response = await graph_request(
+            "GET",
+            f"/users/{my_email}/messages",
+            params=params,
             # 왜: Graph에서 $search 사용 시 ConsistencyLevel 헤더가 필요하다.
-            "ConsistencyLevel": "eventual",
-        }
-
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(endpoint, headers=headers, params=params)
+            headers={"ConsistencyLevel": "eventual"},
+        )
 
         response.raise_for_status()
-        emails = response.json().get("value", [])
-
-        if not emails:
-            return f"'{clean_keyword}' 키워드로 검색된 메일이 없습니다."
-
-        lines = [f"키워드 '{clean_keyword}' 검색 결과: {len(emails)}건\n"]
-        for idx, email in enumerate(emails, 1):
-            subject = email.get("subject", "(제목 없음)")
-            sender = email.get("sender", {}).get("emailAddress", {}).get("address", "")
-            received = email.get("receivedDateTime", "")
-            message_id = email.get("id", "")
-            preview = (email.get("bodyPreview", "") or "").replace("\n", " ").strip()
-            preview = preview[:120]
-
-            lines.append(f"{idx}. 제목: {subject}")
-            lines.append(f"   message_id: {message_id}")
-            lines.append(f"   보낸사람: {sender}")
-            lines.append(f"   받은시간: {received}")
-            lines.append(f"   미리보기: {preview}")
-            lines.append("-" * 30)
+        emails = decode_values(response.content, Message)
+        _schedule_prefetch(my_email, emails)
 
-        return "\n".join(lines)
+        return render_list(
+            emails,
+            output_format=output_format,
+            fields=fields,
+            header=f"키워드 '{clean_keyword}' 검색 결과: {len(emails)}건",
+            empty_message=f"'{clean_keyword}' 키워드로 검색된 메일이 없습니다.",
+            text_fields=MAIL_SEARCH_FIELDS,
+        )
 
     except httpx.HTTPStatusError as e:
         raise RuntimeError(
@@ -450,6 +708,8 @@ async def search_emails_by_sender(
     sender_email: Annotated[str, "조회할 발신자 이메일 (예: user@company.com)"],
     limit: Annotated[int, "조회 개수(1~50)"] = 10,
     my_email: Annotated[Optional[str], "조회할 사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     사용자의 메일함에서 특정 발신자가 보낸 메일을 조회합니다.
@@ -461,53 +721,37 @@ async def search_emails_by_sender(
 
         clean_sender = sender_email.strip().lower()
         if not clean_sender:
-            return "sender_email은 비어 있을 수 없습니다."
+            return render_notice("sender_email은 비어 있을 수 없습니다.", output_format=output_format, status="invalid_argument")
 
         safe_limit = max(1, min(limit, 50))
-        token = get_access_token()
 
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/messages"
         params = {
             "$top": safe_limit,
             # "$orderby": "receivedDateTime desc",
             "$select": "id,subject,sender,receivedDateTime,bodyPreview",
             "$filter": f"from/emailAddress/address eq '{clean_sender}'",
         }
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-        }
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(endpoint, headers=headers, params=params)
+        response = await graph_request("GET", f"/users/{my_email}/messages", params=params)
 
         response.raise_for_status()
-        emails = response.json().get("value", [])
-
-        if not emails:
-            return f"발신자 '{clean_sender}' 메일이 없습니다."
+        emails = decode_values(response.content, Message)
 
         # 왜: Graph orderby를 제거했으므로 최신순은 애플리케이션에서 명시적으로 보장
         emails = sorted(
             emails,
-            key=lambda x: x.get("receivedDateTime", ""),
+            key=lambda x: x.received,
             reverse=True,
         )[:safe_limit]
 
-        lines = [f"발신자 '{clean_sender}' 메일 {len(emails)}건\n"]
-        for i, email in enumerate(emails, 1):
-            subject = email.get("subject", "(제목 없음)")
-            message_id = email.get("id", "")
-            received = email.get("receivedDateTime", "")
-            preview = (email.get("bodyPreview", "") or "").replace("\n", " ").strip()[:120]
-
-            lines.append(f"{i}. 제목: {subject}")
-            lines.append(f"   message_id: {message_id}")
-            lines.append(f"   받은시간: {received}")
-            lines.append(f"   미리보기: {preview}")
-            lines.append("-" * 30)
-
-        return "\n".join(lines)
+        return render_list(
+            emails,
+            output_format=output_format,
+            fields=fields,
+            header=f"발신자 '{clean_sender}' 메일 {len(emails)}건",
+            empty_message=f"발신자 '{clean_sender}' 메일이 없습니다.",
+            text_fields=MAIL_BY_SENDER_FIELDS,
+        )
 
     except httpx.HTTPStatusError as e:
         raise RuntimeError(
@@ -516,6 +760,86 @@ async def search_emails_by_sender(
     except Exception as e:
         raise RuntimeError(f"발신자 메일 조회 실패: {str(e)}")
 
+@mcp.tool()
+async def search_emails_across_mailboxes(
+    keyword: Annotated[str, "검색할 키워드(예: 장애, incident)"],
+    mailboxes: Annotated[str, "검색할 메일함 주소 목록(콤마 구분, 예: a@company.com,b@company.com)"],
+    limit_per_mailbox: Annotated[int, "메일함당 조회 개수(1~50)"] = 10,
+    total_limit: Annotated[int, "병합 후 반환할 전체 개수(1~200)"] = 50,
+    timeout_seconds: Annotated[Optional[float], "메일함당 타임아웃(초). 비우면 서버 기본값 사용"] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
+) -> str:
+    """
+    여러 메일함에서 같은 키워드를 동시에 검색해 수신시간 최신순으로 합쳐서 돌려줍니다.
+
+    [LLM 에이전트 사용 가이드]
+    1. 팀 메일함 여러 개에서 장애/키워드를 한 번에 확인해야 할 때, 메일함마다 search_emails_by_keyword를 반복 호출하지 말고 이 도구를 사용합니다.
+    2. 일부 메일함이 실패하거나 타임아웃이어도 나머지 결과는 반환되며, 실패한 메일함은 결과 하단에 표시됩니다.
+
+    Args:
+        - keyword (str): 검색 키워드
+        - mailboxes (str): 콤마(,)로 구분된 메일함 주소 목록
+        - limit_per_mailbox (int, optional): 메일함당 조회 개수
+        - total_limit (int, optional): 병합 후 전체 반환 개수
+        - timeout_seconds (float, optional): 메일함당 타임아웃(초)
+
+    Returns:
+        str: 메일함/제목/message_id/보낸사람/받은시간/미리보기 목록과 실패한 메일함 목록
+    """
+    try:
+        clean_keyword = keyword.strip()
+        if not clean_keyword:
+            return render_notice("keyword는 비어 있을 수 없습니다.", output_format=output_format, status="invalid_argument")
+
+        # 왜: 같은 메일함이 중복 입력되면 같은 검색을 두 번 하게 되므로 순서를 유지한 채 중복을 제거한다.
+        mailbox_list = list(dict.fromkeys(m.strip().lower() for m in mailboxes.split(",") if m.strip()))
+        if not mailbox_list:
+            return render_notice("mailboxes는 비어 있을 수 없습니다.", output_format=output_format, status="invalid_argument")
+        if len(mailbox_list) > settings.FANOUT_MAX_MAILBOXES:
+            return render_notice(
+                f"한 번에 검색할 수 있는 메일함은 최대 {settings.FANOUT_MAX_MAILBOXES}개입니다.",
+                output_format=output_format,
+                status="invalid_argument",
+            )
+
+        emails, failures = await fan_out_search(
+            mailbox_list,
+            clean_keyword,
+            limit_per_mailbox=max(1, min(limit_per_mailbox, 50)),
+            total_limit=max(1, min(total_limit, 200)),
+            max_concurrency=settings.FANOUT_MAX_CONCURRENCY,
+            timeout_seconds=timeout_seconds or settings.FANOUT_TIMEOUT_SECONDS,
+        )
+
+        records = [{"mailbox": email["mailbox"], **Message.from_graph(email)} for email in emails]
+
+        if output_format == "json":
+            return to_json(
+                {
+                    "count": len(records),
+                    "items": [project(r, parse_fields(fields)) for r in records],
+                    "failed_mailboxes": failures,
+                }
+            )
+
+        result_text = render_list(
+            records,
+            output_format=output_format,
+            fields=fields,
+            header=f"키워드 '{clean_keyword}' 메일함 {len(mailbox_list)}개 검색 결과: {len(records)}건",
+            empty_message=f"'{clean_keyword}' 키워드로 검색된 메일이 없습니다.",
+            text_fields=[("메일함", "mailbox"), *MAIL_SEARCH_FIELDS],
+        )
+        if failures:
+            failed = "\n".join(f"- {mailbox}: {reason}" for mailbox, reason in failures.items())
+            result_text += f"\n\n조회 실패 메일함 {len(failures)}개 (부분 결과):\n{failed}"
+        return result_text
+
+    except Exception as e:
+        raise RuntimeError(f"다중 메일함 검색 실패: {str(e)}")
+
+
 @mcp.tool()
 async def send_my_email(
     to_address: Annotated[str,"받는 사람의 이메일주소 입니다. 만약 받는사람이 여려명일 경우 콤마(.)로 구분합니다. (예: abc@company.com,def@compay.com). \n이 필드는 반드시 채워야 하는 **필수값**입니다. "],
@@ -523,6 +847,8 @@ async def send_my_email(
     body: Annotated[str,"발송할 메일의 본문 내용입니다. 본문 내용의 줄바꿈 문자는 '\n'으로 작성되어야 합니다. \n이 필드는 반드시 채워야 하는 **필수값**입니다."],
     my_email: Annotated[str,"보내는 사람(나)의 이메일주소 입니다. (예: no-reply@microsoft.com). \n특정 사용자가 지정되어 있지 않으면 이 필드는 비워둡니다."]=None,
     cc_address: Annotated[str,"참조자(CC)의 이메일 주소 입니다. 만약 참조자가 여려명일 경우 콤마(.)로 구분합니다. (예: abc@company.com,def@compay.com). \n참조자가 특정되어 있지 않으면 이 필드는 비워둡니다."]=None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     사용자의 메일주소로 다른 사람에게 메일을 보내는 도구입니다.
@@ -548,9 +874,6 @@ async def send_my_email(
         RuntimeError: 네트워크 오류나 API 인증 실패 시 발생합니다.
     """
 
-    # token 가져오기
-    token = get_access_token()
-
     if my_email is None or my_email=="":
         my_email=DEFAULT_USER_EMAIL
 
@@ -570,8 +893,6 @@ async def send_my_email(
                     }
                 }
             )
-    print(f"to_address:{to_address}")
-    print(f"to_address_list:{to_address_list}")
 
     # payload 구성
     message = {
@@ -597,8 +918,6 @@ async def send_my_email(
                         }
                     }
                 )
-        print(f"cc_address:{cc_address}")
-        print(f"cc_address_list:{cc_address_list}")
 
         # CC 주소가 있으면 추가
         if cc_address_list:
@@ -609,29 +928,32 @@ async def send_my_email(
         "saveToSentItems": True
     }
 
-    # endpoint 구성
-    endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/sendMail"
+    # 왜: 토큰 발급/HTTP timeout을 도구 호출 마감 시간 안으로 묶기 위해 graph_client를 거친다(기존엔 timeout 없음).
     headers = {
-        "Authorization": f"Bearer {token}",
         "Content-Type": "application/json; charset=utf-8",
         "User-Agent": "Leodev901-Corp-Internal-Mailer/1.0 (for Business)"
     }
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                endpoint,
-                headers=headers,
-                json=payload
+        response = await graph_request("POST", f"/users/{my_email}/sendMail", headers=headers, json=payload)
+        # 202 Accepted 체크
+        if response.status_code == 202:
+            mark_write_done()
+            return render_message(
+                {
+                    "status": "sent",
+                    "to": [r["emailAddress"]["address"] for r in to_address_list],
+                    "cc": [r["emailAddress"]["address"] for r in message.get("ccRecipients", [])] or None,
+                    "subject": subject,
+                },
+                output_format=output_format,
+                fields=fields,
+                text=f"성공적으로 메일을 보냈습니다.\n- 받는사람: {to_address}\n- 제목: {subject}",
             )
-            print(response)
-            # 202 Accepted 체크
-            if response.status_code == 202:
-                return f"성공적으로 메일을 보냈습니다.\n- 받는사람: {to_address}\n- 제목: {subject}"
-            else:
-                # 에러 발생 시 상세 내용 확인을 위해 raise
-                response.raise_for_status()
-                return "메일 발송 요청이 처리되었으나, 오류가 발생하였습니다."
+        else:
+            # 에러 발생 시 상세 내용 확인을 위해 raise
+            response.raise_for_status()
+            return "메일 발송 요청이 처리되었으나, 오류가 발생하였습니다."
     except httpx.HTTPStatusError as e:
         # HTTP 에러 (4xx, 5xx) 처리
         raise RuntimeError(f"메일 발송 HTTP 에러: {e.response.text}")
@@ -646,7 +968,9 @@ async def create_draft(
     body: Annotated[str, "메일 본문 (HTML 지원)"],
     to_address: Annotated[str, "수신자 메일 주소 목록 (CSV 형태, 예: abc@company.com,def@company.com)"],
     cc_address: Annotated[Optional[str], "참조자 메일 주소 목록 (CSV 형태)"] = None,
-    my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None
+    my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     이메일을 발송하지 않고 임시 보관함(Drafts)에 초안으로 저장합니다.
@@ -669,8 +993,6 @@ async def create_draft(
         if my_email is None or my_email == "":
             my_email = DEFAULT_USER_EMAIL
 
-        token = get_access_token()
-
         text_body = f"{body}\n<br>본 메일 초안은 MCP에 의하여 작성되었습니다."
 
         to_address_list = []
@@ -697,17 +1019,22 @@ async def create_draft(
             if cc_address_list:
                 message["ccRecipients"] = cc_address_list
 
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/messages"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
-
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(endpoint, headers=headers, json=message)
+        response = await graph_request("POST", f"/users/{my_email}/messages", json=message)
 
         if response.status_code == 201:
-            return f"임시 보관함에 초안이 성공적으로 저장되었습니다. (제목: {subject}, 수신자: {to_address}). Outlook에서 확인 후 발송해주세요."
+            mark_write_done()
+            created = response.json()
+            return render_message(
+                {
+                    "status": "draft_created",
+                    "id": created.get("id"),
+                    "subject": subject,
+                    "to": [r["emailAddress"]["address"] for r in to_address_list],
+                },
+                output_format=output_format,
+                fields=fields,
+                text=f"임시 보관함에 초안이 성공적으로 저장되었습니다. (제목: {subject}, 수신자: {to_address}). Outlook에서 확인 후 발송해주세요.",
+            )
         else:
             response.raise_for_status()
             return "초안 저장 중 오류가 발생했습니다."
@@ -721,7 +1048,9 @@ async def reply_to_email(
     message_id: Annotated[str, "원본 메일의 고유 ID (앞서 get_messages나 search_emails로 획득한 값)"],
     comment: Annotated[str, "회신할 본문 내용 (HTML 지원)"],
     reply_all: Annotated[bool, "전체 회신 여부 (기본값: False)"] = False,
-    my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None
+    my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     기존 메일 스레드에 답장을 보냅니다.
@@ -744,26 +1073,22 @@ async def reply_to_email(
         if my_email is None or my_email == "":
             my_email = DEFAULT_USER_EMAIL
 
-        token = get_access_token()
-
         action = "replyAll" if reply_all else "reply"
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/messages/{message_id}/{action}"
-
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
-
         # reply API requires a 'message' object which only contains 'comment'
         payload = {
             "comment": comment
         }
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(endpoint, headers=headers, json=payload)
+        response = await graph_request("POST", f"/users/{my_email}/messages/{message_id}/{action}", json=payload)
 
         if response.status_code == 202:
-            return f"해당 스레드에 성공적으로 회신했습니다. (원본 메일 ID: {message_id})"
+            mark_write_done()
+            return render_message(
+                {"status": "replied", "message_id": message_id, "reply_all": reply_all},
+                output_format=output_format,
+                fields=fields,
+                text=f"해당 스레드에 성공적으로 회신했습니다. (원본 메일 ID: {message_id})",
+            )
         else:
             response.raise_for_status()
             return "메일 회신 중 오류가 발생했습니다."
@@ -775,7 +1100,9 @@ async def reply_to_email(
 @mcp.tool()
 async def get_attachments(
     message_id: Annotated[str, "첨부파일을 확인할 원본 메일의 고유 ID. 반드시 hasAttachments 필드가 true인 메일 ID를 입력해야 합니다."],
-    my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None
+    my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     특정 이메일에 포함된 첨부파일의 메타데이터(이름, 크기 등) 목록을 조회합니다.
@@ -795,54 +1122,282 @@ async def get_attachments(
         if my_email is None or my_email == "":
             my_email = DEFAULT_USER_EMAIL
 
-        token = get_access_token()
-
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/messages/{message_id}/attachments"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-        }
-
         params = {
             "$select": "name,size,contentType"
         }
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(endpoint, headers=headers, params=params)
+        response = await graph_request(
+            "GET", f"/users/{my_email}/messages/{message_id}/attachments", params=params
+        )
 
         response.raise_for_status()
-        attachments = response.json().get("value", [])
-
-        if not attachments:
-            return "이 메일에는 다운로드할 수 있는 첨부파일이 없습니다."
-
-        results = []
-        for att in attachments:
-            name = att.get("name", "Unknown")
-            size = att.get("size", 0)
-
-            if size >= 1024 * 1024:
-                size_str = f"{size / (1024 * 1024):.1f}MB"
-            elif size >= 1024:
-                size_str = f"{size / 1024:.1f}KB"
-            else:
-                size_str = f"{size}B"
+        # 분류(확장자)는 Attachment 모델이 이름에서 추출한다.
+        records = decode_values(response.content, Attachment)
 
-            # 분류(확장자) 추출
-            ext = name.split('.')[-1].upper() if '.' in name else "알 수 없음"
+        if output_format == "json":
+            return render_list(records, output_format=output_format, fields=fields, header="", empty_message="", text_fields=[])
 
-            results.append(f"{name} (분류: {ext}, 크기: {size_str})")
+        if not records:
+            return "이 메일에는 다운로드할 수 있는 첨부파일이 없습니다."
 
+        results = [f"{r['name']} (분류: {r['extension']}, 크기: {format_size(r['size'])})" for r in records]
         return "[\n  " + ",\n  ".join(f'"{r}"' for r in results) + "\n]"
 
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
-            return "지정한 메일을 찾을 수 없거나 첨부파일에 접근할 수 없습니다."
+            return render_notice("지정한 메일을 찾을 수 없거나 첨부파일에 접근할 수 없습니다.", output_format=output_format)
         raise RuntimeError(f"첨부파일 조회 실패(HTTP {e.response.status_code}): {e.response.text}")
     except Exception as e:
         raise RuntimeError(f"첨부파일 조회 실패: {str(e)}")
 
 
+def _export_state_text(record: dict) -> str:
+    if record["running"]:
+        return "진행 중"
+    if record["completed"]:
+        return "완료(다시 시작하면 이후 새 메일만 이어서 받음)"
+    if record["error"]:
+        return f"실패: {record['error']} (다시 시작하면 이어서 진행)"
+    return "중단됨(다시 시작하면 이어서 진행)"
+
+
+EXPORT_STATUS_FIELDS = [
+    ("job_id", "job_id"),
+    ("상태", _export_state_text),
+    ("폴더", "folder"),
+    ("형식", "format"),
+    ("파일", "output"),
+    ("내보낸 메일 수", "exported"),
+    ("크기", lambda r: format_size(r["bytes"])),
+    ("처리량", lambda r: f"{r['messages_per_second']}건/초, {format_size(r['bytes_per_second'] or 0)}/초" if r["messages_per_second"] else "-"),
+]
+
+
+@mcp.tool()
+async def start_mailbox_export(
+    folder: Annotated[str, "내보낼 메일 폴더 (inbox, sentitems, archive 등 well-known 이름 또는 폴더 ID)"] = "inbox",
+    my_email: Annotated[Optional[str], "메일을 내보낼 사용자의 이메일 주소. 특정인 지정이 없으면 비워둡니다."] = None,
+    format: Annotated[str, "파일 형식: jsonl(기본값) 또는 parquet(pyarrow 설치 필요)"] = "jsonl",
+    include_body: Annotated[bool, "본문(텍스트)까지 내보낼지 여부"] = False,
+    include_attachments: Annotated[bool, "첨부파일 메타데이터(이름/크기/형식)까지 내보낼지 여부"] = False,
+    restart: Annotated[bool, "true면 기존 파일과 체크포인트를 지우고 처음부터 다시 내보냅니다"] = False,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
+) -> str:
+    """
+    메일 폴더 전체를 서버의 파일(JSONL/Parquet)로 내보내는 백그라운드 작업을 시작합니다. (보관/감사용)
+
+    [LLM 에이전트 사용 가이드]
+    1. 폴더 전체 보관처럼 get_messages로 반복 조회하기엔 많은 메일을 다룰 때 사용합니다.
+    2. 바로 job_id를 돌려주며, 진행 상황은 get_mailbox_export_status로 확인합니다.
+    3. 같은 조건으로 다시 호출하면 중단된 지점부터 이어서 진행합니다. 이미 완료된 작업이면 마지막으로 받은 메일 이후 새 메일만 이어서 받습니다.
+    4. 파일을 처음부터 새로 만들려면 restart=true로 호출합니다.
+    """
+    try:
+        if my_email is None or my_email == "":
+            my_email = DEFAULT_USER_EMAIL
+
+        if format not in EXPORT_FORMATS:
+            return render_notice(
+                f"format은 {', '.join(EXPORT_FORMATS)} 중 하나여야 합니다.",
+                output_format=output_format,
+                status="invalid_argument",
+            )
+
+        job = await export_manager.start(my_email, folder, format, include_body, include_attachments, restart)
+        return render_detail(
+            {**job.status(), "running": export_manager.is_running(job.job_id)},
+            output_format=output_format,
+            fields=fields,
+            text_fields=EXPORT_STATUS_FIELDS,
+        )
+    except Exception as e:
+        raise RuntimeError(f"메일 내보내기 시작 실패: {str(e)}")
+
+
+@mcp.tool()
+async def get_mailbox_export_status(
+    job_id: Annotated[str, "start_mailbox_export가 돌려준 job_id"],
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
+) -> str:
+    """
+    메일 내보내기 작업의 진행 상황(내보낸 건수, 파일 크기, 처리량, 완료 여부)을 조회합니다.
+    """
+    job = await export_manager.get(job_id)
+    if job is None:
+        return render_notice(f"해당 내보내기 작업을 찾을 수 없습니다: {job_id}", output_format=output_format)
+    return render_detail(
+        {**job.status(), "running": export_manager.is_running(job_id)},
+        output_format=output_format,
+        fields=fields,
+        text_fields=EXPORT_STATUS_FIELDS,
+    )
+
+
+def _parse_event_datetime(value: str, timezone: str) -> datetime:
+    # 일정 생성/수정 입력은 오프셋이 없으면 함께 받은 timezone 기준 시각이다.
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=ZoneInfo(timezone))
+
+
+async def _conflict_notice(
+    my_email: str,
+    start: datetime,
+    end: datetime,
+    action: str,
+    output_format: OutputFormat,
+    exclude_id: Optional[str] = None,
+) -> Optional[str]:
+    """
+    제안한 시간과 겹치는 일정이 있으면 안내 문구를, 없으면 None을 돌려준다.
+    """
+    conflicts, source = await calendar_store.find_conflicts(my_email, start, end, exclude_id=exclude_id)
+    if not conflicts:
+        return None
+    if output_format == "json":
+        return to_json({"status": "conflict", "source": source, "conflicts": conflicts})
+    lines = [
+        f"요청한 시간에 겹치는 일정이 {len(conflicts)}개 있어 일정을 {action}하지 않았습니다. "
+        f"그대로 진행하려면 check_conflicts=false로 다시 호출하세요."
+    ]
+    lines += [f"- {c['subject']} ({c['start']} ~ {c['end']} UTC) event_id={c['id']}" for c in conflicts]
+    return "\n".join(lines)
+
+
+@mcp.tool()
+async def find_meeting_times(
+    attendees: Annotated[str, "참석자 메일(콤마 구분)"],
+    start_datetime: Annotated[str, "검색 시작 시간 (ISO 8601, 예: 2026-02-20T00:00:00)"],
+    end_datetime: Annotated[str, "검색 종료 시간 (ISO 8601, 예: 2026-02-27T00:00:00)"],
+    duration_minutes: Annotated[int, "회의 길이(분, 15~480)"] = 30,
+    my_email: Annotated[Optional[str], "주최자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
+    timezone: Annotated[str, "타임존 (예: Asia/Seoul)"] = "Asia/Seoul",
+    work_start: Annotated[str, "근무 시작 시각 (HH:MM)"] = "09:00",
+    work_end: Annotated[str, "근무 종료 시각 (HH:MM)"] = "18:00",
+    max_candidates: Annotated[int, "반환할 후보 개수(1~20)"] = 5,
+    include_tentative: Annotated[bool, "'미정(tentative)' 일정도 바쁜 시간으로 볼지 여부"] = True,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
+) -> str:
+    """
+    주최자와 참석자 전원이 비어 있는 회의 시간 후보를 찾아줍니다.
+
+    [LLM 에이전트 사용 가이드]
+    1. 회의 일정을 잡기 전에 참석자별로 list_calendar_events를 반복 호출하지 말고, 이 도구로 한 번에 공통 빈 시간을 찾습니다.
+    2. 결과 후보 중 하나를 골라 create_calendar_event의 start_datetime/end_datetime으로 사용합니다.
+    3. 각 참석자의 근무시간(Outlook 설정)과 타임존을 함께 고려합니다.
+
+    Args:
+        - attendees (str): 콤마(,)로 구분된 참석자 메일 주소
+        - start_datetime (str): 검색 시작 시간
+        - end_datetime (str): 검색 종료 시간
+        - duration_minutes (int, optional): 회의 길이(분)
+        - my_email (str, optional): 주최자 메일 주소(후보 계산에 포함)
+        - timezone (str, optional): 입력/출력 시간의 타임존
+        - work_start, work_end (str, optional): 주최자 기준 근무시간
+        - max_candidates (int, optional): 후보 개수
+        - include_tentative (bool, optional): 미정 일정을 바쁜 시간으로 볼지 여부
+
+    Returns:
+        str: 순위별 후보 시간(start ~ end) 목록과 일정을 조회하지 못한 참석자 목록
+    """
+    try:
+        if my_email is None or my_email == "":
+            my_email = DEFAULT_USER_EMAIL
+
+        try:
+            tz = ZoneInfo(timezone)
+            range_start = datetime.fromisoformat(start_datetime.replace("Z", "+00:00"))
+            range_end = datetime.fromisoformat(end_datetime.replace("Z", "+00:00"))
+            day_start, day_end = time.fromisoformat(work_start), time.fromisoformat(work_end)
+        except (ValueError, ZoneInfoNotFoundError) as e:
+            return render_notice(f"입력값 형식이 올바르지 않습니다: {e}", output_format=output_format, status="invalid_argument")
+
+        range_start = range_start if range_start.tzinfo else range_start.replace(tzinfo=tz)
+        range_end = range_end if range_end.tzinfo else range_end.replace(tzinfo=tz)
+        if range_end <= range_start:
+            return render_notice("end_datetime은 start_datetime 이후여야 합니다.", output_format=output_format, status="invalid_argument")
+        if range_end - range_start > timedelta(days=MAX_SCHEDULE_RANGE_DAYS):
+            return render_notice(
+                f"검색 기간은 최대 {MAX_SCHEDULE_RANGE_DAYS}일입니다.", output_format=output_format, status="invalid_argument"
+            )
+
+        # 주최자 본인도 후보 계산에 포함한다. 순서를 유지한 채 중복 제거.
+        addresses = list(dict.fromkeys(a.strip().lower() for a in [my_email, *attendees.split(",")] if a.strip()))
+        payload_range = {
+            "startTime": {"dateTime": range_start.astimezone(tz).replace(tzinfo=None).isoformat(), "timeZone": timezone},
+            "endTime": {"dateTime": range_end.astimezone(tz).replace(tzinfo=None).isoformat(), "timeZone": timezone},
+            "availabilityViewInterval": 30,
+        }
+
+        async def fetch(batch: list[str]) -> list[dict]:
+            response = await graph_request(
+                "POST",
+                f"/users/{my_email}/calendar/getSchedule",
+                json={"schedules": batch, **payload_range},
+                # 왜: scheduleItems 시간을 요청 타임존으로 받아 로컬 계산 시 변환을 줄인다.
+                headers={"Prefer": f'outlook.timezone="{timezone}"'},
+            )
+            response.raise_for_status()
+            return response.json().get("value", [])
+
+        # getSchedule은 요청당 조회 대상 수에 제한이 있으므로 나눠서 동시에 요청한다.
+        batches = [addresses[i:i + GET_SCHEDULE_BATCH_SIZE] for i in range(0, len(addresses), GET_SCHEDULE_BATCH_SIZE)]
+        schedules = [s for result in await asyncio.gather(*(fetch(b) for b in batches)) for s in result]
+
+        slots, unavailable = find_common_slots(
+            schedules,
+            range_start,
+            range_end,
+            tz,
+            timedelta(minutes=max(15, min(duration_minutes, 480))),
+            day_start,
+            day_end,
+            limit=max(1, min(max_candidates, 20)),
+            treat_tentative_as_busy=include_tentative,
+        )
+
+        records = [
+            {
+                "rank": rank,
+                "start": slot["start"].replace(tzinfo=None).isoformat(timespec="minutes"),
+                "end": slot["end"].replace(tzinfo=None).isoformat(timespec="minutes"),
+                "timezone": timezone,
+                "buffer": slot["buffer"],
+            }
+            for rank, slot in enumerate(slots, 1)
+        ]
+
+        if output_format == "json":
+            return to_json(
+                {
+                    "count": len(records),
+                    "items": [project(r, parse_fields(fields)) for r in records],
+                    "unavailable_attendees": unavailable,
+                }
+            )
+
+        result_text = render_list(
+            records,
+            output_format=output_format,
+            fields=fields,
+            header=f"참석자 {len(addresses)}명의 공통 빈 시간 후보 {len(records)}개 ({timezone})",
+            empty_message="조건에 맞는 공통 빈 시간이 없습니다. 기간을 늘리거나 회의 길이를 줄여보세요.",
+            text_fields=[
+                ("", lambda r: f"{r['start']} ~ {r['end']}"),
+                ("앞뒤 여유", lambda r: "있음" if r["buffer"] else "없음(다른 일정과 연속)"),
+            ],
+        )
+        if unavailable:
+            failed = "\n".join(f"- {address}: {reason}" for address, reason in unavailable.items())
+            result_text += f"\n\n일정을 조회하지 못한 참석자 {len(unavailable)}명 (계산에서 제외):\n{failed}"
+        return result_text
+
+    except Exception as e:
+        raise RuntimeError(f"회의 시간 찾기 실패: {str(e)}")
+
+
 @mcp.tool()
 async def create_calendar_event(
     subject: Annotated[str, "일정 제목"],
@@ -853,6 +1408,9 @@ async def create_calendar_event(
     location: Annotated[Optional[str], "장소"] = None,
     body: Annotated[Optional[str], "일정 설명"] = None,
     timezone: Annotated[str, "타임존 (예: Asia/Seoul)"] = "Asia/Seoul",
+    check_conflicts: Annotated[bool, "true면 겹치는 일정이 있을 때 생성하지 않고 충돌 목록을 반환"] = False,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     사용자의 메일의 캘린더 일정을 생성하는 도구 입니다.
@@ -873,6 +1431,7 @@ async def create_calendar_event(
         - location (str, optional): 등록할 일정의 장소(주소) 입니다.
         - body (str, optional): 생성할 일정의 설명(본문내용) 입니다. 이 필드는 반드시 UTF-8 인코딩으로 채워져야 합니다.
         - timezone (str, optional): 타임존 (예: Asia/Seoul)"] = "Asia/Seoul
+        - check_conflicts (bool, optional): true면 같은 시간대 일정이 있을 때 생성하지 않고 겹치는 일정 목록을 반환합니다. 중복 예약을 피하려면 list_calendar_events를 먼저 호출하는 대신 이 옵션을 사용합니다.
 
     Returns:
         str: 일정 생성 결과를 알리는 문자열을 반환합니다.
@@ -882,7 +1441,16 @@ async def create_calendar_event(
         if my_email is None or my_email == "":
             my_email = DEFAULT_USER_EMAIL
 
-        token = get_access_token()
+        if check_conflicts:
+            notice = await _conflict_notice(
+                my_email,
+                _parse_event_datetime(start_datetime, timezone),
+                _parse_event_datetime(end_datetime, timezone),
+                "생성",
+                output_format,
+            )
+            if notice is not None:
+                return notice
 
         # 왜: 참석자 입력을 문자열로 받아도 Graph 형식으로 안전하게 변환하기 위함
         attendees_list = []
@@ -909,24 +1477,32 @@ async def create_calendar_event(
         if location:
             payload["location"] = {"displayName": location}
 
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/events"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
-
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(endpoint, headers=headers, json=payload)
+        response = await graph_request("POST", f"/users/{my_email}/events", json=payload)
 
         response.raise_for_status()
+        mark_write_done()
+        # 다음 조회에서 delta로 새 일정을 받아오도록 캐시를 갱신 대상으로 표시한다.
+        calendar_store.mark_stale(my_email)
         created = response.json()
+        record = {
+            "status": "created",
+            "id": created.get("id", ""),
+            "subject": created.get("subject", subject),
+            "start": created.get("start", {}).get("dateTime", start_datetime),
+            "end": created.get("end", {}).get("dateTime", end_datetime),
+        }
 
-        return (
-            f"일정 생성 완료\n"
-            f"- subject: {created.get('subject', subject)}\n"
-            f"- event_id: {created.get('id', '')}\n"
-            f"- start: {created.get('start', {}).get('dateTime', start_datetime)}\n"
-            f"- end: {created.get('end', {}).get('dateTime', end_datetime)}"
+        return render_message(
+            record,
+            output_format=output_format,
+            fields=fields,
+            text=(
+                f"일정 생성 완료\n"
+                f"- subject: {record['subject']}\n"
+                f"- event_id: {record['id']}\n"
+                f"- start: {record['start']}\n"
+                f"- end: {record['end']}"
+            ),
         )
 
     except Exception as e:
@@ -939,6 +1515,8 @@ async def list_calendar_events(
     end_datetime: Annotated[str, "조회 종료 시간 (ISO 8601, 예: 2026-02-21T00:00:00Z)"],
     limit: Annotated[int, "조회 개수(1~50)"] = 20,
     my_email: Annotated[Optional[str], "조회할 사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     기간 사용자의 메일의 캘린더 일정을 캘린더 일정을 조회하는 도구 입니다.
@@ -953,40 +1531,42 @@ async def list_calendar_events(
             my_email = DEFAULT_USER_EMAIL
 
         safe_limit = max(1, min(limit, 50))
-        token = get_access_token()
-
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/calendarView"
-        params = {
-            "startDateTime": start_datetime,
-            "endDateTime": end_datetime,
-            "$top": safe_limit,
-            "$orderby": "start/dateTime",
-            "$select": "id,subject,start,end,organizer,location",
-        }
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-        }
-
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(endpoint, headers=headers, params=params)
 
-        response.raise_for_status()
-        events = response.json().get("value", [])
+        cached = None
+        if settings.CALENDAR_CACHE_ENABLED:
+            # 왜: 같은 기간을 반복 조회해도 동기화 창 안이면 Graph 호출 없이 로컬 인덱스에서 응답한다.
+            cached = await calendar_store.query_range(
+                my_email,
+                parse_query_datetime(start_datetime),
+                parse_query_datetime(end_datetime),
+                safe_limit,
+            )
 
-        if not events:
-            return "조회 기간 내 일정이 없습니다."
+        if cached is not None:
+            events = [Event.from_graph(event) for event in cached]
+        else:
+            # 캐시 비활성화 또는 동기화 창 밖 구간: live calendarView 조회
+            params = {
+                "startDateTime": start_datetime,
+                "endDateTime": end_datetime,
+                "$top": safe_limit,
+                "$orderby": "start/dateTime",
+                "$select": "id,subject,start,end,organizer,location",
+            }
 
-        lines = [f"총 {len(events)}개의 일정을 찾았습니다.\n"]
-        for idx, event in enumerate(events, 1):
-            lines.append(f"{idx}. {event.get('subject', '(제목 없음)')}")
-            lines.append(f"   id: {event.get('id', '')}")
-            lines.append(f"   start: {event.get('start', {}).get('dateTime', '')}")
-            lines.append(f"   end: {event.get('end', {}).get('dateTime', '')}")
-            lines.append(f"   location: {event.get('location', {}).get('displayName', '')}")
-            lines.append("-" * 30)
+            response = await graph_request("GET", f"/users/{my_email}/calendarView", params=params)
 
-        return "\n".join(lines)
+            response.raise_for_status()
+            events = decode_values(response.content, Event)
+
+        return render_list(
+            events,
+            output_format=output_format,
+            fields=fields,
+            header=f"총 {len(events)}개의 일정을 찾았습니다.",
+            empty_message="조회 기간 내 일정이 없습니다.",
+            text_fields=EVENT_LIST_FIELDS,
+        )
 
     except Exception as e:
         raise RuntimeError(f"일정 조회 실패: {str(e)}")
@@ -995,7 +1575,9 @@ async def list_calendar_events(
 @mcp.tool()
 async def get_event(
     event_id: Annotated[str, "조회할 캘린더 일정의 event_id. list_calendar_events로 획득한 값"],
-    my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None
+    my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     단일 캘린더 일정의 상세 정보를 조회합니다.
@@ -1015,46 +1597,33 @@ async def get_event(
         if my_email is None or my_email == "":
             my_email = DEFAULT_USER_EMAIL
 
-        token = get_access_token()
+        cached = None
+        if settings.CALENDAR_CACHE_ENABLED:
+            cached = await calendar_store.get_event(my_email, event_id)
 
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/events/{event_id}"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-            "Prefer": 'outlook.body-content-type="text"'
-        }
-
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(endpoint, headers=headers)
-
-        if response.status_code == 404:
-            return "해당 일정을 찾을 수 없습니다."
-
-        response.raise_for_status()
-        event = response.json()
-
-        subject = event.get("subject", "(제목 없음)")
-        start = event.get("start", {}).get("dateTime", "")
-        end = event.get("end", {}).get("dateTime", "")
-        location = event.get("location", {}).get("displayName", "")
-        organizer = event.get("organizer", {}).get("emailAddress", {}).get("name", "")
-
-        attendees = event.get("attendees", [])
-        att_list = [a.get("emailAddress", {}).get("address", "") for a in attendees]
-        att_str = ", ".join(filter(None, att_list)) if att_list else "없음"
-
-        body = event.get("body", {}).get("content", "")
+        if cached is not None:
+            event = Event.from_graph(cached)
+        else:
+            response = await graph_request(
+                "GET",
+                f"/users/{my_email}/events/{event_id}",
+                headers={"Prefer": 'outlook.body-content-type="text"'},
+            )
 
-        result_text = f"제목: {subject}\n"
-        result_text += f"시간: {start} ~ {end}\n"
-        result_text += f"장소: {location}\n"
-        result_text += f"주최자: {organizer}\n"
-        result_text += f"참석자: {att_str}\n"
-        result_text += "-" * 30 + "\n"
-        result_text += "설명:\n"
-        result_text += body
+            if response.status_code == 404:
+                return render_notice("해당 일정을 찾을 수 없습니다.", output_format=output_format)
 
-        return result_text
+            response.raise_for_status()
+            event = decode_one(response.content, Event)
+
+        return render_detail(
+            event,
+            output_format=output_format,
+            fields=fields,
+            text_fields=EVENT_DETAIL_FIELDS,
+            body_label="설명",
+            body_key="body",
+        )
 
     except Exception as e:
         raise RuntimeError(f"일정 상세 조회 실패: {str(e)}")
@@ -1064,6 +1633,8 @@ async def get_event(
 async def delete_calendar_event(
     event_id: Annotated[str, "삭제할 일정의 event id"],
     my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     기존 일정을 삭제합니다.
@@ -1072,16 +1643,16 @@ async def delete_calendar_event(
         if my_email is None or my_email == "":
             my_email = DEFAULT_USER_EMAIL
 
-        token = get_access_token()
-
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/events/{event_id}"
-        headers = {"Authorization": f"Bearer {token}"}
-
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.delete(endpoint, headers=headers)
+        response = await graph_request("DELETE", f"/users/{my_email}/events/{event_id}")
 
         response.raise_for_status()
-        return f"일정 삭제 완료: event_id={event_id}"
+        calendar_store.remove_event(my_email, event_id)
+        return render_message(
+            {"status": "deleted", "id": event_id},
+            output_format=output_format,
+            fields=fields,
+            text=f"일정 삭제 완료: event_id={event_id}",
+        )
 
     except httpx.HTTPStatusError as e:
         raise RuntimeError(
@@ -1103,16 +1674,18 @@ async def update_calendar_event(
     location: Annotated[Optional[str], "장소"] = None,
     body: Annotated[Optional[str], "설명"] = None,
     timezone: Annotated[str, "타임존"] = "Asia/Seoul",
+    check_conflicts: Annotated[bool, "true면 시간을 옮길 때 겹치는 일정이 있으면 수정하지 않고 충돌 목록을 반환"] = False,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     기존 일정을 부분 수정합니다.
+    check_conflicts=true이고 start_iso/end_iso가 바뀌면, 옮길 시간에 다른 일정이 있는지 먼저 확인합니다.
     """
     try:
         if my_email is None or my_email == "":
             my_email = DEFAULT_USER_EMAIL
 
-        token = get_access_token()
-
         patch_payload: dict = {}
 
         # 왜: 입력된 필드만 patch에 넣어 불필요한 덮어쓰기를 방지한다.
@@ -1145,19 +1718,43 @@ async def update_calendar_event(
             patch_payload["attendees"] = attendees_list
 
         if not patch_payload:
-            return "수정할 필드가 없습니다. (subject/start_iso/end_iso/attendees/location/body 중 1개 이상 필요)"
+            return render_notice(
+                "수정할 필드가 없습니다. (subject/start_iso/end_iso/attendees/location/body 중 1개 이상 필요)",
+                output_format=output_format,
+                status="invalid_argument",
+            )
 
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/events/{event_id}"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
+        if check_conflicts and (start_iso is not None or end_iso is not None):
+            new_start = _parse_event_datetime(start_iso, timezone) if start_iso else None
+            new_end = _parse_event_datetime(end_iso, timezone) if end_iso else None
+            if new_start is None or new_end is None:
+                # 시작/종료 중 하나만 바꾸면 나머지는 기존 일정 값을 쓴다.
+                current = await calendar_store.get_event(my_email, event_id)
+                if current is None:
+                    response = await graph_request(
+                        "GET",
+                        f"/users/{my_email}/events/{event_id}",
+                        params={"$select": "start,end"},
+                        headers={"Prefer": 'outlook.timezone="UTC"'},
+                    )
+                    response.raise_for_status()
+                    current = response.json()
+                new_start = new_start or parse_query_datetime(current["start"]["dateTime"])
+                new_end = new_end or parse_query_datetime(current["end"]["dateTime"])
+            notice = await _conflict_notice(my_email, new_start, new_end, "수정", output_format, exclude_id=event_id)
+            if notice is not None:
+                return notice
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.patch(endpoint, headers=headers, json=patch_payload)
+        response = await graph_request("PATCH", f"/users/{my_email}/events/{event_id}", json=patch_payload)
 
         response.raise_for_status()
-        return f"일정 수정 완료: event_id={event_id}"
+        calendar_store.mark_stale(my_email)
+        return render_message(
+            {"status": "updated", "id": event_id, "updated_fields": sorted(patch_payload)},
+            output_format=output_format,
+            fields=fields,
+            text=f"일정 수정 완료: event_id={event_id}",
+        )
 
     except httpx.HTTPStatusError as e:
         raise RuntimeError(
@@ -1172,7 +1769,9 @@ async def update_calendar_event(
 
 @mcp.tool()
 async def list_todo_lists(
-    my_email: Annotated[Optional[str], "조회할 사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None
+    my_email: Annotated[Optional[str], "조회할 사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     Microsoft To Do 목록(task lists)을 조회합니다.
@@ -1181,29 +1780,17 @@ async def list_todo_lists(
         if my_email is None or my_email == "":
             my_email = DEFAULT_USER_EMAIL
 
-        token = get_access_token()
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/todo/lists"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-        }
-
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(endpoint, headers=headers)
-
-        response.raise_for_status()
-        lists = response.json().get("value", [])
-
-        if not lists:
-            return "To Do 목록이 없습니다."
+        # 명시적인 목록 조회는 항상 새로 읽고, 이름 -> id 캐시도 함께 갱신한다.
+        lists = await load_task_lists(my_email, refresh=True)
 
-        lines = [f"총 {len(lists)}개의 To Do 목록을 찾았습니다.\n"]
-        for idx, item in enumerate(lists, 1):
-            lines.append(f"{idx}. displayName: {item.get('displayName', '')}")
-            lines.append(f"   list_id: {item.get('id', '')}")
-            lines.append("-" * 30)
-
-        return "\n".join(lines)
+        return render_list(
+            [{"id": item["id"], "display_name": item["display_name"]} for item in lists],
+            output_format=output_format,
+            fields=fields,
+            header=f"총 {len(lists)}개의 To Do 목록을 찾았습니다.",
+            empty_message="To Do 목록이 없습니다.",
+            text_fields=[("displayName", "display_name"), ("list_id", "id")],
+        )
 
     except httpx.HTTPStatusError as e:
         raise RuntimeError(
@@ -1213,14 +1800,30 @@ async def list_todo_lists(
         raise RuntimeError(f"To Do 목록 조회 실패: {str(e)}")
 
 
+async def _resolve_task_list(my_email: str, task_list: str, output_format: OutputFormat) -> tuple[Optional[str], Optional[str]]:
+    """
+    목록 id/이름을 id로 바꾼다. 찾지 못하면 (None, 안내 문구)를 돌려준다.
+    """
+    list_id = await resolve_task_list_id(my_email, task_list)
+    if list_id is not None:
+        return list_id, None
+    names = ", ".join(item["display_name"] for item in await load_task_lists(my_email))
+    return None, render_notice(
+        f"To Do 목록을 찾을 수 없습니다: {task_list} (사용 가능한 목록: {names or '없음'})",
+        output_format=output_format,
+    )
+
+
 @mcp.tool()
 async def create_todo_task(
-    task_list_id: Annotated[str, "작업을 생성할 To Do 목록 id"],
+    task_list_id: Annotated[str, "작업을 생성할 To Do 목록 id 또는 목록 이름(예: 업무)"],
     title: Annotated[str, "작업 제목"],
     my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
     body: Annotated[Optional[str], "작업 설명"] = None,
     due_iso: Annotated[Optional[str], "기한 ISO 8601 날짜/시간 (예: 2026-02-20T18:00:00)"] = None,
     timezone: Annotated[str, "타임존"] = "Asia/Seoul",
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     To Do 작업을 생성합니다.
@@ -1229,7 +1832,9 @@ async def create_todo_task(
         if my_email is None or my_email == "":
             my_email = DEFAULT_USER_EMAIL
 
-        token = get_access_token()
+        task_list_id, notice = await _resolve_task_list(my_email, task_list_id, output_format)
+        if notice is not None:
+            return notice
 
         payload = {"title": title}
         if body is not None:
@@ -1237,23 +1842,26 @@ async def create_todo_task(
         if due_iso is not None:
             payload["dueDateTime"] = {"dateTime": due_iso, "timeZone": timezone}
 
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/todo/lists/{task_list_id}/tasks"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
-
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(endpoint, headers=headers, json=payload)
+        response = await graph_request("POST", f"/users/{my_email}/todo/lists/{task_list_id}/tasks", json=payload)
 
+        if response.status_code == 404:
+            # 캐시된 목록이 삭제됐을 수 있으므로 다음 조회 때 다시 읽는다.
+            await invalidate_task_lists(my_email)
         response.raise_for_status()
-        created = response.json()
-
-        return (
-            f"To Do 생성 완료\n"
-            f"- task_id: {created.get('id', '')}\n"
-            f"- title: {created.get('title', title)}\n"
-            f"- status: {created.get('status', '')}"
+        mark_write_done()
+        # 응답에 title이 없으면 요청한 제목을 쓴다.
+        record = TodoTask.from_graph({"title": title, **loads(response.content)})
+
+        return render_message(
+            record,
+            output_format=output_format,
+            fields=fields,
+            text=(
+                f"To Do 생성 완료\n"
+                f"- task_id: {record['id']}\n"
+                f"- title: {record['title']}\n"
+                f"- status: {record['status']}"
+            ),
         )
 
     except httpx.HTTPStatusError as e:
@@ -1266,9 +1874,11 @@ async def create_todo_task(
 
 @mcp.tool()
 async def list_todo_tasks(
-    task_list_id: Annotated[str, "조회할 To Do 목록 id"],
+    task_list_id: Annotated[str, "조회할 To Do 목록 id 또는 목록 이름(예: 업무)"],
     my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
     limit: Annotated[int, "조회 개수(1~100)"] = 30,
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
 ) -> str:
     """
     특정 To Do 목록의 작업을 조회합니다.
@@ -1278,38 +1888,32 @@ async def list_todo_tasks(
             my_email = DEFAULT_USER_EMAIL
 
         safe_limit = max(1, min(limit, 100))
-        token = get_access_token()
+        task_list_id, notice = await _resolve_task_list(my_email, task_list_id, output_format)
+        if notice is not None:
+            return notice
 
-        endpoint = f"https://graph.microsoft.com/v1.0/users/{my_email}/todo/lists/{task_list_id}/tasks"
         params = {
             "$top": safe_limit,
             "$select": "id,title,status,createdDateTime,lastModifiedDateTime,dueDateTime",
         }
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-        }
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(endpoint, headers=headers, params=params)
+        response = await graph_request(
+            "GET", f"/users/{my_email}/todo/lists/{task_list_id}/tasks", params=params
+        )
 
+        if response.status_code == 404:
+            await invalidate_task_lists(my_email)
         response.raise_for_status()
-        tasks = response.json().get("value", [])
-
-        if not tasks:
-            return "해당 목록에 작업이 없습니다."
-
-        lines = [f"총 {len(tasks)}개의 작업을 찾았습니다.\n"]
-        for idx, task in enumerate(tasks, 1):
-            lines.append(f"{idx}. {task.get('title', '(제목 없음)')}")
-            lines.append(f"   task_id: {task.get('id', '')}")
-            lines.append(f"   status: {task.get('status', '')}")
-            lines.append(
-                f"   due: {task.get('dueDateTime', {}).get('dateTime', '') if task.get('dueDateTime') else ''}"
-            )
-            lines.append("-" * 30)
-
-        return "\n".join(lines)
+        tasks = decode_values(response.content, TodoTask)
+
+        return render_list(
+            tasks,
+            output_format=output_format,
+            fields=fields,
+            header=f"총 {len(tasks)}개의 작업을 찾았습니다.",
+            empty_message="해당 목록에 작업이 없습니다.",
+            text_fields=[("", "title"), ("task_id", "id"), ("status", "status"), ("due", "due")],
+        )
 
     except httpx.HTTPStatusError as e:
         raise RuntimeError(
@@ -1319,31 +1923,296 @@ async def list_todo_tasks(
         raise RuntimeError(f"To Do 조회 실패: {str(e)}")
 
 
+@mcp.tool()
+async def create_todo_tasks_bulk(
+    task_list_id: Annotated[str, "작업을 생성할 To Do 목록 id 또는 목록 이름(예: 업무)"],
+    titles: Annotated[list[str], "생성할 작업 제목 목록"],
+    my_email: Annotated[Optional[str], "사용자 메일. 비우면 DEFAULT_USER_EMAIL 사용"] = None,
+    due_iso: Annotated[Optional[str], "모든 작업에 공통으로 넣을 기한 ISO 8601 (예: 2026-02-20T18:00:00)"] = None,
+    timezone: Annotated[str, "타임존"] = "Asia/Seoul",
+    output_format: Annotated[OutputFormat, OUTPUT_FORMAT_DESCRIPTION] = "text",
+    fields: Annotated[Optional[str], FIELDS_DESCRIPTION] = None,
+) -> str:
+    """
+    여러 To Do 작업을 한 번에 생성합니다(Graph $batch 사용).
+
+    [LLM 에이전트 사용 가이드]
+    1. 체크리스트 가져오기처럼 작업을 여러 개 만들 때 create_todo_task를 반복 호출하지 말고 이 도구를 사용합니다.
+    2. 일부 작업이 실패해도 나머지는 생성되며, 실패한 작업은 결과에 표시됩니다.
+    """
+    try:
+        if my_email is None or my_email == "":
+            my_email = DEFAULT_USER_EMAIL
+
+        clean_titles = [t.strip() for t in titles if t and t.strip()]
+        if not clean_titles:
+            return render_notice("titles는 비어 있을 수 없습니다.", output_format=output_format, status="invalid_argument")
+        if len(clean_titles) > settings.TODO_BULK_MAX_TASKS:
+            return render_notice(
+                f"한 번에 생성할 수 있는 작업은 최대 {settings.TODO_BULK_MAX_TASKS}개입니다.",
+                output_format=output_format,
+                status="invalid_argument",
+            )
+
+        task_list_id, notice = await _resolve_task_list(my_email, task_list_id, output_format)
+        if notice is not None:
+            return notice
+
+        payloads = []
+        for title in clean_titles:
+            payload: dict = {"title": title}
+            if due_iso is not None:
+                payload["dueDateTime"] = {"dateTime": due_iso, "timeZone": timezone}
+            payloads.append(payload)
+
+        results = await create_tasks_batch(my_email, task_list_id, payloads)
+        records = [
+            TodoTask.from_graph({"title": clean_titles[r["index"]], **r["task"]})
+            for r in results
+            if "task" in r
+        ]
+        failures = [{"title": clean_titles[r["index"]], "status": r["status"], "error": r["error"]} for r in results if "error" in r]
+        if any(f["status"] == 404 for f in failures):
+            await invalidate_task_lists(my_email)
+        if records:
+            # 왜: 일부라도 생성됐으면 같은 호출을 다시 실행할 때 중복 생성되므로 결과를 저장한다.
+            mark_write_done()
+
+        if output_format == "json":
+            return to_json(
+                {
+                    "count": len(records),
+                    "items": [project(r, parse_fields(fields)) for r in records],
+                    "failed": failures,
+                }
+            )
+
+        result_text = render_list(
+            records,
+            output_format=output_format,
+            fields=fields,
+            header=f"To Do {len(records)}/{len(clean_titles)}개 생성 완료",
+            empty_message="생성된 작업이 없습니다.",
+            text_fields=[("", "title"), ("task_id", "id"), ("status", "status")],
+        )
+        if failures:
+            failed = "\n".join(f"- {f['title']}: {f['error']}" for f in failures)
+            result_text += f"\n\n생성 실패 {len(failures)}개:\n{failed}"
+        return result_text
+
+    except httpx.HTTPStatusError as e:
+        raise RuntimeError(
+            f"To Do 일괄 생성 실패(HTTP {e.response.status_code}): {e.response.text}"
+        )
+    except Exception as e:
+        raise RuntimeError(f"To Do 일괄 생성 실패: {str(e)}")
+
+
+
+
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> JSONResponse:
+    """
+    프로세스 메트릭(압축률, 지연 등) 스냅샷을 JSON으로 반환한다.
+    """
+    return JSONResponse(metrics.snapshot())
+
+
+@mcp.custom_route("/healthz", methods=["GET"])
+async def healthz(request: Request) -> PlainTextResponse:
+    """
+    liveness: 이벤트 루프가 요청을 처리할 수 있으면 200. I/O를 하지 않는다.
+    """
+    return PlainTextResponse("ok")
 
 
+@mcp.custom_route("/readyz", methods=["GET"])
+async def readyz(request: Request) -> JSONResponse:
+    """
+    readiness: 백그라운드 점검(토큰, Graph 연결, 회로 상태, 루프 지연)의 마지막 결과. 준비되지 않았으면 503.
+    """
+    snapshot = health_checker.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+
+@mcp.custom_route(WEBHOOK_PATH, methods=["POST"])
+async def graph_notifications(request: Request) -> Response:
+    """
+    Graph 변경 알림 웹훅.
+
+    - 구독 생성/갱신 시: validationToken 쿼리를 그대로 text/plain으로 돌려준다(10초 안에 응답해야 함).
+    - 변경 알림: clientState가 맞는 알림만 해당 캐시 항목을 무효화하고 202를 돌려준다.
+    """
+    validation_token = request.query_params.get("validationToken")
+    if validation_token is not None:
+        return PlainTextResponse(validation_token)
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "invalid json"}, status_code=400)
+
+    notifications = payload.get("value") if isinstance(payload, dict) else None
+    if not isinstance(notifications, list):
+        return JSONResponse({"error": "invalid notification payload"}, status_code=400)
+
+    for notification in notifications:
+        if not await subscription_manager.verify(notification):
+            # 왜: clientState가 다르면 위조/다른 앱의 알림이므로 캐시를 건드리지 않는다.
+            metrics.counter("graph_notifications_total", {"result": "rejected"}).inc()
+            continue
+        result = await subscription_manager.handle_notification(notification)
+        metrics.counter("graph_notifications_total", {"result": result}).inc()
+
+    return Response(status_code=202)
+
+
+HTTP_MIDDLEWARE = [
+    Middleware(RequestIdMiddleware),
+]
+
+if settings.PROFILING_ENABLED:
+    # 왜: 꺼져 있으면 미들웨어를 아예 등록하지 않아 요청마다 드는 비용이 없다.
+    HTTP_MIDDLEWARE.append(Middleware(ProfilingMiddleware, profiler=profiler))
+
+if settings.PREFETCH_ENABLED:
+    # 세션이 끝나면(DELETE /mcp) 그 세션이 예약한 prefetch를 취소한다.
+    HTTP_MIDDLEWARE.append(Middleware(SessionEndMiddleware, callbacks=[prefetcher.cancel_session]))
+
+if settings.COMPRESSION_ENABLED:
+    # 왜: 맨 안쪽(마지막)에 두어 RequestIdMiddleware가 압축된 최종 응답을 본다.
+    # 요청 로그의 elapsed_ms에 압축 시간이 포함되고, 압축 중 오류도 request_id와 함께 남는다.
+    HTTP_MIDDLEWARE.append(
+        Middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MIN_BYTES,
+            encodings=tuple(e.strip().lower() for e in settings.COMPRESSION_ENCODINGS.split(",") if e.strip()),
+            level=settings.COMPRESSION_LEVEL,
+        )
+    )
+
+_server_configured = False
+
+
+def _parse_tool_overrides(raw: str, cast) -> dict:
+    # "도구이름=값,도구이름=값" 형식의 설정을 dict로 바꾼다.
+    return {
+        name.strip(): cast(value)
+        for name, _, value in (item.partition("=") for item in raw.split(","))
+        if name.strip() and value.strip()
+    }
+
+
+def configure_server() -> None:
+    """
+    MCP 미들웨어를 등록한다. 단일 프로세스(mcp.run)와 멀티 워커(asgi.py) 양쪽에서 한 번만 호출된다.
+    """
+    global _server_configured
+    if _server_configured:
+        return
+    mcp.add_middleware(MCPLoggingMiddleware())
+    # 왜: 로깅 미들웨어 안쪽에 두어 시간 초과도 도구 호출 오류 로그로 남긴다.
+    mcp.add_middleware(
+        DeadlineMiddleware(
+            default_seconds=settings.TOOL_TIMEOUT_SECONDS,
+            max_seconds=settings.TOOL_MAX_TIMEOUT_SECONDS,
+            tool_seconds=_parse_tool_overrides(settings.TOOL_TIMEOUT_OVERRIDES, float),
+        )
+    )
+    if settings.IDEMPOTENCY_ENABLED:
+        # 왜: 동시 실행 제한보다 바깥에 두어, 재시도/중복 호출이 대기열 슬롯을 차지하지 않게 한다.
+        mcp.add_middleware(
+            IdempotencyMiddleware(
+                tools={t.strip() for t in settings.IDEMPOTENCY_TOOLS.split(",") if t.strip()},
+                store=IdempotencyStore(
+                    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+                    pending_ttl_seconds=settings.TOOL_MAX_TIMEOUT_SECONDS,
+                ),
+            )
+        )
+    if settings.ADMISSION_ENABLED:
+        # 왜: 마감 시간 안쪽에 두어 대기열에서 기다린 시간도 호출 마감에 포함한다.
+        mcp.add_middleware(
+            AdmissionControlMiddleware(
+                tool_limit=settings.ADMISSION_TOOL_CONCURRENCY,
+                user_limit=settings.ADMISSION_USER_CONCURRENCY,
+                session_limit=settings.ADMISSION_SESSION_CONCURRENCY,
+                max_queue=settings.ADMISSION_MAX_QUEUE,
+                queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+                tool_limits=_parse_tool_overrides(settings.ADMISSION_TOOL_LIMITS, int),
+                default_user=DEFAULT_USER_EMAIL,
+            )
+        )
+    _server_configured = True
+
+
+def transport_options() -> dict:
+    """
+    HTTP_MODE/WORKERS 설정에 맞는 streamable-http 전송 옵션을 돌려준다.
+
+    - stateless 모드: 세션 생성/SSE 프레이밍 없이 요청마다 일반 JSON으로 응답한다.
+      세션이 없으므로 로드밸런서가 요청을 아무 인스턴스로나 보낼 수 있다.
+    - 멀티 워커: streamable-http 세션은 워커 프로세스 메모리에 묶이므로 session 모드여도
+      stateless 전송을 쓰고, 세션 상태는 공유 저장소(session_state_store)에 둔다.
+    """
+    stateless = HTTP_MODE == "stateless"
+    return {
+        "stateless_http": stateless or WORKERS > 1,
+        "json_response": stateless,
+    }
+
+
+def create_http_app():
+    """
+    uvicorn 멀티 워커용 ASGI 앱을 만든다.
+    """
+    configure_server()
+    return mcp.http_app(
+        transport="streamable-http",
+        middleware=HTTP_MIDDLEWARE,
+        **transport_options(),
+    )
 
 
 if __name__ == "__main__":
     print("🚀 FastMCP MS 메일 서버를 HTTP(SSE) 모드로 시작합니다...")
-    print("Endpoint: http://localhost:8000/mcp")
+    print(f"Endpoint: http://localhost:{settings.HTTP_PORT}/mcp")
 
     setup_logging(LOG_LEVEL)
     logger = get_logger("app.main")
-    logger.info("FastMCP 서버를 HTTP(SSE) 모드로 시작 합니다.")
-    logger.info("Endpoint: http://localhost:8000/mcp")
+    logger.info("FastMCP 서버를 HTTP(SSE) 모드로 시작 합니다. http_mode=%s", HTTP_MODE)
+    logger.info("Endpoint: http://localhost:%s/mcp", settings.HTTP_PORT)
     logger.debug("Deub 로그 활성화 상태 입니다.")
 
-    mcp.add_middleware(MCPLoggingMiddleware())
+    if WORKERS > 1:
+        import os
 
-    # stdio 대신 sse 전송 방식을 사용하여 8000번 포트에서 실행
-    mcp.run(
-        transport="streamable-http",
-        port=8000,
-        middleware=[
-            Middleware(RequestIdMiddleware),
-        ],
-        uvicorn_config={"access_log": True
-                        # "log_config": None,  # uvicorn 기본 로깅 덮어쓰기 비활성화
-                        },
+        import uvicorn
 
+        # 왜: uvicorn 멀티 워커는 앱을 import 문자열로 받아 워커마다 새로 로드해야 한다.
+        logger.info("멀티 워커 모드로 시작 합니다. workers=%s", WORKERS)
+        uvicorn.run(
+            "asgi:app",
+            host=settings.HTTP_HOST,
+            port=settings.HTTP_PORT,
+            workers=WORKERS,
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+            access_log=True,
         )
+    else:
+        configure_server()
+
+        # stdio 대신 sse 전송 방식을 사용하여 8000번 포트에서 실행
+        mcp.run(
+            transport="streamable-http",
+            host=settings.HTTP_HOST,
+            port=settings.HTTP_PORT,
+            middleware=HTTP_MIDDLEWARE,
+            **transport_options(),
+            uvicorn_config={"access_log": True
+                            # "log_config": None,  # uvicorn 기본 로깅 덮어쓰기 비활성화
+                            },
+
+            )
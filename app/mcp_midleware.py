@@ -1,13 +1,30 @@
+import asyncio
+import math
 import time
+from collections import deque
 from typing import Any
 
+from fastmcp.exceptions import ToolError
 from fastmcp.server.middleware.middleware import CallNext, Middleware, MiddlewareContext
-from mcp.types import CallToolRequestParams
+from fastmcp.tools import ToolResult
+from mcp.types import CallToolRequestParams, ContentBlock
+from pydantic import TypeAdapter
 
+from deadline import deadline_scope, remaining
+from idempotency import IdempotencyStore, idempotency_key, track_write
 from logger_config import get_logger
+from loop_monitor import track_activity
+from metrics import metrics
 
 logger = get_logger("app.mcp.tool")
 
+# 클라이언트가 요청 _meta에 넣는 호출 제한 시간(밀리초) 키
+DEADLINE_META_KEY = "timeoutMs"
+# 클라이언트가 요청 _meta에 넣는 멱등 키. 없으면 도구 인자 해시를 쓴다.
+IDEMPOTENCY_META_KEY = "idempotencyKey"
+
+_CONTENT_ADAPTER = TypeAdapter(list[ContentBlock])
+
 
 class MCPLoggingMiddleware(Middleware):
     """
@@ -27,7 +44,9 @@ class MCPLoggingMiddleware(Middleware):
 
         started = time.perf_counter()
         try:
-            result = await call_next(context)
+            # 왜: 도구 실행 중 루프가 막히면 loop_monitor가 어느 요청/도구였는지 로그에 남길 수 있게 한다.
+            with track_activity(tool_name):
+                result = await call_next(context)
             elapsed_ms = (time.perf_counter() - started) * 1000.0
 
             logger.info(
@@ -46,3 +65,262 @@ class MCPLoggingMiddleware(Middleware):
                 argument_keys,
             )
             raise
+
+
+class DeadlineMiddleware(Middleware):
+    """
+    MCP tool 호출마다 마감 시간을 건다.
+
+    - 제한 시간: 클라이언트 _meta.timeoutMs > 도구별 기본값 > 전체 기본값 순. 최대 max_seconds로 자른다.
+    - 마감은 contextvar(deadline.py)로 토큰 발급/Graph 호출까지 전달되어 각 구간 timeout을 남은 시간으로 줄인다.
+    - 마감이 지나거나 클라이언트가 요청을 취소하면 도구 작업이 취소되어 진행 중인 HTTP 호출도 바로 끊긴다.
+    """
+
+    def __init__(self, default_seconds: float, max_seconds: float, tool_seconds: dict[str, float] | None = None) -> None:
+        self.default_seconds = default_seconds
+        self.max_seconds = max_seconds
+        self.tool_seconds = tool_seconds or {}
+
+    def timeout_for(self, params: CallToolRequestParams) -> float:
+        seconds = self.tool_seconds.get(params.name, self.default_seconds)
+        requested = (params.meta or {}).get(DEADLINE_META_KEY)
+        if isinstance(requested, (int, float)) and not isinstance(requested, bool) and requested > 0:
+            seconds = requested / 1000.0
+        return min(seconds, self.max_seconds)
+
+    async def on_call_tool(
+        self,
+        context: MiddlewareContext[CallToolRequestParams],
+        call_next: CallNext[CallToolRequestParams, Any],
+    ) -> Any:
+        seconds = self.timeout_for(context.message)
+        with deadline_scope(seconds):
+            try:
+                async with asyncio.timeout(seconds):
+                    return await call_next(context)
+            except TimeoutError as e:
+                raise ToolError(f"도구 호출 시간({seconds:g}초)을 초과했습니다.") from e
+
+
+class _Gate:
+    """
+    동시 실행 한도(limit)와 대기열 상한(max_queue)을 가진 FIFO 세마포어.
+
+    슬롯이 비면 대기 중인 첫 호출에 슬롯을 그대로 넘긴다(새로 온 호출이 새치기하지 않음).
+    """
+
+    def __init__(self, scope: str, limit: int, max_queue: int) -> None:
+        self.scope = scope
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        # 슬롯 점유 시간의 지수 이동 평균(초). 재시도 권장 시간 계산용
+        self.avg_hold_seconds = 1.0
+
+    @property
+    def idle(self) -> bool:
+        return self.active == 0 and not self.waiters
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.avg_hold_seconds * (len(self.waiters) + 1) / self.limit))
+
+    def observe_hold(self, seconds: float) -> None:
+        self.avg_hold_seconds = 0.8 * self.avg_hold_seconds + 0.2 * seconds
+
+    async def acquire(self, timeout: float | None) -> bool:
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            return True
+        if len(self.waiters) >= self.max_queue:
+            return False
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        depth = metrics.gauge("admission_queue_depth", {"scope": self.scope})
+        depth.inc()
+        try:
+            await asyncio.wait_for(fut, timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                # 슬롯을 넘겨받은 직후 취소/시간 초과된 경우: 다음 대기자에게 돌려준다.
+                self.release()
+            elif fut in self.waiters:
+                self.waiters.remove(fut)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return False
+        finally:
+            depth.dec()
+
+    def release(self) -> None:
+        while self.waiters:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionControlMiddleware(Middleware):
+    """
+    MCP tool 호출의 동시 실행 수를 도구별/사용자(my_email)별/세션별로 제한한다.
+
+    - 한도가 차면 대기열(최대 max_queue)에서 queue_timeout(과 호출 마감 시간)까지만 기다린다.
+    - 대기열이 가득 찼거나 대기 시간이 지나면 바로 거절하고 재시도 권장 시간(retry_after)을 알려준다.
+    - 한도가 0 이하인 범위는 제한하지 않는다.
+    """
+
+    def __init__(
+        self,
+        tool_limit: int,
+        user_limit: int,
+        session_limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        tool_limits: dict[str, int] | None = None,
+        default_user: str = "",
+    ) -> None:
+        self.tool_limit = tool_limit
+        self.user_limit = user_limit
+        self.session_limit = session_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tool_limits = tool_limits or {}
+        self.default_user = default_user.lower()
+        self._gates: dict[tuple[str, str], _Gate] = {}
+
+    def _scopes(self, context: MiddlewareContext[CallToolRequestParams]) -> list[tuple[str, str, int]]:
+        params = context.message
+        user = str((params.arguments or {}).get("my_email") or self.default_user).lower()
+        session_id = None
+        if context.fastmcp_context is not None:
+            try:
+                session_id = context.fastmcp_context.session_id
+            except RuntimeError:
+                session_id = None
+        # 왜: 좁은 범위(세션 -> 사용자 -> 도구) 순서로 잡는다. 자기 사용자/세션 한도에서 기다리는 호출이
+        # 넓은 범위인 도구 슬롯을 물고 있으면, 한 사용자가 도구 슬롯을 다 차지해 다른 사용자가 굶는다.
+        # 순서를 항상 같게 유지해야 대기 중인 호출끼리 서로 슬롯을 물고 막히지 않는다.
+        scopes = []
+        if session_id:
+            scopes.append(("session", session_id, self.session_limit))
+        scopes.append(("user", user, self.user_limit))
+        scopes.append(("tool", params.name, self.tool_limits.get(params.name, self.tool_limit)))
+        return [scope for scope in scopes if scope[2] > 0]
+
+    def _gate(self, scope: str, key: str, limit: int) -> _Gate:
+        gate = self._gates.get((scope, key))
+        if gate is None:
+            gate = self._gates[(scope, key)] = _Gate(scope, limit, self.max_queue)
+        return gate
+
+    def _release(self, scope: str, key: str, gate: _Gate, hold_seconds: float | None) -> None:
+        if hold_seconds is not None:
+            gate.observe_hold(hold_seconds)
+        gate.release()
+        # 사용자/세션 키는 계속 늘어나므로 쉬는 게이트는 지운다.
+        if gate.idle and self._gates.get((scope, key)) is gate:
+            del self._gates[(scope, key)]
+
+    async def on_call_tool(
+        self,
+        context: MiddlewareContext[CallToolRequestParams],
+        call_next: CallNext[CallToolRequestParams, Any],
+    ) -> Any:
+        acquired: list[tuple[str, str, _Gate]] = []
+        started = time.perf_counter()
+        admitted_at: float | None = None
+        try:
+            for scope, key, limit in self._scopes(context):
+                gate = self._gate(scope, key, limit)
+                wait = self.queue_timeout
+                left = remaining()
+                if left is not None:
+                    wait = min(wait, left)
+                if not await gate.acquire(wait):
+                    metrics.counter("admission_total", {"scope": scope, "result": "rejected"}).inc()
+                    retry_after = gate.retry_after()
+                    logger.warning(
+                        "mcp_tool_rejected tool=%s scope=%s retry_after=%s",
+                        context.message.name,
+                        scope,
+                        retry_after,
+                    )
+                    raise ToolError(
+                        f"동시 실행 한도를 초과했습니다(scope={scope}). {retry_after}초 후 다시 시도하세요. "
+                        f"(retry_after={retry_after})"
+                    )
+                acquired.append((scope, key, gate))
+
+            admitted_at = time.perf_counter()
+            metrics.histogram("admission_wait_seconds").observe(admitted_at - started)
+            metrics.counter("admission_total", {"scope": "all", "result": "admitted"}).inc()
+            return await call_next(context)
+        finally:
+            hold_seconds = None if admitted_at is None else time.perf_counter() - admitted_at
+            for scope, key, gate in reversed(acquired):
+                self._release(scope, key, gate, hold_seconds)
+
+
+class _UnsavedResult(Exception):
+    # 오류 결과(is_error)나 쓰기를 하지 않은 결과(안내 문구)는 저장하지 않고 그대로 돌려주기 위한 내부 신호
+    def __init__(self, result: Any) -> None:
+        self.result = result
+
+
+class IdempotencyMiddleware(Middleware):
+    """
+    쓰기 도구(메일 발송, 일정/작업 생성 등)의 재시도를 멱등하게 만든다.
+
+    - 키: 클라이언트 _meta.idempotencyKey, 없으면 도구 인자 해시.
+    - TTL 안의 재시도는 Graph를 호출하지 않고 저장된 결과를 돌려준다(_meta.idempotentReplay=true).
+    - 도구가 쓰기 성공을 표시한(idempotency.mark_write_done) 결과만 저장한다. 안내 문구/오류는 다시 실행된다.
+    - 같은 키로 동시에 들어온 호출은 첫 호출의 결과를 기다린다.
+    """
+
+    def __init__(self, tools: set[str], store: IdempotencyStore) -> None:
+        self.tools = tools
+        self.store = store
+
+    async def on_call_tool(
+        self,
+        context: MiddlewareContext[CallToolRequestParams],
+        call_next: CallNext[CallToolRequestParams, Any],
+    ) -> Any:
+        params = context.message
+        if params.name not in self.tools:
+            return await call_next(context)
+
+        client_key = (params.meta or {}).get(IDEMPOTENCY_META_KEY)
+        key = idempotency_key(params.name, params.arguments, str(client_key) if client_key else None)
+
+        original: list[Any] = []
+
+        async def run() -> dict:
+            with track_write() as written:
+                result = await call_next(context)
+            # 도구가 mark_write_done()으로 쓰기 성공을 표시한 결과만 저장한다.
+            if not isinstance(result, ToolResult) or result.is_error or not written:
+                raise _UnsavedResult(result)
+            original.append(result)
+            return {
+                "content": _CONTENT_ADAPTER.dump_python(result.content, mode="json"),
+                "structured_content": result.structured_content,
+                "meta": result.meta,
+            }
+
+        try:
+            payload, replayed = await self.store.run(key, run)
+        except _UnsavedResult as e:
+            return e.result
+        if not replayed:
+            return original[0]
+
+        logger.info("mcp_tool_idempotent_replay tool=%s", params.name)
+        return ToolResult(
+            content=_CONTENT_ADAPTER.validate_python(payload["content"]),
+            structured_content=payload["structured_content"],
+            meta={**(payload.get("meta") or {}), "idempotentReplay": True},
+        )
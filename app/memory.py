@@ -0,0 +1,135 @@
+import gc
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any
+
+from config import settings
+from logger_config import get_logger
+from metrics import metrics
+
+logger = get_logger("app.memory")
+
+# 예산을 넘으면 한도의 이 비율까지 줄인다(한도 근처에서 항목 하나마다 축출이 반복되지 않도록).
+LOW_WATER_RATIO = 0.9
+# tracemalloc 보고에 쓰는 스택 깊이. 1이면 할당한 줄만 기록해 추적 비용이 가장 작다.
+TRACEMALLOC_FRAMES = 1
+
+
+def estimate_size(obj: Any) -> int:
+    """dict/list/str로 된 JSON 형태 값의 대략적인 메모리 크기(바이트)."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(estimate_size(v) for v in obj)
+    return size
+
+
+class MemoryBudget:
+    """
+    워커 하나의 캐시 메모리 예산. 등록된 캐시 크기의 합이 한도를 넘으면 큰 캐시부터 줄인다.
+
+    캐시는 항목을 넣은 뒤 enforce()를 부른다. 합계는 캐시가 들고 있는 값으로 계산하므로 호출 비용은 캐시 수에 비례한다.
+    """
+
+    def __init__(self, limit_bytes: int) -> None:
+        # 0 이하면 크기만 보고하고 축출하지 않는다.
+        self.limit_bytes = limit_bytes
+        self._caches: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, cache: Any) -> None:
+        """
+        캐시를 예산에 등록한다. cache는 다음 두 메서드를 구현한다.
+        - memory_bytes() -> int: 현재 차지하는 대략의 메모리(바이트)
+        - shrink(target_bytes) -> int: target_bytes 이하가 되도록 항목을 내리고 줄어든 바이트 수를 돌려준다
+
+        같은 이름으로 다시 등록하면 교체한다(테스트에서 저장소를 바꾸는 경우).
+        """
+        self._caches[name] = cache
+
+    def usage(self) -> dict[str, int]:
+        sizes = {name: cache.memory_bytes() for name, cache in list(self._caches.items())}
+        for name, size in sizes.items():
+            metrics.gauge("cache_memory_bytes", {"cache": name}).set(size)
+        return sizes
+
+    def enforce(self) -> int:
+        """한도를 넘었으면 캐시를 줄이고 줄어든 바이트 수를 돌려준다."""
+        if self.limit_bytes <= 0:
+            return 0
+        sizes = self.usage()
+        total = sum(sizes.values())
+        if total <= self.limit_bytes:
+            return 0
+        # 왜: 여러 캐시가 동시에 한도를 넘겨도 축출은 한 번만 돈다.
+        if not self._lock.acquire(blocking=False):
+            return 0
+        try:
+            excess = total - int(self.limit_bytes * LOW_WATER_RATIO)
+            freed = 0
+            for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+                if freed >= excess:
+                    break
+                released = self._caches[name].shrink(max(0, size - (excess - freed)))
+                freed += released
+                metrics.counter("cache_evicted_bytes_total", {"cache": name}).inc(released)
+            logger.info("cache_budget_enforced total=%d limit=%d freed=%d", total, self.limit_bytes, freed)
+            return freed
+        finally:
+            self._lock.release()
+
+
+def _rss_bytes() -> int | None:
+    # 리눅스(/proc)에서만 현재 RSS를 읽는다. 다른 OS면 None.
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def set_tracing(enabled: bool) -> None:
+    """tracemalloc 추적을 켜거나 끈다. 켜져 있는 동안 모든 할당에 추가 비용이 든다."""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def memory_report(budget: MemoryBudget, top: int = 15) -> dict[str, Any]:
+    """
+    RSS, 캐시별 크기/예산, 타입별 객체 수 상위, (추적 중이면) tracemalloc 할당 상위 줄을 모은다.
+
+    gc.get_objects()로 모든 객체를 훑으므로 운영자가 필요할 때만 부른다.
+    """
+    caches = budget.usage()
+    object_counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    report: dict[str, Any] = {
+        "rss_bytes": _rss_bytes(),
+        "cache_budget_bytes": budget.limit_bytes,
+        "cache_total_bytes": sum(caches.values()),
+        "caches": caches,
+        "object_counts": dict(object_counts.most_common(top)),
+        "tracemalloc": None,
+    }
+    if tracemalloc.is_tracing():
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        report["tracemalloc"] = {
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "top": [
+                {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:top]
+            ],
+        }
+    return report
+
+
+memory_budget = MemoryBudget(settings.CACHE_MEMORY_BUDGET_MB * 1024 * 1024)
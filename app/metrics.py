@@ -0,0 +1,134 @@
+import threading
+from collections import deque
+from typing import Any
+
+# 백분위 계산용으로 최근 관측값만 보관한다(메모리 상한).
+HISTOGRAM_RESERVOIR_SIZE = 1024
+
+
+def _metric_key(name: str, labels: dict[str, Any] | None) -> str:
+    if not labels:
+        return name
+    label_str = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{label_str}}}"
+
+
+class Counter:
+    """단조 증가 카운터."""
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> float:
+        return self._value
+
+
+class Gauge:
+    """현재값(큐 깊이, 캐시 크기 등)을 나타내는 게이지."""
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> float:
+        return self._value
+
+
+class Histogram:
+    """
+    관측값 분포. 전체 count/sum/min/max와 최근 관측값 기반 백분위(p50/p90/p99)를 제공한다.
+    """
+
+    def __init__(self) -> None:
+        self._count = 0
+        self._sum = 0.0
+        self._min: float | None = None
+        self._max: float | None = None
+        self._recent: deque[float] = deque(maxlen=HISTOGRAM_RESERVOIR_SIZE)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._count += 1
+            self._sum += value
+            self._min = value if self._min is None else min(self._min, value)
+            self._max = value if self._max is None else max(self._max, value)
+            self._recent.append(value)
+
+    def percentile(self, q: float) -> float | None:
+        with self._lock:
+            values = sorted(self._recent)
+        if not values:
+            return None
+        index = min(len(values) - 1, int(round(q * (len(values) - 1))))
+        return values[index]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self._count,
+            "sum": round(self._sum, 3),
+            "min": self._min,
+            "max": self._max,
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p99": self.percentile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """
+    프로세스 단위 메트릭 저장소. 이름+라벨 조합마다 메트릭 인스턴스를 하나씩 만든다.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, labels: dict[str, Any] | None):
+        key = _metric_key(name, labels)
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(key, cls())
+        return metric
+
+    def counter(self, name: str, labels: dict[str, Any] | None = None) -> Counter:
+        return self._get(Counter, name, labels)
+
+    def gauge(self, name: str, labels: dict[str, Any] | None = None) -> Gauge:
+        return self._get(Gauge, name, labels)
+
+    def histogram(self, name: str, labels: dict[str, Any] | None = None) -> Histogram:
+        return self._get(Histogram, name, labels)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            items = list(self._metrics.items())
+        return {key: metric.snapshot() for key, metric in sorted(items)}
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from config import settings
+from logger_config import get_logger
+from mail_service import is_message_detail_cached, load_message_detail
+from metrics import metrics
+
+logger = get_logger("app.prefetch")
+
+# 미리 받아 둔 메일 키를 적중률 계산용으로 기억하는 최대 개수
+_WARMED_MAX_KEYS = 4096
+
+
+class ByteBudget:
+    """
+    초당 bytes_per_second만큼 채워지는 바이트 토큰 버킷(최대 1초분).
+
+    이유: 메일 크기는 받아 보기 전에는 모르므로, 받은 뒤 크기만큼 차감하고 잔액이 음수면 다음 prefetch를 쉬게 한다.
+    """
+
+    def __init__(self, bytes_per_second: int) -> None:
+        self.rate = float(bytes_per_second)
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> bool:
+        self._refill()
+        return self.tokens > 0
+
+    def consume(self, size: int) -> None:
+        self._refill()
+        self.tokens -= size
+
+
+class MessagePrefetcher:
+    """
+    목록 조회 직후 상위 N개 메일 상세를 백그라운드로 미리 캐시에 올린다.
+
+    - 남는 동시성만 사용: 세마포어가 가득 차 있으면 기다리지 않고 건너뛴다.
+    - 대역폭 상한: ByteBudget 잔액이 없으면 건너뛴다.
+    - 세션 종료(DELETE /mcp) 시 해당 세션의 prefetch 작업을 취소한다.
+    - 적중률: 미리 받은 메일이 실제로 상세 조회되면 hit으로 센다.
+    """
+
+    def __init__(self, top_n: int, max_concurrency: int, bytes_per_second: int) -> None:
+        self.top_n = top_n
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._budget = ByteBudget(bytes_per_second)
+        self._tasks: dict[str, set[asyncio.Task]] = {}
+        self._warmed: OrderedDict[str, None] = OrderedDict()
+        self._fetched = 0
+        self._hits = 0
+
+    @staticmethod
+    def _key(my_email: str, message_id: str) -> str:
+        return f"{my_email.lower()}:{message_id}"
+
+    def schedule(self, my_email: str, message_ids: list[str], session_id: str | None) -> None:
+        """상위 top_n개 메일의 prefetch를 예약한다. 호출한 도구의 응답은 기다리지 않는다."""
+        if session_id is None:
+            # 왜: 세션이 없으면 cancel_session으로 취소할 방법이 없어 작업이 고아가 된다.
+            metrics.counter("prefetch_total", {"result": "skipped_no_session"}).inc()
+            return
+        session = session_id
+        for message_id in message_ids[: self.top_n]:
+            if not message_id:
+                continue
+            task = asyncio.create_task(self._prefetch(my_email, message_id))
+            tasks = self._tasks.setdefault(session, set())
+            tasks.add(task)
+            task.add_done_callback(lambda t, s=session: self._discard(s, t))
+
+    def _discard(self, session: str, task: asyncio.Task) -> None:
+        tasks = self._tasks.get(session)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                self._tasks.pop(session, None)
+
+    async def _prefetch(self, my_email: str, message_id: str) -> None:
+        if await is_message_detail_cached(my_email, message_id):
+            metrics.counter("prefetch_total", {"result": "skipped_cached"}).inc()
+            return
+        if not self._budget.available():
+            metrics.counter("prefetch_total", {"result": "skipped_budget"}).inc()
+            return
+        if self._semaphore.locked():
+            # 왜: prefetch는 여유가 있을 때만 한다. 대기열에 쌓으면 사용자 요청과 Graph 호출 한도를 다투게 된다.
+            metrics.counter("prefetch_total", {"result": "skipped_busy"}).inc()
+            return
+        async with self._semaphore:
+            try:
+                detail = await load_message_detail(my_email, message_id)
+            except asyncio.CancelledError:
+                metrics.counter("prefetch_total", {"result": "cancelled"}).inc()
+                raise
+            except Exception as e:
+                metrics.counter("prefetch_total", {"result": "failed"}).inc()
+                logger.debug("prefetch_failed message_id=%s error=%s", message_id, e)
+                return
+        if detail is None:
+            return
+        self._budget.consume(len(detail.get("body", "")) + len(detail.get("clean_body", "")))
+        self._warmed[self._key(my_email, message_id)] = None
+        while len(self._warmed) > _WARMED_MAX_KEYS:
+            self._warmed.popitem(last=False)
+        self._fetched += 1
+        metrics.counter("prefetch_total", {"result": "fetched"}).inc()
+        self._update_ratio()
+
+    def record_access(self, my_email: str, message_id: str) -> None:
+        """상세 조회 도구가 호출될 때 부른다. 미리 받아 둔 메일이면 hit으로 센다."""
+        key = self._key(my_email, message_id)
+        if key in self._warmed:
+            del self._warmed[key]
+            self._hits += 1
+            metrics.counter("prefetch_access_total", {"result": "hit"}).inc()
+        else:
+            metrics.counter("prefetch_access_total", {"result": "miss"}).inc()
+        self._update_ratio()
+
+    def _update_ratio(self) -> None:
+        # 미리 받은 메일 중 실제로 읽힌 비율(낮으면 PREFETCH_TOP_N을 줄인다)
+        if self._fetched:
+            metrics.gauge("prefetch_hit_ratio").set(round(self._hits / self._fetched, 4))
+
+    def cancel_session(self, session_id: str) -> int:
+        """세션의 진행 중인 prefetch를 모두 취소한다. 취소한 작업 수를 돌려준다."""
+        tasks = self._tasks.pop(session_id, set())
+        for task in tasks:
+            task.cancel()
+        return len(tasks)
+
+
+prefetcher = MessagePrefetcher(
+    top_n=settings.PREFETCH_TOP_N,
+    max_concurrency=settings.PREFETCH_MAX_CONCURRENCY,
+    bytes_per_second=settings.PREFETCH_MAX_BYTES_PER_SECOND,
+)
@@ -0,0 +1,87 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import pstats
+import re
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+from config import settings
+from logger_config import get_logger
+
+logger = get_logger("app.profiling")
+
+# 요약(.txt)에 남길 상위 함수 수
+PROFILE_SUMMARY_LINES = 40
+
+
+def _safe_name(value: str) -> str:
+    # 왜: request_id는 클라이언트가 x-request-id로 넘길 수 있으므로 파일 이름에 쓰기 전에 정리한다.
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", value)[:64] or "-"
+
+
+class RequestProfiler:
+    """
+    요청 하나를 cProfile로 측정해 PROFILE_DIR에 <시각>-<request_id>.prof/.txt로 남긴다.
+
+    - 트리거: 인증 헤더(x-profile-token) 또는 관리 도구로 예약한 다음 N개 요청.
+    - cProfile은 스레드 단위이므로 한 번에 한 요청만 측정한다(측정 중 들어온 트리거는 건너뜀).
+      같은 이벤트 루프에서 함께 돈 다른 요청의 작업도 섞일 수 있다.
+    - 스레드로 넘긴 작업(MSAL 토큰 발급 등)은 대기 시간으로만 보인다.
+    """
+
+    def __init__(self, output_dir: str, token: str) -> None:
+        self.output_dir = Path(output_dir)
+        self._token = token
+        self._armed = 0
+        self._active = False
+
+    def arm(self, count: int) -> int:
+        """다음 count개 HTTP 요청을 프로파일링하도록 예약한다. 예약된 총 개수를 돌려준다."""
+        self._armed = max(0, count)
+        return self._armed
+
+    def should_profile(self, header_value: str | None) -> bool:
+        if self._active:
+            return False
+        # 왜: str끼리 비교하면 비ASCII 헤더 값에서 TypeError가 나므로 bytes로 비교한다.
+        if header_value and self._token and hmac.compare_digest(header_value.encode("utf-8"), self._token.encode("utf-8")):
+            return True
+        if self._armed > 0:
+            self._armed -= 1
+            return True
+        return False
+
+    def output_name(self, request_id: str) -> str:
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{_safe_name(request_id)}"
+
+    @asynccontextmanager
+    async def profile(self, name: str) -> AsyncIterator[None]:
+        profiler = cProfile.Profile()
+        self._active = True
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._active = False
+            try:
+                # 파일 쓰기/통계 정렬은 루프를 막지 않도록 스레드에서 한다.
+                await asyncio.to_thread(self._dump, profiler, name)
+            except Exception:
+                logger.exception("profile_dump_failed name=%s", name)
+
+    def _dump(self, profiler: cProfile.Profile, name: str) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        prof_path = self.output_dir / f"{name}.prof"
+        profiler.dump_stats(prof_path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(PROFILE_SUMMARY_LINES)
+        (self.output_dir / f"{name}.txt").write_text(summary.getvalue(), encoding="utf-8")
+        logger.info("profile_saved path=%s", prof_path)
+
+
+profiler = RequestProfiler(settings.PROFILE_DIR, settings.PROFILING_TOKEN)
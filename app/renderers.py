@@ -0,0 +1,139 @@
+import json
+from collections.abc import Mapping
+from typing import Any, Callable, Literal, Sequence
+
+# 도구 응답 형식
+# - text: 사람이 읽기 좋은 기존 한글 텍스트(기본값)
+# - json: 프로그램 호출자를 위한 compact JSON(필드 선택 가능)
+OutputFormat = Literal["text", "json"]
+
+OUTPUT_FORMAT_DESCRIPTION = "응답 형식. 'text'(기본값, 읽기용 텍스트) 또는 'json'(프로그램 처리용 compact JSON)"
+FIELDS_DESCRIPTION = "json 형식일 때 반환할 필드 목록(콤마 구분, 예: 'id,subject'). 비우면 전체 필드"
+
+SEPARATOR = "-" * 30
+
+# (라벨, 키 또는 값 추출 함수). 라벨이 빈 문자열이면 값만 출력한다.
+TextField = tuple[str, str | Callable[[Mapping[str, Any]], Any]]
+
+
+def parse_fields(fields: str | None) -> list[str] | None:
+    if not fields:
+        return None
+    parsed = [f.strip() for f in fields.split(",") if f.strip()]
+    return parsed or None
+
+
+def project(record: Mapping[str, Any], fields: list[str] | None) -> dict[str, Any]:
+    # 왜: None 값은 JSON에서 빼서 payload를 줄인다(필드가 없으면 None과 같은 의미).
+    if fields is None:
+        return {k: v for k, v in record.items() if v is not None}
+    return {k: record[k] for k in fields if record.get(k) is not None}
+
+
+def to_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _text_value(record: Mapping[str, Any], getter: str | Callable[[Mapping[str, Any]], Any]) -> Any:
+    value = getter(record) if callable(getter) else record.get(getter)
+    return "" if value is None else value
+
+
+def render_list(
+    records: Sequence[Mapping[str, Any]],
+    *,
+    output_format: OutputFormat,
+    fields: str | None,
+    header: str,
+    empty_message: str,
+    text_fields: Sequence[TextField],
+) -> str:
+    """
+    목록형 결과를 렌더링한다.
+
+    text 형식:
+        {header}
+
+        1. {첫 번째 필드}
+           {라벨}: {값}
+        ------------------------------
+    json 형식:
+        {"count":N,"items":[{...},...]}
+    """
+    if output_format == "json":
+        selected = parse_fields(fields)
+        return to_json({"count": len(records), "items": [project(r, selected) for r in records]})
+
+    if not records:
+        return empty_message
+
+    (head_label, head_getter), *rest = text_fields
+    lines = [f"{header}\n"]
+    for idx, record in enumerate(records, 1):
+        head_value = _text_value(record, head_getter)
+        lines.append(f"{idx}. {head_label}: {head_value}" if head_label else f"{idx}. {head_value}")
+        for label, getter in rest:
+            lines.append(f"   {label}: {_text_value(record, getter)}")
+        lines.append(SEPARATOR)
+    return "\n".join(lines)
+
+
+def render_detail(
+    record: Mapping[str, Any],
+    *,
+    output_format: OutputFormat,
+    fields: str | None,
+    text_fields: Sequence[TextField],
+    body_label: str | None = None,
+    body_key: str | None = None,
+) -> str:
+    """
+    단건 상세 결과를 렌더링한다.
+
+    text 형식:
+        {라벨}: {값}
+        ------------------------------
+        {본문 라벨}:
+        {본문}
+    """
+    if output_format == "json":
+        return to_json(project(record, parse_fields(fields)))
+
+    lines = [f"{label}: {_text_value(record, getter)}" for label, getter in text_fields]
+    if body_key is not None:
+        lines.append(SEPARATOR)
+        lines.append(f"{body_label}:")
+        lines.append(str(record.get(body_key) or ""))
+    return "\n".join(lines)
+
+
+def render_message(
+    record: Mapping[str, Any],
+    *,
+    output_format: OutputFormat,
+    fields: str | None,
+    text: str,
+) -> str:
+    """
+    생성/수정/삭제처럼 결과 메시지 한 건을 돌려주는 도구용. text 형식은 호출부가 만든 문장을 그대로 쓴다.
+    """
+    if output_format == "json":
+        return to_json(project(record, parse_fields(fields)))
+    return text
+
+
+def render_notice(message: str, *, output_format: OutputFormat, status: str = "not_found") -> str:
+    """
+    '찾을 수 없음', '입력값 오류'처럼 정상 결과가 아닌 안내 문구를 형식에 맞게 돌려준다.
+    """
+    if output_format == "json":
+        return to_json({"status": status, "message": message})
+    return message
+
+
+def format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f}MB"
+    if size >= 1024:
+        return f"{size / 1024:.1f}KB"
+    return f"{size}B"
@@ -0,0 +1,262 @@
+from datetime import date, datetime, time, timedelta
+from typing import Any, Iterable
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# (시작, 종료) 반열린 구간 [start, end). 모든 값은 timezone-aware datetime.
+Interval = tuple[datetime, datetime]
+
+# getSchedule의 workingHours.timeZone.name은 Windows 표준 이름으로 오는 경우가 많아 IANA 이름으로 바꾼다.
+WINDOWS_TZ_TO_IANA = {
+    "korea standard time": "Asia/Seoul",
+    "tokyo standard time": "Asia/Tokyo",
+    "china standard time": "Asia/Shanghai",
+    "singapore standard time": "Asia/Singapore",
+    "india standard time": "Asia/Kolkata",
+    "utc": "UTC",
+    "gmt standard time": "Europe/London",
+    "w. europe standard time": "Europe/Berlin",
+    "romance standard time": "Europe/Paris",
+    "eastern standard time": "America/New_York",
+    "central standard time": "America/Chicago",
+    "mountain standard time": "America/Denver",
+    "pacific standard time": "America/Los_Angeles",
+}
+
+WEEKDAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# getSchedule 한 번에 조회할 수 있는 대상 수 상한(Graph 제한)
+GET_SCHEDULE_BATCH_SIZE = 20
+# getSchedule 조회 기간 상한(Graph 제한: 최대 62일)
+MAX_SCHEDULE_RANGE_DAYS = 62
+
+# getSchedule 상태 중 "참석 불가"로 보는 값
+BUSY_STATUSES = {"busy", "oof", "tentative"}
+
+
+def resolve_timezone(name: str | None, default: ZoneInfo) -> ZoneInfo:
+    if not name:
+        return default
+    try:
+        return ZoneInfo(WINDOWS_TZ_TO_IANA.get(name.lower(), name))
+    except (ZoneInfoNotFoundError, ValueError):
+        return default
+
+
+def parse_graph_datetime(value: str, tz: ZoneInfo) -> datetime:
+    """
+    Graph의 dateTime 문자열(예: 2026-02-20T10:00:00.0000000)을 tz 기준 aware datetime으로 바꾼다.
+    """
+    text = value.rstrip("Z")
+    # 왜: Graph는 소수점 7자리를 주지만 datetime은 마이크로초(6자리)까지만 받는다.
+    if "." in text:
+        head, fraction = text.split(".", 1)
+        text = f"{head}.{fraction[:6]}"
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=ZoneInfo("UTC") if value.endswith("Z") else tz)
+    return parsed
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> list[Interval]:
+    """
+    겹치거나 맞닿은 구간을 합친다. 정렬 O(n log n) + 선형 스캔.
+    """
+    merged: list[Interval] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def intersect_intervals(a: list[Interval], b: list[Interval]) -> list[Interval]:
+    """정렬/병합된 두 구간 목록의 교집합(two-pointer)."""
+    result: list[Interval] = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if start < end:
+            result.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def subtract_intervals(windows: list[Interval], busy: list[Interval]) -> list[Interval]:
+    """정렬/병합된 windows에서 정렬/병합된 busy 구간을 뺀 빈 구간(two-pointer)."""
+    free: list[Interval] = []
+    j = 0
+    for w_start, w_end in windows:
+        cursor = w_start
+        # window 시작 전에 끝나는 busy는 건너뛴다.
+        while j < len(busy) and busy[j][1] <= cursor:
+            j += 1
+        k = j
+        while k < len(busy) and busy[k][0] < w_end:
+            if busy[k][0] > cursor:
+                free.append((cursor, busy[k][0]))
+            cursor = max(cursor, busy[k][1])
+            k += 1
+        if cursor < w_end:
+            free.append((cursor, w_end))
+    return free
+
+
+def working_windows(
+    range_start: datetime,
+    range_end: datetime,
+    tz: ZoneInfo,
+    work_start: time,
+    work_end: time,
+    weekdays: set[int],
+) -> list[Interval]:
+    """
+    조회 구간 안의 근무시간 구간 목록. 근무시간은 tz의 현지 시각 기준으로 날마다 계산한다(DST 안전).
+    """
+    windows: list[Interval] = []
+    day: date = range_start.astimezone(tz).date() - timedelta(days=1)
+    last_day: date = range_end.astimezone(tz).date()
+    while day <= last_day:
+        if day.weekday() in weekdays:
+            start = datetime.combine(day, work_start, tzinfo=tz)
+            end = datetime.combine(day, work_end, tzinfo=tz)
+            start, end = max(start, range_start), min(end, range_end)
+            if start < end:
+                windows.append((start, end))
+        day += timedelta(days=1)
+    return merge_intervals(windows)
+
+
+def attendee_working_windows(
+    working_hours: dict[str, Any] | None,
+    range_start: datetime,
+    range_end: datetime,
+    default_tz: ZoneInfo,
+) -> list[Interval] | None:
+    """
+    getSchedule의 workingHours를 구간 목록으로 바꾼다. 정보가 없으면 None(제약 없음).
+    """
+    if not working_hours or not working_hours.get("startTime") or not working_hours.get("endTime"):
+        return None
+    tz = resolve_timezone((working_hours.get("timeZone") or {}).get("name"), default_tz)
+    days = {WEEKDAY_NAMES.index(d.lower()) for d in working_hours.get("daysOfWeek", []) if d.lower() in WEEKDAY_NAMES}
+    return working_windows(
+        range_start,
+        range_end,
+        tz,
+        time.fromisoformat(working_hours["startTime"][:8]),
+        time.fromisoformat(working_hours["endTime"][:8]),
+        days or set(range(5)),
+    )
+
+
+def candidate_slots(
+    free: list[Interval],
+    busy: list[Interval],
+    duration: timedelta,
+    step: timedelta,
+    limit: int,
+) -> list[dict[str, Any]]:
+    """
+    빈 구간에서 duration 길이의 후보 슬롯을 step 간격으로 만들고 순위를 매긴다.
+
+    순위: 날짜가 빠를수록 우선 -> 앞뒤 일정과 여유 시간(buffer)이 있는 슬롯 우선 -> 시작 시각이 빠를수록 우선.
+    이유: 연달아 붙은 회의보다 여유가 있는 슬롯이 실제로 수락될 가능성이 높다.
+    """
+    busy_ends = sorted(end for _, end in busy)
+    busy_starts = sorted(start for start, _ in busy)
+    candidates: list[dict[str, Any]] = []
+
+    for free_start, free_end in free:
+        slot_start = free_start
+        # step 단위로 정렬(예: 30분 단위)해 10:07 같은 애매한 시작 시각을 피한다.
+        offset = (slot_start - slot_start.replace(minute=0, second=0, microsecond=0)) % step
+        if offset:
+            slot_start += step - offset
+        while slot_start + duration <= free_end:
+            slot_end = slot_start + duration
+            touches_busy = slot_start in busy_ends or slot_end in busy_starts
+            candidates.append(
+                {
+                    "start": slot_start,
+                    "end": slot_end,
+                    "buffer": not touches_busy,
+                }
+            )
+            slot_start += step
+
+    candidates.sort(key=lambda c: (c["start"].date(), not c["buffer"], c["start"]))
+    return candidates[:limit]
+
+
+def busy_intervals(schedule: dict[str, Any], tz: ZoneInfo, treat_tentative_as_busy: bool = True) -> list[Interval]:
+    """getSchedule 응답의 scheduleItems 중 참석 불가 구간만 뽑는다."""
+    statuses = BUSY_STATUSES if treat_tentative_as_busy else BUSY_STATUSES - {"tentative"}
+    intervals: list[Interval] = []
+    for item in schedule.get("scheduleItems") or []:
+        if str(item.get("status", "")).lower() not in statuses:
+            continue
+        start, end = item.get("start") or {}, item.get("end") or {}
+        if not start.get("dateTime") or not end.get("dateTime"):
+            continue
+        intervals.append(
+            (
+                parse_graph_datetime(start["dateTime"], resolve_timezone(start.get("timeZone"), tz)),
+                parse_graph_datetime(end["dateTime"], resolve_timezone(end.get("timeZone"), tz)),
+            )
+        )
+    return intervals
+
+
+def find_common_slots(
+    schedules: list[dict[str, Any]],
+    range_start: datetime,
+    range_end: datetime,
+    tz: ZoneInfo,
+    duration: timedelta,
+    work_start: time,
+    work_end: time,
+    *,
+    step: timedelta = timedelta(minutes=30),
+    limit: int = 5,
+    respect_attendee_working_hours: bool = True,
+    treat_tentative_as_busy: bool = True,
+) -> tuple[list[dict[str, Any]], dict[str, str]]:
+    """
+    참석자 전원의 getSchedule 결과로 공통 빈 시간 후보를 계산한다.
+
+    1) 요청자 근무시간(tz 기준 평일 work_start~work_end) 구간을 만들고
+    2) 참석자별 workingHours(각자 타임존)와 교집합을 취한 뒤
+    3) 모든 참석자의 busy 구간을 한 번에 병합해 빼고
+    4) duration 길이 슬롯을 순위대로 고른다.
+
+    Returns:
+        (후보 슬롯 목록, 일정을 조회하지 못한 참석자 {주소: 사유})
+    """
+    windows = working_windows(range_start, range_end, tz, work_start, work_end, set(range(5)))
+    all_busy: list[Interval] = []
+    unavailable: dict[str, str] = {}
+
+    for schedule in schedules:
+        schedule_id = schedule.get("scheduleId", "")
+        if schedule.get("error"):
+            # 왜: 외부 사용자/권한 없는 메일함 하나 때문에 전체 계산을 막지 않고, 결과에 표시만 한다.
+            unavailable[schedule_id] = (schedule["error"] or {}).get("message", "조회 실패")
+            continue
+        if respect_attendee_working_hours:
+            attendee_windows = attendee_working_windows(schedule.get("workingHours"), range_start, range_end, tz)
+            if attendee_windows is not None:
+                windows = intersect_intervals(windows, attendee_windows)
+        all_busy.extend(busy_intervals(schedule, tz, treat_tentative_as_busy))
+
+    busy = merge_intervals(all_busy)
+    # 후보 시각 정렬(30분 단위 등)과 출력은 요청자 타임존 기준으로 한다.
+    free = [(s.astimezone(tz), e.astimezone(tz)) for s, e in subtract_intervals(windows, busy) if e - s >= duration]
+    return candidate_slots(free, busy, duration, step, limit), unavailable
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar
+
+from config import settings
+from logger_config import get_logger
+from memory import memory_budget
+
+logger = get_logger("app.store")
+
+T = TypeVar("T")
+
+
+class SharedStore(ABC):
+    """
+    여러 워커가 함께 쓰는 키-값 저장소 인터페이스.
+
+    토큰 캐시/응답 캐시처럼 워커마다 따로 두면 낭비가 되는 상태를 여기에 둔다.
+    구현체는 Redis 호환(RedisStore)과 테스트/단일 프로세스용(MemoryStore) 두 가지다.
+
+    - 동기 메서드(get/set/...)는 스레드에서 도는 코드(MSAL 토큰 발급 등)용이다.
+    - 이벤트 루프에서는 async_* 메서드를 쓴다. 네트워크 왕복이 있는 구현은 스레드에서 실행해 루프를 막지 않는다.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: float | None = None) -> None: ...
+
+    @abstractmethod
+    def add(self, key: str, value: bytes, ttl_seconds: float | None = None) -> bool:
+        """키가 없을 때만 저장한다(Redis SET NX). 저장했으면 True."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1) -> int: ...
+
+    async def _offload(self, func: Callable[..., T], *args: Any) -> T:
+        # 왜: 원격 저장소 호출은 socket_timeout(2초)까지 블로킹될 수 있으므로 루프 밖에서 실행한다.
+        return await asyncio.to_thread(func, *args)
+
+    async def async_get(self, key: str) -> bytes | None:
+        return await self._offload(self.get, key)
+
+    async def async_set(self, key: str, value: bytes, ttl_seconds: float | None = None) -> None:
+        await self._offload(self.set, key, value, ttl_seconds)
+
+    async def async_add(self, key: str, value: bytes, ttl_seconds: float | None = None) -> bool:
+        return await self._offload(self.add, key, value, ttl_seconds)
+
+    async def async_delete(self, key: str) -> None:
+        await self._offload(self.delete, key)
+
+    @staticmethod
+    def _decode_json(key: str, raw: bytes | None) -> Any:
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            # 왜: 손상된 캐시 항목 하나 때문에 도구 호출이 실패하면 안 되므로 miss로 취급한다.
+            logger.warning("shared_store_invalid_json key=%s", key)
+            return None
+
+    @staticmethod
+    def _encode_json(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def get_json(self, key: str) -> Any:
+        return self._decode_json(key, self.get(key))
+
+    def set_json(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        self.set(key, self._encode_json(value), ttl_seconds)
+
+    async def async_get_json(self, key: str) -> Any:
+        return self._decode_json(key, await self.async_get(key))
+
+    async def async_set_json(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        await self.async_set(key, self._encode_json(value), ttl_seconds)
+
+    @contextmanager
+    def lock(self, name: str, ttl_seconds: float = 10.0, wait_seconds: float = 10.0) -> Iterator[bool]:
+        """
+        워커 간 상호배제 락. 대기 시간 안에 잡지 못하면 False를 넘기고 그대로 진행한다.
+
+        이유: 락 서버 장애가 곧 서비스 장애가 되지 않도록, 락은 중복 작업을 줄이는 용도로만 쓴다.
+        """
+        lock_key = f"lock:{name}"
+        owner = uuid.uuid4().hex.encode()
+        deadline = time.monotonic() + wait_seconds
+        acquired = self.add(lock_key, owner, ttl_seconds)
+        while not acquired and time.monotonic() < deadline:
+            time.sleep(0.05)
+            acquired = self.add(lock_key, owner, ttl_seconds)
+        try:
+            yield acquired
+        finally:
+            if acquired and self.get(lock_key) == owner:
+                self.delete(lock_key)
+
+    @asynccontextmanager
+    async def async_lock(self, name: str, ttl_seconds: float = 10.0, wait_seconds: float = 10.0) -> AsyncIterator[bool]:
+        """lock()의 이벤트 루프용 버전. 기다리는 동안 루프를 막지 않는다."""
+        lock_key = f"lock:{name}"
+        owner = uuid.uuid4().hex.encode()
+        deadline = time.monotonic() + wait_seconds
+        acquired = await self.async_add(lock_key, owner, ttl_seconds)
+        while not acquired and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            acquired = await self.async_add(lock_key, owner, ttl_seconds)
+        try:
+            yield acquired
+        finally:
+            if acquired and await self.async_get(lock_key) == owner:
+                await self.async_delete(lock_key)
+
+
+# 메모리 예산(memory.py)을 넘으면 지워도 되는 순수 캐시 키 접두사. 지워져도 Graph에서 다시 받으면 된다.
+# 토큰 캐시/락/멱등 결과처럼 지우면 동작이 달라지는 키는 넣지 않는다.
+CACHE_KEY_PREFIXES = ("mail:detail:", "todo:lists:")
+# 항목 하나에 붙는 dict/tuple 부가 비용(대략)
+_ENTRY_OVERHEAD_BYTES = 120
+
+
+class MemoryStore(SharedStore):
+    """
+    프로세스 내부 dict 기반 구현. 단일 워커 실행과 테스트에서 Redis 대신 사용한다.
+
+    키/값 크기 합계를 들고 있어 메모리 예산에 등록할 수 있다(memory_bytes/shrink).
+    dict 순서를 마지막 쓰기 순으로 유지해, 줄일 때는 오래전에 쓴 캐시 항목부터 지운다.
+    """
+
+    async def _offload(self, func: Callable[..., T], *args: Any) -> T:
+        # 프로세스 메모리 dict 접근은 I/O가 없으므로 스레드로 넘기지 않고 바로 실행한다.
+        return func(*args)
+
+    def __init__(self, evictable_prefixes: tuple[str, ...] = CACHE_KEY_PREFIXES) -> None:
+        self._data: dict[str, tuple[bytes, float | None]] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._evictable_prefixes = evictable_prefixes
+
+    @staticmethod
+    def _entry_size(key: str, value: bytes) -> int:
+        return len(key) + len(value) + _ENTRY_OVERHEAD_BYTES
+
+    def _put(self, key: str, value: bytes, expires_at: float | None) -> None:
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._bytes -= self._entry_size(key, old[0])
+        self._data[key] = (value, expires_at)
+        self._bytes += self._entry_size(key, value)
+
+    def _remove(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._bytes -= self._entry_size(key, item[0])
+
+    def _alive(self, key: str, now: float) -> tuple[bytes, float | None] | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= now:
+            self._remove(key)
+            return None
+        return item
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            item = self._alive(key, time.monotonic())
+            return item[0] if item else None
+
+    def set(self, key: str, value: bytes, ttl_seconds: float | None = None) -> None:
+        with self._lock:
+            expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+            self._put(key, value, expires_at)
+        memory_budget.enforce()
+
+    def add(self, key: str, value: bytes, ttl_seconds: float | None = None) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self._alive(key, now) is not None:
+                return False
+            self._put(key, value, now + ttl_seconds if ttl_seconds else None)
+        memory_budget.enforce()
+        return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            item = self._alive(key, time.monotonic())
+            current = int(item[0]) if item else 0
+            value = current + amount
+            self._put(key, str(value).encode(), item[1] if item else None)
+            return value
+
+    def memory_bytes(self) -> int:
+        return self._bytes
+
+    def shrink(self, target_bytes: int) -> int:
+        with self._lock:
+            before = self._bytes
+            # 왜: 만료 항목은 조회될 때만 지워지므로, 먼저 만료된 항목 전체를 정리한다.
+            now = time.monotonic()
+            for key in [k for k, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]:
+                self._remove(key)
+            if self._bytes > target_bytes:
+                for key in [k for k in self._data if k.startswith(self._evictable_prefixes)]:
+                    self._remove(key)
+                    if self._bytes <= target_bytes:
+                        break
+            return before - self._bytes
+
+
+class RedisStore(SharedStore):
+    """
+    Redis 호환 서버(Redis/Valkey 등)를 사용하는 구현. 멀티 워커 배포에서 사용한다.
+    """
+
+    def __init__(self, url: str, prefix: str) -> None:
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SHARED_STORE_URL에 redis 주소를 쓰려면 `pip install redis`가 필요합니다.") from e
+
+        # 왜: 토큰 캐시 로드처럼 스레드에서 도는 동기 경로에서도 쓰므로 동기 클라이언트 하나를 둔다.
+        # 이벤트 루프에서는 async_* 메서드가 호출을 스레드로 넘기므로(SharedStore._offload) 루프를 막지 않는다.
+        self._client = redis.Redis.from_url(url, socket_timeout=2.0, socket_connect_timeout=2.0)
+        self._prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}{key}"
+
+    def get(self, key: str) -> bytes | None:
+        return self._client.get(self._key(key))
+
+    def set(self, key: str, value: bytes, ttl_seconds: float | None = None) -> None:
+        px = int(ttl_seconds * 1000) if ttl_seconds else None
+        self._client.set(self._key(key), value, px=px)
+
+    def add(self, key: str, value: bytes, ttl_seconds: float | None = None) -> bool:
+        px = int(ttl_seconds * 1000) if ttl_seconds else None
+        return bool(self._client.set(self._key(key), value, px=px, nx=True))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._key(key))
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        return int(self._client.incrby(self._key(key), amount))
+
+
+def build_store(url: str, prefix: str) -> SharedStore:
+    if not url or url == "memory://":
+        store = MemoryStore()
+        memory_budget.register("shared_store", store)
+        return store
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url, prefix)
+    raise ValueError(f"지원하지 않는 SHARED_STORE_URL 입니다: {url}")
+
+
+_store: SharedStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_shared_store() -> SharedStore:
+    """설정(SHARED_STORE_URL)에 맞는 프로세스 단일 저장소 인스턴스를 돌려준다."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = build_store(settings.SHARED_STORE_URL, settings.SHARED_STORE_PREFIX)
+    return _store
+
+
+def set_shared_store(store: SharedStore) -> None:
+    """테스트나 임베딩 환경에서 저장소 구현을 교체한다."""
+    global _store
+    _store = store
+    if isinstance(store, MemoryStore):
+        memory_budget.register("shared_store", store)
+
+
+def build_session_state_store():
+    """
+    FastMCP 세션 상태(ctx.set_state)를 워커 간에 공유하기 위한 AsyncKeyValue 저장소를 만든다.
+
+    이유: 멀티 워커에서는 같은 세션의 요청이 매번 다른 워커로 갈 수 있으므로,
+    세션 상태가 프로세스 메모리에만 있으면 요청마다 상태가 사라진다.
+    """
+    url = settings.SHARED_STORE_URL
+    if not url or url == "memory://":
+        return None  # FastMCP 기본(프로세스 메모리) 저장소 사용
+
+    from key_value.aio.stores.redis import RedisStore as KeyValueRedisStore
+
+    return KeyValueRedisStore(url=url, default_collection=f"{settings.SHARED_STORE_PREFIX}session")
@@ -0,0 +1,324 @@
+import asyncio
+import hmac
+import secrets
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import httpx
+from fastmcp.server.lifespan import lifespan
+
+from calendar_store import calendar_store
+from config import settings
+from graph_client import graph_request
+from logger_config import get_logger
+from mail_service import invalidate_message_detail
+from metrics import metrics
+from shared_store import get_shared_store
+from todo_service import invalidate_task_lists, load_task_lists
+
+logger = get_logger("app.subscriptions")
+
+WEBHOOK_PATH = "/graph/notifications"
+
+# 구독 정보(구독 id -> 종류/사용자/만료)는 워커 간에 공유해야 어느 워커가 알림을 받아도 대상 캐시를 찾을 수 있다.
+SUBSCRIPTIONS_KEY = "graph:subscriptions"
+CLIENT_STATE_KEY = "graph:client_state"
+
+CHANGE_TYPES = "created,updated,deleted"
+
+
+def desired_resources(my_email: str, kinds: set[str], task_list_ids: list[str]) -> dict[str, str]:
+    """사용자 한 명에 대해 구독해야 할 Graph 리소스 경로 -> 종류(mail/events/todo)."""
+    resources: dict[str, str] = {}
+    if "mail" in kinds:
+        resources[f"/users/{my_email}/messages"] = "mail"
+    if "events" in kinds:
+        resources[f"/users/{my_email}/events"] = "events"
+    if "todo" in kinds:
+        # 왜: To Do 작업 구독은 목록 단위로만 만들 수 있다.
+        for list_id in task_list_ids:
+            resources[f"/users/{my_email}/todo/lists/{list_id}/tasks"] = "todo"
+    return resources
+
+
+def _iso(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.0000000Z")
+
+
+def _parse_expiration(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00").split(".")[0]).replace(tzinfo=timezone.utc)
+
+
+class SubscriptionManager:
+    """
+    Graph 변경 알림 구독을 만들고 만료 전에 갱신한다. 알림을 받으면 해당 캐시 항목만 무효화한다.
+
+    이유: 캐시를 TTL/polling만으로 맞추면 Graph 호출량이 사용량에 비례해 늘어난다.
+    변경 알림으로 바뀐 항목만 버리면 캐시를 길게 유지하면서도 오래된 데이터를 돌려주지 않는다.
+    """
+
+    def __init__(self, notification_url: str, users: list[str], kinds: set[str]) -> None:
+        self.notification_url = notification_url
+        self.users = users
+        self.kinds = kinds
+        self._client_state: str | None = None
+        self._background: set[asyncio.Task] = set()
+
+    async def get_client_state(self) -> str:
+        """알림 위조를 막기 위한 공유 비밀값. 설정이 없으면 워커들이 공유 저장소에서 하나를 정해 쓴다."""
+        if self._client_state is None:
+            if settings.NOTIFICATION_CLIENT_STATE:
+                self._client_state = settings.NOTIFICATION_CLIENT_STATE
+            else:
+                store = get_shared_store()
+                await store.async_add(CLIENT_STATE_KEY, secrets.token_urlsafe(24).encode())
+                self._client_state = (await store.async_get(CLIENT_STATE_KEY) or b"").decode()
+        return self._client_state
+
+    async def registry(self) -> dict[str, dict[str, Any]]:
+        """구독 id -> {resource, kind, user, expires}."""
+        return await get_shared_store().async_get_json(SUBSCRIPTIONS_KEY) or {}
+
+    async def _save_registry(self, registry: dict[str, dict[str, Any]]) -> None:
+        await get_shared_store().async_set_json(SUBSCRIPTIONS_KEY, registry)
+
+    async def register_local(self, subscription_id: str, kind: str, user: str, resource: str = "") -> None:
+        """Graph 없이 구독을 등록한다(LocalNotificationPublisher와 함께 오프라인 테스트용)."""
+        registry = await self.registry()
+        registry[subscription_id] = {
+            "resource": resource,
+            "kind": kind,
+            "user": user.lower(),
+            "expires": _iso(datetime.now(timezone.utc) + timedelta(minutes=settings.SUBSCRIPTION_LIFETIME_MINUTES)),
+        }
+        await self._save_registry(registry)
+
+    async def _create(self, resource: str, expires: datetime) -> dict[str, Any]:
+        response = await graph_request(
+            "POST",
+            "/subscriptions",
+            json={
+                "changeType": CHANGE_TYPES,
+                "notificationUrl": self.notification_url,
+                "lifecycleNotificationUrl": self.notification_url,
+                "resource": resource,
+                "expirationDateTime": _iso(expires),
+                "clientState": await self.get_client_state(),
+            },
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def _renew(self, subscription_id: str, expires: datetime) -> bool:
+        response = await graph_request(
+            "PATCH",
+            f"/subscriptions/{subscription_id}",
+            json={"expirationDateTime": _iso(expires)},
+        )
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    async def ensure_subscriptions(self) -> None:
+        """
+        필요한 구독을 만들고, 만료가 가까운 구독은 갱신하고, 더 이상 필요 없는 구독은 지운다.
+        여러 워커가 동시에 돌지 않도록 공유 락을 잡은 워커만 수행한다.
+        """
+        store = get_shared_store()
+        async with store.async_lock("graph:subscriptions", ttl_seconds=120, wait_seconds=0) as acquired:
+            if not acquired:
+                return
+
+            now = datetime.now(timezone.utc)
+            renew_before = timedelta(seconds=settings.SUBSCRIPTION_RENEW_BEFORE_SECONDS)
+            new_expires = now + timedelta(minutes=settings.SUBSCRIPTION_LIFETIME_MINUTES)
+
+            desired: dict[str, tuple[str, str]] = {}
+            for user in self.users:
+                list_ids = [item["id"] for item in await load_task_lists(user)] if "todo" in self.kinds else []
+                for resource, kind in desired_resources(user, self.kinds, list_ids).items():
+                    desired[resource] = (kind, user.lower())
+
+            registry = await self.registry()
+            by_resource = {info["resource"]: sub_id for sub_id, info in registry.items()}
+
+            for sub_id, info in list(registry.items()):
+                if info["resource"] not in desired:
+                    registry.pop(sub_id)
+                    try:
+                        await graph_request("DELETE", f"/subscriptions/{sub_id}")
+                        logger.info("subscription_deleted id=%s resource=%s", sub_id, info["resource"])
+                    except httpx.HTTPError as e:
+                        logger.warning("subscription_delete_failed id=%s error=%s", sub_id, e)
+
+            for resource, (kind, user) in desired.items():
+                sub_id = by_resource.get(resource)
+                try:
+                    if sub_id is not None and sub_id in registry:
+                        if _parse_expiration(registry[sub_id]["expires"]) - now > renew_before:
+                            continue
+                        if await self._renew(sub_id, new_expires):
+                            registry[sub_id]["expires"] = _iso(new_expires)
+                            metrics.counter("graph_subscriptions_total", {"action": "renewed"}).inc()
+                            continue
+                        # 구독이 이미 사라졌으면(404) 새로 만든다.
+                        registry.pop(sub_id)
+                    created = await self._create(resource, new_expires)
+                    registry[created["id"]] = {
+                        "resource": resource,
+                        "kind": kind,
+                        "user": user,
+                        "expires": created.get("expirationDateTime", _iso(new_expires)),
+                    }
+                    metrics.counter("graph_subscriptions_total", {"action": "created"}).inc()
+                    logger.info("subscription_created id=%s resource=%s", created["id"], resource)
+                except httpx.HTTPError as e:
+                    # 왜: 구독 하나가 실패해도 나머지 구독 갱신은 계속한다(다음 주기에 다시 시도).
+                    metrics.counter("graph_subscriptions_total", {"action": "failed"}).inc()
+                    logger.warning("subscription_sync_failed resource=%s error=%s", resource, e)
+
+            await self._save_registry(registry)
+
+    async def run_renewal_loop(self) -> None:
+        while True:
+            try:
+                await self.ensure_subscriptions()
+            except Exception:
+                logger.exception("subscription_renewal_failed")
+            await asyncio.sleep(settings.SUBSCRIPTION_CHECK_INTERVAL_SECONDS)
+
+    async def verify(self, notification: Any) -> bool:
+        """
+        웹훅은 외부에서 누구나 부를 수 있으므로 형식이 이상한 알림은 예외 없이 False로 거른다.
+        """
+        if not isinstance(notification, dict):
+            return False
+        received = str(notification.get("clientState") or "").encode("utf-8")
+        # 왜: str끼리 비교하면 비ASCII 값에서 TypeError가 나므로 bytes로 비교한다.
+        return hmac.compare_digest(received, (await self.get_client_state()).encode("utf-8"))
+
+    async def handle_notification(self, notification: dict[str, Any]) -> str:
+        """
+        알림 1건을 반영한다. 처리 결과(applied/ignored/lifecycle/unknown)를 돌려준다.
+        """
+        sub_id = notification.get("subscriptionId", "")
+        info = (await self.registry()).get(sub_id)
+        if info is None:
+            return "unknown"
+
+        lifecycle_event = notification.get("lifecycleEvent")
+        if lifecycle_event:
+            # reauthorizationRequired/subscriptionRemoved/missed: 구독을 다시 맞추고, 놓친 변경이 있을 수 있으므로 캐시를 비운다.
+            logger.info("subscription_lifecycle id=%s event=%s", sub_id, lifecycle_event)
+            await self._invalidate_all(info)
+            # 왜: 구독 목록은 ensure_subscriptions가 공유 락을 잡고 읽고-고치고-저장한다. 여기서 락 없이 지우면
+            # 서로의 저장을 덮어쓰므로, subscriptionRemoved도 목록은 건드리지 않고 재정비에 맡긴다
+            # (갱신이 404로 실패하면 목록에서 빼고 새로 만든다).
+            # 알림 응답(202)을 늦추지 않도록 구독 재정비는 백그라운드에서 한다.
+            task = asyncio.create_task(self.ensure_subscriptions())
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            return "lifecycle"
+
+        change_type = notification.get("changeType", "")
+        resource_data = notification.get("resourceData")
+        resource_id = str(resource_data.get("id") or "") if isinstance(resource_data, dict) else ""
+        kind, user = info["kind"], info["user"]
+
+        if kind == "mail" and resource_id:
+            # 메일 상세 캐시는 메일 id 단위이므로 바뀐 메일만 버린다.
+            await invalidate_message_detail(user, resource_id)
+        elif kind == "events":
+            if change_type == "deleted" and resource_id:
+                calendar_store.remove_event(user, resource_id)
+            else:
+                # 다음 조회 때 deltaLink로 바뀐 일정만 받아오도록 표시한다.
+                calendar_store.mark_stale(user)
+        elif kind == "todo":
+            # 작업 자체는 캐시하지 않는다. 목록이 지워지면 작업 알림도 오므로 이름 -> id 캐시만 다시 읽게 한다.
+            if change_type == "deleted":
+                await invalidate_task_lists(user)
+        else:
+            return "ignored"
+        return "applied"
+
+    async def _invalidate_all(self, info: dict[str, Any]) -> None:
+        if info["kind"] == "events":
+            calendar_store.mark_stale(info["user"])
+        elif info["kind"] == "todo":
+            await invalidate_task_lists(info["user"])
+
+
+def _build_manager() -> SubscriptionManager:
+    users = [u.strip() for u in settings.NOTIFICATION_USERS.split(",") if u.strip()] or [settings.DEFAULT_USER_EMAIL]
+    kinds = {k.strip().lower() for k in settings.NOTIFICATION_RESOURCES.split(",") if k.strip()}
+    return SubscriptionManager(settings.NOTIFICATION_URL, users, kinds)
+
+
+subscription_manager = _build_manager()
+
+
+@lifespan
+async def subscription_lifespan(server):
+    """
+    NOTIFICATION_URL이 설정된 경우 서버 실행 동안 구독 갱신 루프를 돌린다.
+    """
+    task = None
+    if settings.NOTIFICATION_URL:
+        task = asyncio.create_task(subscription_manager.run_renewal_loop())
+    try:
+        yield {}
+    finally:
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+
+class LocalNotificationPublisher:
+    """
+    Graph 대신 웹훅으로 알림을 보내는 로컬 발행기. 오프라인 테스트/개발용.
+
+    사용 예:
+        publisher = LocalNotificationPublisher(app, await subscription_manager.get_client_state())
+        await publisher.validate()
+        await publisher.publish("sub-1", "updated", "message-id")
+    """
+
+    def __init__(self, app_or_url: Any, client_state: str, path: str = WEBHOOK_PATH) -> None:
+        if isinstance(app_or_url, str):
+            self._client = httpx.AsyncClient(base_url=app_or_url)
+        else:
+            self._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app_or_url), base_url="http://local")
+        self._client_state = client_state
+        self._path = path
+
+    async def validate(self, token: str = "local-validation") -> httpx.Response:
+        """구독 생성 시 Graph가 보내는 유효성 확인 요청을 흉내 낸다."""
+        return await self._client.post(self._path, params={"validationToken": token})
+
+    async def publish(
+        self,
+        subscription_id: str,
+        change_type: str,
+        resource_id: str,
+        *,
+        client_state: str | None = None,
+        lifecycle_event: str | None = None,
+    ) -> httpx.Response:
+        notification: dict[str, Any] = {
+            "subscriptionId": subscription_id,
+            "clientState": self._client_state if client_state is None else client_state,
+            "tenantId": "local",
+        }
+        if lifecycle_event:
+            notification["lifecycleEvent"] = lifecycle_event
+        else:
+            notification["changeType"] = change_type
+            notification["resourceData"] = {"id": resource_id}
+        return await self._client.post(self._path, json={"value": [notification]})
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
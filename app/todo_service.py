@@ -0,0 +1,145 @@
+import asyncio
+from typing import Any
+
+from config import settings
+from graph_client import graph_request
+from logger_config import get_logger
+from metrics import metrics
+from shared_store import get_shared_store
+
+logger = get_logger("app.todo")
+
+# Graph JSON batch 한 번에 담을 수 있는 최대 요청 수
+GRAPH_BATCH_SIZE = 20
+# 배치 안에서 스로틀링(429/503)된 요청을 다시 보낼 때 기다리는 최대 시간(초)
+BATCH_RETRY_MAX_WAIT_SECONDS = 5.0
+
+# wellknownListName=defaultList 목록("작업"/"Tasks")을 가리키는 별칭
+DEFAULT_LIST_ALIASES = {"default", "defaultlist", "기본", "기본 목록"}
+
+
+def _lists_key(my_email: str) -> str:
+    return f"todo:lists:{my_email.lower()}"
+
+
+async def invalidate_task_lists(my_email: str) -> None:
+    await get_shared_store().async_delete(_lists_key(my_email))
+
+
+async def load_task_lists(my_email: str, refresh: bool = False) -> list[dict[str, Any]]:
+    """
+    사용자의 To Do 목록(id, display_name, wellknown)을 캐시에서 읽거나 Graph에서 가져온다.
+    """
+    store = get_shared_store()
+    key = _lists_key(my_email)
+    if not refresh:
+        cached = await store.async_get_json(key)
+        if cached is not None:
+            metrics.counter("todo_list_cache_total", {"result": "hit"}).inc()
+            return cached
+
+    metrics.counter("todo_list_cache_total", {"result": "miss"}).inc()
+    response = await graph_request(
+        "GET",
+        f"/users/{my_email}/todo/lists",
+        params={"$select": "id,displayName,wellknownListName"},
+    )
+    response.raise_for_status()
+    lists = [
+        {
+            "id": item.get("id", ""),
+            "display_name": item.get("displayName", ""),
+            "wellknown": item.get("wellknownListName", ""),
+        }
+        for item in response.json().get("value", [])
+    ]
+    await store.async_set_json(key, lists, settings.TODO_LIST_CACHE_TTL_SECONDS)
+    return lists
+
+
+def _match_list(lists: list[dict[str, Any]], name_or_id: str) -> str | None:
+    value = name_or_id.strip()
+    lowered = value.lower()
+    for item in lists:
+        if item["id"] == value:
+            return item["id"]
+    for item in lists:
+        if item["display_name"].lower() == lowered:
+            return item["id"]
+    if lowered in DEFAULT_LIST_ALIASES:
+        for item in lists:
+            if item.get("wellknown") == "defaultList":
+                return item["id"]
+    return None
+
+
+async def resolve_task_list_id(my_email: str, name_or_id: str) -> str | None:
+    """
+    목록 id 또는 표시 이름(대소문자 무시)을 목록 id로 바꾼다. 찾지 못하면 None.
+
+    이유: 에이전트가 매번 list_todo_lists를 먼저 호출하지 않고 "업무" 같은 이름으로 바로 작업을 다루게 한다.
+    캐시에 없으면 새로 만든 목록일 수 있으므로 한 번만 다시 읽는다.
+    """
+    list_id = _match_list(await load_task_lists(my_email), name_or_id)
+    if list_id is None:
+        list_id = _match_list(await load_task_lists(my_email, refresh=True), name_or_id)
+    return list_id
+
+
+async def _send_batch(requests: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    response = await graph_request("POST", "/$batch", json={"requests": requests})
+    response.raise_for_status()
+    return {item["id"]: item for item in response.json().get("responses", [])}
+
+
+async def create_tasks_batch(my_email: str, list_id: str, payloads: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    여러 작업을 Graph JSON batch($batch, 요청 20개 단위)로 한 번에 생성한다.
+
+    스로틀링(429/503)된 요청만 Retry-After(최대 BATCH_RETRY_MAX_WAIT_SECONDS)만큼 기다렸다가 한 번 더 보낸다.
+
+    Returns:
+        입력 순서대로 {"index", "status", "task"(성공 시 Graph 응답) 또는 "error"} 목록
+    """
+    url = f"/users/{my_email}/todo/lists/{list_id}/tasks"
+    requests = [
+        {
+            "id": str(idx),
+            "method": "POST",
+            "url": url,
+            "headers": {"Content-Type": "application/json"},
+            "body": payload,
+        }
+        for idx, payload in enumerate(payloads)
+    ]
+
+    async def run(pending: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        chunks = [pending[i:i + GRAPH_BATCH_SIZE] for i in range(0, len(pending), GRAPH_BATCH_SIZE)]
+        merged: dict[str, dict[str, Any]] = {}
+        for result in await asyncio.gather(*(_send_batch(chunk) for chunk in chunks)):
+            merged.update(result)
+        return merged
+
+    responses = await run(requests)
+    throttled = [r for r in requests if responses.get(r["id"], {}).get("status") in (429, 503)]
+    if throttled:
+        wait = max(
+            float((responses[r["id"]].get("headers") or {}).get("Retry-After", 1) or 1) for r in throttled
+        )
+        logger.info("todo_batch_throttled count=%d wait=%.1fs", len(throttled), wait)
+        await asyncio.sleep(min(wait, BATCH_RETRY_MAX_WAIT_SECONDS))
+        responses.update(await run(throttled))
+
+    results = []
+    for idx in range(len(payloads)):
+        item = responses.get(str(idx), {})
+        status = item.get("status", 0)
+        body = item.get("body") or {}
+        if 200 <= status < 300:
+            results.append({"index": idx, "status": status, "task": body})
+        else:
+            message = (body.get("error") or {}).get("message") if isinstance(body, dict) else None
+            results.append({"index": idx, "status": status, "error": message or f"HTTP {status}"})
+    metrics.counter("todo_batch_tasks_total", {"result": "created"}).inc(sum(1 for r in results if "task" in r))
+    metrics.counter("todo_batch_tasks_total", {"result": "failed"}).inc(sum(1 for r in results if "error" in r))
+    return results
@@ -0,0 +1,102 @@
+import base64
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from config import settings
+from logger_config import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: 파일 락 없이 원자적 교체만 사용
+    fcntl = None
+
+logger = get_logger("app.token_cache")
+
+
+def _fernet_key(secret: str) -> bytes:
+    # 왜: Fernet 키는 32바이트 urlsafe base64여야 하므로 임의 길이 비밀값을 SHA-256으로 맞춘다.
+    return base64.urlsafe_b64encode(hashlib.sha256(secret.encode("utf-8")).digest())
+
+
+class FileTokenCache:
+    """
+    MSAL 직렬화 캐시를 암호화해 파일로 보관한다. 재시작/새 워커가 토큰 발급 왕복 없이 시작하게 한다.
+
+    - 암호화: Fernet(AES-128-CBC + HMAC). 키를 따로 주지 않으면 클라이언트 시크릿에서 만든다.
+    - 쓰기: 같은 디렉터리 임시 파일에 쓴 뒤 os.replace로 교체(읽는 쪽이 반쯤 쓴 파일을 보지 않음).
+    - 락: <파일>.lock에 fcntl.flock. 읽기는 공유 락, 쓰기는 배타 락.
+    """
+
+    def __init__(self, path: str | os.PathLike, secret: str) -> None:
+        self.path = Path(path)
+        self._lock_path = self.path.with_name(self.path.name + ".lock")
+        self._fernet = Fernet(_fernet_key(secret))
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self) -> str | None:
+        """복호화한 직렬화 캐시를 돌려준다. 파일이 없거나 손상/키 불일치면 None."""
+        try:
+            with self._locked(exclusive=False):
+                data = self.path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("token_cache_read_failed path=%s error=%s", self.path, e)
+            return None
+        try:
+            return self._fernet.decrypt(data).decode("utf-8")
+        except InvalidToken:
+            # 왜: 키가 바뀌었거나 파일이 깨진 경우 새로 발급하면 되므로 miss로 취급한다.
+            logger.warning("token_cache_invalid path=%s", self.path)
+            return None
+
+    def save(self, blob: str) -> None:
+        """직렬화 캐시를 암호화해 원자적으로 저장한다. 실패해도 예외를 올리지 않는다."""
+        token = self._fernet.encrypt(blob.encode("utf-8"))
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._locked(exclusive=True):
+                fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(token)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.chmod(tmp_path, 0o600)
+                    os.replace(tmp_path, self.path)
+                except BaseException:
+                    Path(tmp_path).unlink(missing_ok=True)
+                    raise
+        except OSError as e:
+            logger.warning("token_cache_write_failed path=%s error=%s", self.path, e)
+
+
+def _build_file_cache() -> FileTokenCache | None:
+    if not settings.TOKEN_CACHE_FILE:
+        return None
+    return FileTokenCache(
+        settings.TOKEN_CACHE_FILE,
+        settings.TOKEN_CACHE_ENCRYPTION_KEY or settings.AZURE_CLIENT_SECRET,
+    )
+
+
+# TOKEN_CACHE_FILE이 비어 있으면 None(파일 캐시 사용 안 함)
+file_token_cache = _build_file_cache()
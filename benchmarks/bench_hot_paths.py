@@ -0,0 +1,358 @@
+"""
+요청마다 실행되는 미들웨어/로깅 핫패스의 호출당 비용(ns)과 메모리 할당량을 측정한다.
+
+실행:
+    python benchmarks/bench_hot_paths.py
+    python benchmarks/bench_hot_paths.py --output bench_output.txt   # 커밋별 결과를 JSON 한 줄로 누적
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+# 왜: app 모듈은 `from logger_config import ...` 형태의 평면 import를 쓰므로 app 디렉터리를 경로에 올린다.
+sys.path.insert(0, str(ROOT_DIR / "app"))
+
+from fastmcp.server.middleware.middleware import MiddlewareContext  # noqa: E402
+from mcp.types import CallToolRequestParams  # noqa: E402
+
+from http_middleware import RequestIdMiddleware, _mask_value_by_key, _summarize_payload  # noqa: E402
+from logger_config import DecodeBytesFilter, RequestIdFilter, setup_logging  # noqa: E402
+from mcp_midleware import MCPLoggingMiddleware  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# 현실적인 JSON-RPC payload 생성
+# ---------------------------------------------------------------------------
+
+def _rpc(method: str, params: dict[str, Any], rpc_id: int = 1) -> dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": rpc_id, "method": method, "params": params}
+
+
+def _nested_arguments(depth: int, width: int) -> dict[str, Any]:
+    # 왜: 마스킹은 재귀로 동작하므로 중첩 깊이/폭에 따른 비용 증가를 따로 본다.
+    if depth == 0:
+        return {"my_email": "user@company.com", "subject": "주간 보고", "limit": 10}
+    return {
+        f"group_{i}": [_nested_arguments(depth - 1, width) for _ in range(2)]
+        for i in range(width)
+    }
+
+
+PAYLOADS: dict[str, dict[str, Any]] = {
+    "ping": _rpc("tools/call", {"name": "ping", "arguments": {}}),
+    "get_messages": _rpc(
+        "tools/call",
+        {
+            "name": "get_messages",
+            "arguments": {
+                "folder": "inbox",
+                "top": 20,
+                "filter_query": "isRead eq false and importance eq 'high'",
+                "my_email": "user@company.com",
+            },
+        },
+    ),
+    "send_my_email_2kb": _rpc(
+        "tools/call",
+        {
+            "name": "send_my_email",
+            "arguments": {
+                "to_address": "a@company.com,b@company.com",
+                "cc_address": "c@company.com",
+                "subject": "장애 보고",
+                "body": "본문 " * 400,
+                "my_email": "user@company.com",
+            },
+        },
+    ),
+    "nested_d2_w2": _rpc(
+        "tools/call",
+        {"name": "create_calendar_event", "arguments": _nested_arguments(depth=2, width=2)},
+    ),
+    "nested_d3_w3": _rpc(
+        "tools/call",
+        {"name": "create_calendar_event", "arguments": _nested_arguments(depth=3, width=3)},
+    ),
+    "oversize_16kb": _rpc(
+        "tools/call",
+        {"name": "create_draft", "arguments": {"subject": "대용량", "body": "x" * 16384}},
+    ),
+}
+
+
+def _encode(payload: dict[str, Any]) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+# ---------------------------------------------------------------------------
+# 측정 유틸
+# ---------------------------------------------------------------------------
+
+def _measure_sync(fn: Callable[[], Any], iterations: int, repeat: int) -> dict[str, float]:
+    # 호출당 시간: 반복 측정 중 가장 빠른 값(노이즈가 가장 적은 값)을 사용한다.
+    best_ns = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        best_ns = min(best_ns, (time.perf_counter_ns() - started) / iterations)
+
+    # 할당량: tracemalloc 오버헤드가 시간 측정에 섞이지 않도록 별도 패스에서 잰다.
+    alloc_samples = max(1, iterations // 10)
+    tracemalloc.start()
+    try:
+        peak_total = 0
+        blocks_before = sys.getallocatedblocks()
+        for _ in range(alloc_samples):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - base
+        retained_blocks = sys.getallocatedblocks() - blocks_before
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ns_per_call": best_ns,
+        "peak_alloc_bytes_per_call": peak_total / alloc_samples,
+        "retained_blocks_per_call": retained_blocks / alloc_samples,
+    }
+
+
+def _measure_async(
+    loop: asyncio.AbstractEventLoop,
+    factory: Callable[[], Awaitable[Any]],
+    iterations: int,
+    repeat: int,
+) -> dict[str, float]:
+    # 왜: run_until_complete를 호출마다 부르면 루프 진입 비용이 섞이므로 코루틴 하나로 묶어서 돌린다.
+    def run_batch(count: int) -> Callable[[], Any]:
+        async def batch() -> None:
+            for _ in range(count):
+                await factory()
+
+        return lambda: loop.run_until_complete(batch())
+
+    best_ns = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        run_batch(iterations)()
+        best_ns = min(best_ns, (time.perf_counter_ns() - started) / iterations)
+
+    single = run_batch(1)
+    alloc = _measure_sync(single, iterations=max(10, iterations // 10), repeat=1)
+    alloc["ns_per_call"] = best_ns
+    return alloc
+
+
+# ---------------------------------------------------------------------------
+# 벤치 대상 구성
+# ---------------------------------------------------------------------------
+
+def _make_asgi_scope(body: bytes) -> dict[str, Any]:
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": "/mcp",
+        "client": ("127.0.0.1", 50000),
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"user-agent", b"bench-client/1.0"),
+            (b"authorization", b"Bearer secret"),
+            (b"mcp-session-id", b"bench-session"),
+        ],
+    }
+
+
+async def _downstream_app(scope, receive, send) -> None:
+    # 실제 MCP 앱 대신 본문을 끝까지 읽고 작은 JSON 응답만 돌려준다.
+    more_body = True
+    while more_body:
+        message = await receive()
+        more_body = message.get("more_body", False)
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": b'{"jsonrpc":"2.0","id":1,"result":{}}'})
+
+
+def _request_id_middleware_case(body: bytes) -> Callable[[], Awaitable[None]]:
+    middleware = RequestIdMiddleware(_downstream_app)
+    scope = _make_asgi_scope(body)
+
+    async def call() -> None:
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            return None
+
+        await middleware(scope, receive, send)
+
+    return call
+
+
+def _on_call_tool_case(payload: dict[str, Any]) -> Callable[[], Awaitable[Any]]:
+    middleware = MCPLoggingMiddleware()
+    params = payload["params"]
+    context = MiddlewareContext(
+        message=CallToolRequestParams(name=params["name"], arguments=params.get("arguments") or {}),
+        method="tools/call",
+    )
+
+    async def call_next(_context):
+        return "ok"
+
+    return lambda: middleware.on_call_tool(context, call_next)
+
+
+def _make_record(args: tuple[Any, ...]) -> logging.LogRecord:
+    return logging.LogRecord(
+        name="bench",
+        level=logging.INFO,
+        pathname=__file__,
+        lineno=0,
+        msg="http_request method=%s path=%s payload=%s",
+        args=args,
+        exc_info=None,
+    )
+
+
+def run_benchmarks(iterations: int, repeat: int) -> list[dict[str, Any]]:
+    # 왜: 실제 운영과 같은 포맷/필터 체인을 태우되, 출력은 devnull로 버려 터미널 I/O를 측정에서 뺀다.
+    setup_logging("INFO")
+    devnull = open(os.devnull, "w", encoding="utf-8")
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(devnull)
+
+    results: list[dict[str, Any]] = []
+    loop = asyncio.new_event_loop()
+
+    def record(name: str, case: str, size: int, stats: dict[str, float]) -> None:
+        results.append({"bench": name, "case": case, "payload_bytes": size, **stats})
+
+    try:
+        for case, payload in PAYLOADS.items():
+            raw = _encode(payload)
+            arguments = payload["params"].get("arguments") or {}
+
+            record(
+                "_summarize_payload",
+                case,
+                len(raw),
+                _measure_sync(lambda: _summarize_payload(raw, "application/json"), iterations, repeat),
+            )
+            record(
+                "_mask_value_by_key",
+                case,
+                len(raw),
+                _measure_sync(lambda: _mask_value_by_key("arguments", arguments), iterations, repeat),
+            )
+            record(
+                "RequestIdMiddleware",
+                case,
+                len(raw),
+                _measure_async(loop, _request_id_middleware_case(raw), iterations, repeat),
+            )
+            record(
+                "MCPLoggingMiddleware.on_call_tool",
+                case,
+                len(raw),
+                _measure_async(loop, _on_call_tool_case(payload), iterations, repeat),
+            )
+
+        request_id_filter = RequestIdFilter()
+        plain_record = _make_record(("POST", "/mcp", "{}"))
+        record(
+            "RequestIdFilter.filter",
+            "single_record",
+            0,
+            _measure_sync(lambda: request_id_filter.filter(plain_record), iterations, repeat),
+        )
+
+        decode_filter = DecodeBytesFilter()
+        bytes_args = ("POST", b"/mcp", {"chunk": "한글 응답".encode("utf-8"), "items": [b"a", b"b"]})
+        # 왜: 필터가 record.args를 제자리에서 바꾸므로 매 호출마다 bytes가 남아 있는 새 레코드를 쓴다.
+        record(
+            "DecodeBytesFilter.filter",
+            "bytes_args",
+            0,
+            _measure_sync(lambda: decode_filter.filter(_make_record(bytes_args)), iterations, repeat),
+        )
+        record(
+            "DecodeBytesFilter.filter",
+            "record_creation_baseline",
+            0,
+            _measure_sync(lambda: _make_record(bytes_args), iterations, repeat),
+        )
+    finally:
+        loop.close()
+        devnull.close()
+
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _print_table(results: list[dict[str, Any]]) -> None:
+    header = f"{'bench':<36} {'case':<26} {'bytes':>7} {'ns/call':>12} {'peak_B/call':>12} {'blocks/call':>12}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(
+            f"{row['bench']:<36} {row['case']:<26} {row['payload_bytes']:>7} "
+            f"{row['ns_per_call']:>12.0f} {row['peak_alloc_bytes_per_call']:>12.0f} "
+            f"{row['retained_blocks_per_call']:>12.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="미들웨어/로깅 핫패스 마이크로벤치마크")
+    parser.add_argument("--iterations", type=int, default=2000, help="측정 1회당 호출 횟수")
+    parser.add_argument("--repeat", type=int, default=5, help="측정 반복 횟수(최솟값 사용)")
+    parser.add_argument("--output", type=str, default=None, help="결과를 JSON 한 줄로 누적 기록할 파일")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.iterations, args.repeat)
+    _print_table(results)
+
+    if args.output:
+        line = {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+            "results": results,
+        }
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import os
+import sys
+from pathlib import Path
+
+# 왜: app 모듈은 `from config import settings`처럼 평면 import를 쓰므로 app 디렉터리를 경로에 올린다.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+# 테스트에서는 실제 테넌트 값 없이도 config.Settings가 로드되도록 더미 값을 채운다.
+os.environ.setdefault("AZURE_CLIENT_ID", "test-client-id")
+os.environ.setdefault("AZURE_TENANT_ID", "test-tenant-id")
+os.environ.setdefault("AZURE_CLIENT_SECRET", "test-secret")
+os.environ.setdefault("DEFAULT_USER_EMAIL", "tester@company.com")
+os.environ.setdefault("LOG_LEVEL", "INFO")
@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastmcp.exceptions import ToolError
+from mcp.types import CallToolRequestParams
+
+from mcp_midleware import AdmissionControlMiddleware
+
+
+def _call(name: str, my_email: str = "a@b.c"):
+    params = CallToolRequestParams(name=name, arguments={"my_email": my_email})
+    return SimpleNamespace(message=params, fastmcp_context=None)
+
+
+def test_user_limit_queues_then_rejects_fast_with_retry_hint():
+    middleware = AdmissionControlMiddleware(
+        tool_limit=10, user_limit=1, session_limit=0, max_queue=1, queue_timeout=1.0
+    )
+    release = asyncio.Event()
+    order: list[str] = []
+
+    async def tool(context):
+        order.append(context.message.name)
+        await release.wait()
+        return context.message.name
+
+    async def scenario():
+        first = asyncio.create_task(middleware.on_call_tool(_call("t1"), tool))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(middleware.on_call_tool(_call("t2"), tool))
+        await asyncio.sleep(0)
+        with pytest.raises(ToolError, match="retry_after="):
+            await middleware.on_call_tool(_call("t3"), tool)
+        # 다른 사용자는 영향을 받지 않는다.
+        other = asyncio.create_task(middleware.on_call_tool(_call("t4", "x@y.z"), tool))
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(first, queued, other)
+
+    assert asyncio.run(scenario()) == ["t1", "t2", "t4"]
+    assert order == ["t1", "t4", "t2"]
+    assert middleware._gates == {}
+
+
+def test_queue_wait_times_out():
+    middleware = AdmissionControlMiddleware(
+        tool_limit=1, user_limit=0, session_limit=0, max_queue=4, queue_timeout=0.02
+    )
+
+    async def slow(context):
+        await asyncio.sleep(0.2)
+
+    async def scenario():
+        first = asyncio.create_task(middleware.on_call_tool(_call("search"), slow))
+        await asyncio.sleep(0)
+        with pytest.raises(ToolError):
+            await middleware.on_call_tool(_call("search"), slow)
+        await first
+
+    asyncio.run(scenario())
+
+
+def test_user_saturating_a_tool_does_not_starve_other_users():
+    middleware = AdmissionControlMiddleware(
+        tool_limit=4, user_limit=2, session_limit=0, max_queue=8, queue_timeout=1.0
+    )
+    release = asyncio.Event()
+    started: list[str] = []
+
+    async def tool(context):
+        started.append(context.message.arguments["my_email"])
+        await release.wait()
+
+    async def scenario():
+        noisy = [asyncio.create_task(middleware.on_call_tool(_call("search"), tool)) for _ in range(10)]
+        await asyncio.sleep(0)
+        # 한 사용자의 대기 호출은 사용자 한도에서 기다리므로 도구 슬롯은 실행 중인 2개만 차지한다.
+        assert middleware._gates[("tool", "search")].active == 2
+        other = asyncio.create_task(middleware.on_call_tool(_call("search", "x@y.z"), tool))
+        await asyncio.sleep(0)
+        assert started.count("x@y.z") == 1
+        release.set()
+        await asyncio.gather(*noisy, other)
+
+    asyncio.run(scenario())
+    assert started.count("a@b.c") == 10
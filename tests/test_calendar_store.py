@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+import calendar_store as calendar_store_module
+from calendar_store import CalendarStore, IntervalIndex
+
+UTC = timezone.utc
+
+
+def _event(event_id: str, start: datetime, hours: int = 1) -> dict:
+    fmt = "%Y-%m-%dT%H:%M:%S.0000000"
+    return {
+        "id": event_id,
+        "subject": event_id,
+        "start": {"dateTime": start.strftime(fmt), "timeZone": "UTC"},
+        "end": {"dateTime": (start + timedelta(hours=hours)).strftime(fmt), "timeZone": "UTC"},
+    }
+
+
+def test_calendar_store_serves_ranges_locally_and_applies_delta(monkeypatch):
+    base = datetime.now(UTC).replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    pages = {
+        "full": {"value": [_event("a", base), _event("long", base - timedelta(hours=5), hours=8)], "@odata.deltaLink": "https://graph/delta?token=1"},
+        "https://graph/delta?token=1": {"value": [{"id": "a", "@removed": {"reason": "deleted"}}, _event("b", base + timedelta(hours=2))], "@odata.deltaLink": "https://graph/delta?token=2"},
+    }
+    calls: list[str] = []
+
+    async def fake_graph_request(method, path, *, params=None, headers=None, json=None, timeout=None):
+        key = "full" if path.endswith("/calendarView/delta") else path
+        calls.append(key)
+        return httpx.Response(200, json=pages[key], request=httpx.Request(method, "https://graph"))
+
+    monkeypatch.setattr(calendar_store_module, "graph_request", fake_graph_request)
+    store = CalendarStore(max_users=10, staleness_seconds=60, past_days=1, future_days=7)
+
+    async def scenario():
+        first = await store.query_range("me@company.com", base, base + timedelta(hours=1), limit=10)
+        # staleness 시간 안의 재조회는 Graph를 호출하지 않는다.
+        again = await store.query_range("me@company.com", base, base + timedelta(hours=1), limit=10)
+        # 동기화 창 밖은 None -> 호출부가 live 조회
+        outside = await store.query_range("me@company.com", base + timedelta(days=30), base + timedelta(days=31), limit=10)
+
+        store.mark_stale("me@company.com")
+        after_delta = await store.query_range("me@company.com", base - timedelta(hours=6), base + timedelta(hours=4), limit=10)
+        return first, again, outside, after_delta
+
+    first, again, outside, after_delta = asyncio.run(scenario())
+
+    assert [e["id"] for e in first] == ["long", "a"]
+    assert again == first
+    assert outside is None
+    assert [e["id"] for e in after_delta] == ["long", "b"]
+    assert calls == ["full", "https://graph/delta?token=1"]
+
+
+def test_find_conflicts_uses_cache_when_warm_and_live_when_cold(monkeypatch):
+    base = datetime.now(UTC).replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    free_event = {**_event("free", base), "showAs": "free"}
+    calls: list[str] = []
+
+    async def fake_graph_request(method, path, *, params=None, headers=None, json=None, timeout=None):
+        calls.append(path.rsplit("/", 1)[-1])
+        if path.endswith("/calendarView"):
+            # 경계에 맞닿은 일정(10~11시)은 충돌이 아니다.
+            body = {"value": [_event("live", base), _event("touching", base + timedelta(hours=1))]}
+        else:
+            body = {"value": [_event("a", base), _event("self", base), free_event], "@odata.deltaLink": "https://graph/delta?token=1"}
+        return httpx.Response(200, json=body, request=httpx.Request(method, "https://graph"))
+
+    monkeypatch.setattr(calendar_store_module, "graph_request", fake_graph_request)
+    store = CalendarStore(max_users=10, staleness_seconds=60, past_days=1, future_days=7)
+
+    async def scenario():
+        cold, cold_source = await store.find_conflicts("me@company.com", base, base + timedelta(hours=1))
+        await store.query_range("me@company.com", base, base + timedelta(hours=1), limit=10)
+        warm, warm_source = await store.find_conflicts("me@company.com", base, base + timedelta(hours=1), exclude_id="self")
+        return cold, cold_source, warm, warm_source
+
+    cold, cold_source, warm, warm_source = asyncio.run(scenario())
+
+    assert (cold_source, [c["id"] for c in cold]) == ("live", ["live"])
+    assert (warm_source, [c["id"] for c in warm]) == ("cache", ["a"])
+    assert calls == ["calendarView", "delta"]
+
+
+def test_interval_index_matches_brute_force_with_long_events():
+    import random
+
+    rng = random.Random(7)
+    base = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    intervals = {}
+    for i in range(300):
+        start = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 30, 15))
+        intervals[f"e{i}"] = (start, start + timedelta(minutes=rng.choice([15, 30, 60])))
+    # 며칠짜리 일정이 섞여 있어도 짧은 조회 결과가 정확해야 한다.
+    intervals["offsite"] = (base + timedelta(days=3), base + timedelta(days=10))
+    intervals["vacation"] = (base, base + timedelta(days=30))
+
+    index = IntervalIndex()
+    index.rebuild(intervals)
+    for _ in range(200):
+        qs = base + timedelta(minutes=rng.randrange(-60, 60 * 24 * 31, 5))
+        qe = qs + timedelta(minutes=rng.choice([5, 30, 240, 60 * 24 * 2]))
+        expected = sorted((s, e, i) for i, (s, e) in intervals.items() if e > qs and s < qe)
+        assert index.overlapping(qs, qe) == [i for _, _, i in expected]
+    assert IntervalIndex().overlapping(base, base + timedelta(days=1)) == []
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastmcp.exceptions import ToolError
+from mcp.types import CallToolRequestParams
+
+import deadline
+import graph_client
+from deadline import DeadlineExceeded, deadline_scope
+from mcp_midleware import DeadlineMiddleware
+
+
+def test_deadline_bounds_token_acquisition(monkeypatch):
+    async def slow_token():
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(graph_client, "async_get_access_token", slow_token)
+
+    async def scenario():
+        with deadline_scope(0.05):
+            await graph_client.graph_request("POST", "/users/a@b.c/sendMail", json={})
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scenario())
+    assert time.monotonic() - started < 1
+
+
+def test_middleware_uses_client_meta_and_cancels_slow_tool():
+    middleware = DeadlineMiddleware(default_seconds=30, max_seconds=60, tool_seconds={"find_meeting_times": 45})
+    seen: list[float | None] = []
+    cancelled = asyncio.Event()
+
+    async def slow_tool(context):
+        seen.append(deadline.remaining())
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    def call(name, meta=None):
+        params = CallToolRequestParams.model_validate({"name": name, "arguments": {}, "_meta": meta})
+        return SimpleNamespace(message=params)
+
+    assert middleware.timeout_for(call("find_meeting_times").message) == 45
+    assert middleware.timeout_for(call("get_messages", {"timeoutMs": 600_000}).message) == 60
+
+    async def scenario():
+        with pytest.raises(ToolError):
+            await middleware.on_call_tool(call("get_messages", {"timeoutMs": 50}), slow_tool)
+
+    asyncio.run(scenario())
+
+    assert 0 < seen[0] <= 0.05
+    assert cancelled.is_set()
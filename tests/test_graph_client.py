@@ -0,0 +1,49 @@
+import asyncio
+
+import httpx
+
+import graph_client
+from graph_client import graph_request
+from metrics import metrics
+
+
+def test_identical_concurrent_gets_share_one_request(monkeypatch):
+    sent: list[tuple] = []
+
+    async def slow_send(method, path, params, headers, json, timeout):
+        sent.append((method, path, tuple(sorted((params or {}).items()))))
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"value": [path]}, request=httpx.Request(method, "https://graph"))
+
+    monkeypatch.setattr(graph_client, "_send", slow_send)
+    coalesced = metrics.counter("graph_singleflight_total", {"result": "coalesced"})
+    before = coalesced.value
+
+    async def scenario():
+        same = [graph_request("GET", "/users/a@b.c/messages", params={"$top": 5}) for _ in range(3)]
+        other = graph_request("GET", "/users/a@b.c/messages", params={"$top": 10})
+        return await asyncio.gather(*same, other)
+
+    responses = asyncio.run(scenario())
+
+    assert len(sent) == 2  # 같은 파라미터 3건은 1건으로, 다른 파라미터는 따로 보낸다.
+    assert coalesced.value - before == 2
+    assert all(r.json() == {"value": ["/users/a@b.c/messages"]} for r in responses)
+    assert graph_client._inflight == {}
+
+
+def test_cancelled_waiter_does_not_cancel_shared_request(monkeypatch):
+    async def slow_send(method, path, params, headers, json, timeout):
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={"ok": True}, request=httpx.Request(method, "https://graph"))
+
+    monkeypatch.setattr(graph_client, "_send", slow_send)
+
+    async def scenario():
+        first = asyncio.create_task(graph_request("GET", "/me"))
+        second = asyncio.create_task(graph_request("GET", "/me"))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()).json() == {"ok": True}
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from graph_models import Attachment, Event, GraphModel, Message, MessageDetail, decode_one, decode_values
+from renderers import render_list
+
+
+def test_message_models_decode_from_bytes_and_render_like_dicts():
+    body = json.dumps(
+        {
+            "value": [
+                {
+                    "id": "m1",
+                    "subject": "주간 보고",
+                    "sender": {"emailAddress": {"address": "kim@company.com", "name": "김"}},
+                    "receivedDateTime": "2026-10-19T01:00:00Z",
+                    "bodyPreview": "첫 줄\n둘째 줄",
+                    "body": {"content": "버려지는 필드"},
+                },
+                {"id": "m2"},
+            ]
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+    messages = decode_values(body, Message)
+
+    assert not hasattr(messages[0], "__dict__")
+    assert dict(messages[1]) == {
+        "id": "m2",
+        "subject": "(제목 없음)",
+        "sender": "",
+        "sender_name": "알 수 없음",
+        "received": "",
+        "is_read": None,
+        "preview": None,
+    }
+    rendered = render_list(messages, output_format="json", fields="id,sender,preview", header="", empty_message="", text_fields=[])
+    assert json.loads(rendered)["items"][0] == {"id": "m1", "sender": "kim@company.com", "preview": "첫 줄 둘째 줄"}
+
+
+def test_event_and_attachment_models_handle_missing_fields():
+    event = Event.from_graph({"id": "e1", "start": {"dateTime": "2026-10-20T09:00:00"}, "organizer": None})
+    assert (event["start"], event["end"], event["organizer"], event["attendees"]) == ("2026-10-20T09:00:00", "", "", None)
+    assert Attachment.from_graph({"name": "report.final.pdf", "size": 10}).extension == "PDF"
+    assert Attachment.from_graph({"name": "README"}).extension == "알 수 없음"
+
+
+def test_model_without_from_graph_is_abstract():
+    class Incomplete(GraphModel):
+        __slots__ = ("id",)
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_message_detail_keeps_body_and_attachments_only_when_present():
+    detail = decode_one(
+        json.dumps(
+            {
+                "id": "m1",
+                "conversationId": "c1",
+                "sender": {"emailAddress": {"address": "kim@company.com"}},
+                "body": {"content": None},
+                "hasAttachments": True,
+                "attachments": [{"name": "보고서.pdf", "size": 2048}],
+            }
+        ).encode("utf-8"),
+        MessageDetail,
+    )
+    assert (detail.sender, detail.sender_name, detail.conversation_id, detail.body) == ("kim@company.com", "알 수 없음", "c1", "")
+    assert [(a.name, a.size, a.extension) for a in detail.attachments] == [("보고서.pdf", 2048, "PDF")]
+
+    bare = MessageDetail.from_graph({"id": "m2", "attachments": [{"name": "x"}]})
+    assert bare.body is None and bare.attachments == []
@@ -0,0 +1,92 @@
+import asyncio
+
+import httpx
+import pytest
+
+import graph_client
+import health
+from graph_client import CircuitBreaker, CircuitOpenError
+from health import HealthChecker
+
+
+def test_circuit_opens_after_failures_and_recovers_via_single_probe(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    monkeypatch.setattr(graph_client, "circuit", breaker)
+
+    async def fake_token():
+        return "token"
+
+    statuses = iter([503, 502, 200])
+
+    async def fake_request(self, method, url, **kwargs):
+        await asyncio.sleep(0.01)
+        return httpx.Response(next(statuses), request=httpx.Request(method, url))
+
+    monkeypatch.setattr(graph_client, "async_get_access_token", fake_token)
+    monkeypatch.setattr(httpx.AsyncClient, "request", fake_request)
+
+    async def scenario():
+        for _ in range(2):
+            await graph_client.graph_request("POST", "/users/a@b.c/sendMail", json={})
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await graph_client.graph_request("POST", "/users/a@b.c/sendMail", json={})
+
+        await asyncio.sleep(0.06)
+        probe = asyncio.create_task(graph_client.graph_request("POST", "/users/a@b.c/sendMail", json={}))
+        await asyncio.sleep(0)
+        # half_open 동안에는 확인용 호출 하나만 보낸다.
+        with pytest.raises(CircuitOpenError):
+            await graph_client.graph_request("POST", "/users/a@b.c/sendMail", json={})
+        assert (await probe).status_code == 200
+        assert breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_readiness_uses_cached_checks(monkeypatch):
+    checker = HealthChecker(interval=60, max_loop_lag=0.5)
+    calls = {"token": 0}
+
+    async def token_ok():
+        calls["token"] += 1
+        return {"ok": True}
+
+    async def graph_down():
+        return {"ok": False, "error": "ConnectError"}
+
+    monkeypatch.setattr(checker, "_check_token", token_ok)
+    monkeypatch.setattr(checker, "_check_graph", graph_down)
+    monkeypatch.setattr(health, "circuit", CircuitBreaker(5, 30))
+
+    assert checker.snapshot()["status"] == "starting"
+
+    asyncio.run(checker.run_checks())
+    for _ in range(3):
+        snapshot = checker.snapshot()
+
+    assert calls["token"] == 1
+    assert snapshot["ready"] is False
+    assert snapshot["status"] == "not_ready"
+    assert snapshot["checks"]["token"]["ok"] is True
+    assert snapshot["checks"]["circuit"]["state"] == "closed"
+
+
+def test_lifespan_waits_for_checker_to_stop(monkeypatch):
+    stopped = asyncio.Event()
+
+    async def run_forever() -> None:
+        try:
+            await asyncio.sleep(60)
+        finally:
+            stopped.set()
+
+    monkeypatch.setattr(health.health_checker, "run_forever", run_forever)
+
+    async def scenario() -> bool:
+        async with health.health_lifespan(None):
+            await asyncio.sleep(0)
+        # 종료 직후 곧바로 확인해도 점검 루프는 이미 정리되어 있어야 한다.
+        return stopped.is_set()
+
+    assert asyncio.run(scenario()) is True
@@ -0,0 +1,84 @@
+import asyncio
+import gzip
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from http_middleware import CompressionMiddleware, _negotiate_encoding
+
+
+def _run(app, accept_encoding: str) -> tuple[dict, bytes]:
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/mcp",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    sent: list[dict] = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(CompressionMiddleware(app, minimum_size=100, encodings=("gzip",))(scope, receive, send))
+    start = sent[0]
+    body = b"".join(m.get("body", b"") for m in sent[1:])
+    return dict(start["headers"]), body
+
+
+def _plain_app(payload: bytes, content_type: bytes = b"application/json"):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": payload})
+
+    return app
+
+
+def test_negotiate_encoding_respects_q_values():
+    assert _negotiate_encoding("gzip, br;q=0", ["br", "gzip"]) == "gzip"
+    assert _negotiate_encoding("identity", ["gzip"]) is None
+    assert _negotiate_encoding("*", ["zstd", "gzip"]) == "zstd"
+
+
+def test_small_response_is_not_compressed():
+    headers, body = _run(_plain_app(b'{"ok":true}'), "gzip")
+    assert b"content-encoding" not in headers
+    assert body == b'{"ok":true}'
+
+
+def test_large_response_is_gzipped():
+    payload = ("본문 " * 500).encode("utf-8")
+    headers, body = _run(_plain_app(payload), "gzip")
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(body) == payload
+
+
+def test_sse_chunks_are_flushed_per_event():
+    events = [b"event: message\ndata: 1\n\n", b"event: message\ndata: 2\n\n"]
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        for event in events:
+            await send({"type": "http.response.body", "body": event, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    headers, body = _run(app, "gzip")
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(body) == b"".join(events)
+
+
+def test_middleware_modules_import_without_settings():
+    # 벤치마크(benchmarks/bench_hot_paths.py)는 .env/AZURE_* 없이 미들웨어만 불러 쓴다.
+    app_dir = Path(__file__).resolve().parent.parent / "app"
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("AZURE_", "DEFAULT_USER_EMAIL", "LOG_LEVEL"))}
+    result = subprocess.run(
+        [sys.executable, "-c", "import http_middleware, mcp_midleware, logger_config"],
+        cwd=app_dir,
+        env={**env, "PYTHONPATH": str(app_dir)},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
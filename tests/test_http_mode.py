@@ -0,0 +1,42 @@
+import asyncio
+import json
+
+import httpx
+
+import health
+import main
+
+_ACCEPT = "application/json, text/event-stream"
+
+
+def test_stateless_mode_answers_tool_call_with_plain_json(monkeypatch):
+    async def idle() -> None:
+        await asyncio.sleep(60)
+
+    # 왜: readiness 점검 루프가 실제 토큰/Graph 호출을 하지 않도록 막는다.
+    monkeypatch.setattr(health.health_checker, "run_forever", idle)
+    monkeypatch.setattr(main, "HTTP_MODE", "stateless")
+    app = main.create_http_app()
+
+    async def scenario() -> httpx.Response:
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://local") as client:
+                # initialize 없이 곧바로 tools/call을 보내도 처리되어야 한다(세션 왕복 없음).
+                return await client.post(
+                    "/mcp",
+                    headers={"accept": _ACCEPT},
+                    json={
+                        "jsonrpc": "2.0",
+                        "id": 1,
+                        "method": "tools/call",
+                        "params": {"name": "add", "arguments": {"a": 2, "b": 3}},
+                    },
+                )
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/json")
+    assert "mcp-session-id" not in response.headers
+    result = json.loads(response.text)["result"]
+    assert result["content"][0]["text"] == "5"
@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastmcp.tools import ToolResult
+from mcp.types import CallToolRequestParams
+
+from idempotency import IdempotencyStore, mark_write_done
+from mcp_midleware import IdempotencyMiddleware
+from shared_store import MemoryStore, set_shared_store
+
+
+def _call(arguments: dict, meta: dict | None = None):
+    params = CallToolRequestParams.model_validate({"name": "send_my_email", "arguments": arguments, "_meta": meta})
+    return SimpleNamespace(message=params)
+
+
+def test_duplicate_and_retried_sends_reach_graph_once():
+    set_shared_store(MemoryStore())
+    middleware = IdempotencyMiddleware({"send_my_email"}, IdempotencyStore(ttl_seconds=60, pending_ttl_seconds=10))
+    sent: list[dict] = []
+
+    async def send(context):
+        sent.append(context.message.arguments)
+        await asyncio.sleep(0.01)
+        mark_write_done()
+        return ToolResult(content=f"sent #{len(sent)}")
+
+    args = {"to_address": "x@y.z", "subject": "hi", "body": "b"}
+
+    async def scenario():
+        first, concurrent = await asyncio.gather(
+            middleware.on_call_tool(_call(args), send),
+            middleware.on_call_tool(_call(args), send),
+        )
+        retried = await middleware.on_call_tool(_call(args), send)
+        by_key = await middleware.on_call_tool(_call({**args, "body": "edited"}, {"idempotencyKey": "k1"}), send)
+        by_key_retry = await middleware.on_call_tool(_call({**args, "body": "edited again"}, {"idempotencyKey": "k1"}), send)
+        return first, concurrent, retried, by_key, by_key_retry
+
+    first, concurrent, retried, by_key, by_key_retry = asyncio.run(scenario())
+
+    assert len(sent) == 2
+    assert first.content[0].text == concurrent.content[0].text == retried.content[0].text == "sent #1"
+    assert retried.meta == {"idempotentReplay": True}
+    assert by_key_retry.content[0].text == by_key.content[0].text == "sent #2"
+
+
+def test_failed_call_is_not_recorded():
+    set_shared_store(MemoryStore())
+    middleware = IdempotencyMiddleware({"send_my_email"}, IdempotencyStore(ttl_seconds=60, pending_ttl_seconds=10))
+    attempts: list[int] = []
+
+    async def flaky(context):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("graph timeout")
+        mark_write_done()
+        return ToolResult(content="ok")
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await middleware.on_call_tool(_call({"subject": "s"}), flaky)
+        return await middleware.on_call_tool(_call({"subject": "s"}), flaky)
+
+    assert asyncio.run(scenario()).content[0].text == "ok"
+    assert len(attempts) == 2
+
+
+def test_notice_without_write_is_not_replayed():
+    set_shared_store(MemoryStore())
+    middleware = IdempotencyMiddleware({"send_my_email"}, IdempotencyStore(ttl_seconds=60, pending_ttl_seconds=10))
+    slot_free = False
+
+    async def create(context):
+        # 첫 호출은 충돌 안내만 돌려주고(쓰기 없음), 충돌이 풀린 뒤 재시도는 실제로 생성해야 한다.
+        if not slot_free:
+            return ToolResult(content="conflict")
+        mark_write_done()
+        return ToolResult(content="created")
+
+    async def scenario():
+        nonlocal slot_free
+        first = await middleware.on_call_tool(_call({"subject": "s"}), create)
+        slot_free = True
+        retried = await middleware.on_call_tool(_call({"subject": "s"}), create)
+        replayed = await middleware.on_call_tool(_call({"subject": "s"}), create)
+        return first, retried, replayed
+
+    first, retried, replayed = asyncio.run(scenario())
+    assert first.content[0].text == "conflict"
+    assert retried.content[0].text == "created" and not retried.meta
+    assert replayed.meta == {"idempotentReplay": True}
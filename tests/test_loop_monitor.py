@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import time
+
+from logger_config import clear_request_id, set_request_id
+from loop_monitor import LoopMonitor, track_activity
+from metrics import metrics
+
+
+def test_blocking_call_is_reported_with_request_and_tool(caplog):
+    monitor = LoopMonitor(interval=0.02, block_threshold=0.05)
+
+    def blocking_helper():
+        time.sleep(0.3)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        set_request_id("req-42")
+        try:
+            with track_activity("search_my_emails"):
+                blocking_helper()
+        finally:
+            clear_request_id()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    with caplog.at_level(logging.WARNING, logger="app.loop"):
+        asyncio.run(scenario())
+
+    blocked = [r.getMessage() for r in caplog.records if "event_loop_blocked" in r.getMessage()]
+    assert len(blocked) == 1
+    assert "request_id=req-42 tool=search_my_emails" in blocked[0]
+    assert "blocking_helper" in blocked[0]
+    lag = metrics.histogram("event_loop_lag_seconds").snapshot()
+    assert lag["max"] >= 0.2
+
+
+def test_blocking_request_is_told_apart_from_concurrent_ones(caplog):
+    monitor = LoopMonitor(interval=0.02, block_threshold=0.05)
+
+    async def idle_tool():
+        set_request_id("req-idle")
+        with track_activity("get_messages"):
+            await asyncio.sleep(0.4)
+
+    async def blocking_tool():
+        await asyncio.sleep(0.05)
+        set_request_id("req-busy")
+        with track_activity("export"):
+            time.sleep(0.2)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.gather(idle_tool(), blocking_tool())
+        await monitor.stop()
+
+    with caplog.at_level(logging.WARNING, logger="app.loop"):
+        asyncio.run(scenario())
+
+    blocked = [r.getMessage() for r in caplog.records if "event_loop_blocked" in r.getMessage()]
+    assert len(blocked) == 1
+    assert "request_id=req-busy tool=export" in blocked[0]
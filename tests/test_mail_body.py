@@ -0,0 +1,56 @@
+import pytest
+
+from mail_body import chunk_text, clean_body, decode_cursor, dedupe_thread_bodies, encode_cursor
+
+REPLY = """네, 내일 10시에 뵙겠습니다.
+자료는 오늘 중으로 보내드릴게요.
+
+--
+홍길동 / 플랫폼팀
+
+________________________________
+From: Kim <kim@company.com>
+Sent: Monday, February 16, 2026 9:00 AM
+회의 가능하신가요?
+> 이전 인용
+"""
+
+
+def test_clean_body_strips_history_and_signature():
+    assert clean_body(REPLY) == "네, 내일 10시에 뵙겠습니다.\n자료는 오늘 중으로 보내드릴게요."
+
+
+def test_chunk_text_prefers_line_boundaries_and_resumes():
+    text = "\n".join(f"line {i:02d}" for i in range(20))
+    chunks = []
+    offset = 0
+    while offset is not None:
+        chunk, offset = chunk_text(text, offset, 40)
+        assert len(chunk) <= 40
+        chunks.append(chunk)
+    assert "".join(chunks) == text
+    assert chunks[0].endswith("\n")
+
+
+def test_cursor_round_trip_is_bound_to_message():
+    cursor = encode_cursor("AAMk-message-1", 1234, True)
+    assert decode_cursor(cursor, "AAMk-message-1") == (1234, True)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "AAMk-message-2")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", "AAMk-message-1")
+
+
+def test_dedupe_thread_bodies_removes_quoted_history_across_messages():
+    first = "안녕하세요,\n서버 점검 일정은 금요일 오후 10시로 확정되었습니다.\n참고 부탁드립니다."
+    reply = (
+        "확인했습니다.\n\n-----Original Message-----\nFrom: Kim\nSent: Monday\n"
+        "안녕하세요,\n> 서버 점검 일정은 금요일 오후 10시로 확정되었습니다.\n> 참고 부탁드립니다."
+    )
+    short_only = "OK"
+
+    results = dedupe_thread_bodies([first, reply, short_only])
+
+    assert results[0] == (first, 0)
+    assert results[1] == ("확인했습니다.", 6)
+    assert results[2] == ("OK", 0)
@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import mail_export
+from mail_export import MailboxExport
+
+
+def _page(ids: list[str], next_link: str | None) -> dict:
+    body = {"value": [{"id": i, "subject": f"s-{i}", "from": {"emailAddress": {"address": "a@b.c"}}} for i in ids]}
+    if next_link:
+        body["@odata.nextLink"] = next_link
+    return body
+
+
+def test_export_resumes_from_checkpoint_after_crash(tmp_path, monkeypatch):
+    pages = {
+        "/users/me@company.com/mailFolders/inbox/messages": _page(["m1", "m2"], "https://graph/next-2"),
+        "https://graph/next-2": _page(["m3"], "https://graph/next-3"),
+        "https://graph/next-3": _page(["m4", "m5"], None),
+    }
+    requested: list[str] = []
+    fail_once = {"https://graph/next-3"}
+
+    async def fake_graph_request(method, path, params=None, headers=None, json=None, timeout=15.0):
+        requested.append(path)
+        if path in fail_once:
+            fail_once.discard(path)
+            raise httpx.ConnectError("connection reset")
+        return httpx.Response(200, json=pages[path], request=httpx.Request(method, "https://graph"))
+
+    monkeypatch.setattr(mail_export, "graph_request", fake_graph_request)
+
+    job = MailboxExport(tmp_path, "me@company.com", "inbox")
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(job.run())
+    assert job.state["exported"] == 3
+    # 체크포인트 이후에 쓰다 만 꼬리는 재개 시 잘려야 한다.
+    with open(job.output_path, "ab") as f:
+        f.write(b'{"id":"partial')
+
+    resumed = MailboxExport(tmp_path, "me@company.com", "inbox")
+    state = asyncio.run(resumed.run())
+
+    lines = [json.loads(line) for line in resumed.output_path.read_text(encoding="utf-8").splitlines()]
+    assert [line["id"] for line in lines] == ["m1", "m2", "m3", "m4", "m5"]
+    assert lines[0]["sender"] == "a@b.c"
+    assert state["completed"] is True and state["exported"] == 5
+    assert requested.count("https://graph/next-2") == 1  # 이미 받은 페이지는 다시 받지 않는다.
+    assert resumed.status()["bytes"] == resumed.output_path.stat().st_size
+
+
+def test_completed_export_picks_up_new_mail_or_restarts(tmp_path, monkeypatch):
+    mailbox = [
+        {"id": "m1", "receivedDateTime": "2024-05-01T09:00:00Z"},
+        {"id": "m2", "receivedDateTime": "2024-05-01T10:00:00Z"},
+    ]
+    filters: list[str | None] = []
+
+    async def fake_graph_request(method, path, params=None, headers=None, json=None, timeout=15.0):
+        since = (params or {}).get("$filter")
+        filters.append(since)
+        value = [m for m in mailbox if since is None or m["receivedDateTime"] >= since.rsplit(" ", 1)[1]]
+        return httpx.Response(200, json={"value": value}, request=httpx.Request(method, "https://graph"))
+
+    monkeypatch.setattr(mail_export, "graph_request", fake_graph_request)
+
+    def exported_ids(job: MailboxExport) -> list[str]:
+        return [json.loads(line)["id"] for line in job.output_path.read_text(encoding="utf-8").splitlines()]
+
+    first = MailboxExport(tmp_path, "me@company.com", "inbox")
+    assert asyncio.run(first.run())["completed"] is True
+
+    # 같은 수신 시각의 메일(m3)과 이후 메일(m4)이 도착한 뒤 다시 시작하면 새 메일만 이어 쓴다.
+    mailbox += [
+        {"id": "m3", "receivedDateTime": "2024-05-01T10:00:00Z"},
+        {"id": "m4", "receivedDateTime": "2024-05-02T08:00:00Z"},
+    ]
+    refreshed = MailboxExport(tmp_path, "me@company.com", "inbox")
+    state = asyncio.run(refreshed.run())
+    assert filters[-1] == "receivedDateTime ge 2024-05-01T10:00:00Z"
+    assert exported_ids(refreshed) == ["m1", "m2", "m3", "m4"]
+    assert state["completed"] is True and state["exported"] == 4
+
+    restarted = MailboxExport(tmp_path, "me@company.com", "inbox")
+    state = asyncio.run(restarted.run(restart=True))
+    assert filters[-1] is None
+    assert exported_ids(restarted) == ["m1", "m2", "m3", "m4"]
+    assert state["exported"] == 4
+
+
+def test_http_date_retry_after_falls_back_to_backoff(tmp_path, monkeypatch):
+    statuses = [429, 200]
+    waits: list[float] = []
+
+    async def fake_graph_request(method, path, params=None, headers=None, json=None, timeout=15.0):
+        status = statuses.pop(0)
+        body = {"value": []} if status == 200 else {}
+        return httpx.Response(
+            status,
+            json=body,
+            headers={"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"},
+            request=httpx.Request(method, "https://graph"),
+        )
+
+    async def fake_sleep(seconds: float) -> None:
+        waits.append(seconds)
+
+    monkeypatch.setattr(mail_export, "graph_request", fake_graph_request)
+    monkeypatch.setattr(mail_export.asyncio, "sleep", fake_sleep)
+
+    state = asyncio.run(MailboxExport(tmp_path, "me@company.com", "inbox").run())
+
+    assert state["completed"] is True
+    assert waits == [1]  # 첫 재시도의 백오프(2 ** 0)
+
+
+def test_manager_restores_job_from_checkpoint(tmp_path, monkeypatch):
+    async def fake_graph_request(method, path, params=None, headers=None, json=None, timeout=15.0):
+        return httpx.Response(200, json=_page(["m1"], None), request=httpx.Request(method, "https://graph"))
+
+    monkeypatch.setattr(mail_export, "graph_request", fake_graph_request)
+    job = MailboxExport(tmp_path, "me@company.com", "inbox")
+    asyncio.run(job.run())
+
+    # 프로세스가 다시 뜬 뒤처럼 빈 관리자에서 조회해도 체크포인트로 상태를 복원한다.
+    manager = mail_export.ExportManager(str(tmp_path))
+    restored = asyncio.run(manager.get(job.job_id))
+    assert restored.status()["exported"] == 1 and restored.status()["completed"] is True
+    assert asyncio.run(manager.get("missing")) is None
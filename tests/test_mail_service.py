@@ -0,0 +1,79 @@
+import asyncio
+
+import mail_service
+from mail_service import fan_out_search, merge_by_received
+
+
+def _mail(mailbox: str, received: str) -> dict:
+    return {"id": f"{mailbox}-{received}", "mailbox": mailbox, "receivedDateTime": received}
+
+
+def test_merge_by_received_is_newest_first_and_limited():
+    merged = merge_by_received(
+        [
+            [_mail("a", "2026-02-20T10:00:00Z"), _mail("a", "2026-02-18T10:00:00Z")],
+            [_mail("b", "2026-02-19T10:00:00Z")],
+            [],
+        ],
+        limit=2,
+    )
+    assert [m["id"] for m in merged] == ["a-2026-02-20T10:00:00Z", "b-2026-02-19T10:00:00Z"]
+
+
+def test_fan_out_search_returns_partial_results(monkeypatch):
+    async def fake_search(mailbox: str, keyword: str, limit: int):
+        if mailbox == "slow@company.com":
+            await asyncio.sleep(1)
+        if mailbox == "broken@company.com":
+            raise RuntimeError("boom")
+        return [_mail(mailbox, "2026-02-20T10:00:00Z")]
+
+    monkeypatch.setattr(mail_service, "search_mailbox", fake_search)
+
+    emails, failures = asyncio.run(
+        fan_out_search(
+            ["ok@company.com", "slow@company.com", "broken@company.com"],
+            "장애",
+            limit_per_mailbox=5,
+            total_limit=10,
+            max_concurrency=2,
+            timeout_seconds=0.05,
+        )
+    )
+    assert [e["mailbox"] for e in emails] == ["ok@company.com"]
+    assert failures == {"slow@company.com": "timeout(0.05s)", "broken@company.com": "boom"}
+
+
+def test_fetch_conversation_follows_next_link_and_reports_truncation(monkeypatch):
+    import httpx
+
+    pages = {
+        "/users/me@company.com/messages": {
+            "value": [{"id": "m5", "receivedDateTime": "5"}, {"id": "m4", "receivedDateTime": "4"}],
+            "@odata.nextLink": "https://graph/page-2",
+        },
+        "https://graph/page-2": {
+            "value": [{"id": "m3", "receivedDateTime": "3"}, {"id": "m2", "receivedDateTime": "2"}],
+            "@odata.nextLink": "https://graph/page-3",
+        },
+    }
+    requested: list[tuple[str, dict | None]] = []
+
+    async def fake_graph_request(method, path, params=None, headers=None, **kwargs):
+        requested.append((path, params))
+        return httpx.Response(200, json=pages[path], request=httpx.Request(method, "https://graph"))
+
+    monkeypatch.setattr(mail_service, "graph_request", fake_graph_request)
+
+    messages, truncated = asyncio.run(mail_service.fetch_conversation("me@company.com", "c'1", limit=3))
+
+    assert [m["id"] for m in messages] == ["m3", "m4", "m5"]
+    assert truncated is True
+    assert [path for path, _ in requested] == ["/users/me@company.com/messages", "https://graph/page-2"]
+    first_params = requested[0][1]
+    assert first_params["$orderby"] == "receivedDateTime desc"
+    assert first_params["$filter"].startswith("receivedDateTime ge ") and "conversationId eq 'c''1'" in first_params["$filter"]
+
+    pages["https://graph/page-2"].pop("@odata.nextLink")
+    messages, truncated = asyncio.run(mail_service.fetch_conversation("me@company.com", "c1", limit=10))
+    assert [m["id"] for m in messages] == ["m2", "m3", "m4", "m5"] and truncated is False
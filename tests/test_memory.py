@@ -0,0 +1,68 @@
+from memory import MemoryBudget, memory_report, set_tracing
+from shared_store import MemoryStore
+
+
+def test_budget_evicts_only_cache_entries_oldest_first():
+    store = MemoryStore()
+    budget = MemoryBudget(limit_bytes=13_000)
+    budget.register("shared_store", store)
+
+    store.set("msal:token_cache", b"t" * 3000)
+    store.set("idem:abc", b"r" * 3000)
+    for i in range(5):
+        store.set(f"mail:detail:a@b.c:{i}", b"m" * 1000)
+    assert budget.enforce() == 0
+
+    store.set("mail:detail:a@b.c:5", b"m" * 2000)
+    freed = budget.enforce()
+
+    assert freed > 0
+    assert store.memory_bytes() <= 13_000 * 0.9
+    assert store.get("msal:token_cache") is not None
+    assert store.get("idem:abc") is not None
+    assert store.get("mail:detail:a@b.c:0") is None
+    assert store.get("mail:detail:a@b.c:5") is not None
+
+
+def test_memory_report_includes_caches_and_tracemalloc():
+    store = MemoryStore()
+    budget = MemoryBudget(limit_bytes=0)
+    budget.register("shared_store", store)
+    store.set("todo:lists:a@b.c", b"x" * 100)
+
+    set_tracing(True)
+    try:
+        blob = [bytearray(1024) for _ in range(100)]
+        report = memory_report(budget, top=5)
+    finally:
+        set_tracing(False)
+
+    assert report["caches"]["shared_store"] == store.memory_bytes() > 100
+    assert len(report["object_counts"]) == 5
+    assert report["tracemalloc"]["current_bytes"] >= 100 * 1024
+    assert blob
+
+
+def test_memory_report_tool_requires_admin_token(monkeypatch):
+    import asyncio
+    import tracemalloc
+
+    from fastmcp import Client
+
+    import main
+    from config import settings
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+
+    async def call(token: str) -> str:
+        async with Client(main.mcp) as client:
+            result = await client.call_tool("get_memory_report", {"admin_token": token, "trace": True, "top": 1})
+            return result.content[0].text
+
+    try:
+        assert "운영자 토큰" in asyncio.run(call("wrong"))
+        assert not tracemalloc.is_tracing()
+        assert "RSS" in asyncio.run(call("s3cret"))
+        assert tracemalloc.is_tracing()
+    finally:
+        set_tracing(False)
@@ -0,0 +1,75 @@
+import asyncio
+
+import prefetch
+from metrics import metrics
+from prefetch import MessagePrefetcher
+
+
+def test_prefetch_warms_top_n_and_counts_hits(monkeypatch):
+    loaded: list[str] = []
+
+    async def fake_load(my_email: str, message_id: str):
+        loaded.append(message_id)
+        return {"id": message_id, "body": "x" * 10, "clean_body": "x"}
+
+    monkeypatch.setattr(prefetch, "load_message_detail", fake_load)
+    async def fake_cached(my_email: str, message_id: str) -> bool:
+        return message_id == "cached"
+
+    monkeypatch.setattr(prefetch, "is_message_detail_cached", fake_cached)
+
+    prefetcher = MessagePrefetcher(top_n=3, max_concurrency=4, bytes_per_second=1_000_000)
+
+    async def scenario():
+        prefetcher.schedule("me@company.com", ["m1", "cached", "m2", "m3"], "session-1")
+        await asyncio.sleep(0.01)
+        prefetcher.record_access("me@company.com", "m1")
+        prefetcher.record_access("me@company.com", "other")
+
+    asyncio.run(scenario())
+
+    assert loaded == ["m1", "m2"]  # 상위 3개 중 이미 캐시된 메일은 건너뛴다.
+    assert metrics.gauge("prefetch_hit_ratio").value == 0.5
+
+
+def test_prefetch_is_cancelled_when_session_ends(monkeypatch):
+    async def slow_load(my_email: str, message_id: str):
+        await asyncio.sleep(10)
+
+    async def not_cached(my_email: str, message_id: str) -> bool:
+        return False
+
+    monkeypatch.setattr(prefetch, "load_message_detail", slow_load)
+    monkeypatch.setattr(prefetch, "is_message_detail_cached", not_cached)
+
+    prefetcher = MessagePrefetcher(top_n=2, max_concurrency=2, bytes_per_second=1_000_000)
+
+    async def scenario():
+        prefetcher.schedule("me@company.com", ["m1", "m2"], "session-1")
+        await asyncio.sleep(0.01)
+        cancelled = prefetcher.cancel_session("session-1")
+        await asyncio.sleep(0.01)
+        return cancelled
+
+    assert asyncio.run(scenario()) == 2
+    assert prefetcher.cancel_session("session-1") == 0
+
+
+def test_prefetch_is_skipped_without_session(monkeypatch):
+    loaded: list[str] = []
+
+    async def fake_load(my_email: str, message_id: str):
+        loaded.append(message_id)
+
+    monkeypatch.setattr(prefetch, "load_message_detail", fake_load)
+
+    prefetcher = MessagePrefetcher(top_n=2, max_concurrency=2, bytes_per_second=1_000_000)
+
+    async def scenario():
+        prefetcher.schedule("me@company.com", ["m1", "m2"], None)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+    assert loaded == []
+    assert prefetcher._tasks == {}
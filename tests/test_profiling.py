@@ -0,0 +1,70 @@
+import asyncio
+
+from http_middleware import ProfilingMiddleware
+from logger_config import clear_request_id, set_request_id
+from profiling import RequestProfiler
+
+
+def _run(middleware, headers: list[tuple[bytes, bytes]]) -> dict:
+    scope = {"type": "http", "method": "POST", "path": "/mcp", "headers": headers}
+    sent: list[dict] = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return dict(sent[0]["headers"])
+
+
+async def _app(scope, receive, send):
+    sum(i * i for i in range(1000))
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def test_profiles_request_with_valid_token_only(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), token="s3cret")
+    middleware = ProfilingMiddleware(_app, profiler=profiler)
+
+    assert b"x-profile-file" not in _run(middleware, [(b"x-profile-token", b"wrong")])
+    # Starlette는 헤더를 latin-1로 풀므로 비ASCII 값도 500 없이 거부되어야 한다.
+    assert b"x-profile-file" not in _run(middleware, [(b"x-profile-token", "토큰é".encode("utf-8"))])
+    assert list(tmp_path.iterdir()) == []
+
+    set_request_id("req/../1")
+    try:
+        headers = _run(middleware, [(b"x-profile-token", b"s3cret")])
+    finally:
+        clear_request_id()
+
+    name = headers[b"x-profile-file"].decode()
+    assert name.endswith("-req_.._1.prof")
+    assert (tmp_path / name).stat().st_size > 0
+    assert "cumulative" in (tmp_path / name.replace(".prof", ".txt")).read_text(encoding="utf-8")
+
+
+def test_armed_count_is_consumed(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), token="")
+    middleware = ProfilingMiddleware(_app, profiler=profiler)
+    profiler.arm(1)
+
+    assert b"x-profile-file" in _run(middleware, [])
+    assert b"x-profile-file" not in _run(middleware, [(b"x-profile-token", b"")])
+    assert len(list(tmp_path.glob("*.prof"))) == 1
+
+
+def test_admin_token_is_required(monkeypatch):
+    from auth import is_admin_token
+    from config import settings
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    assert not is_admin_token("")
+    assert not is_admin_token("anything")
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    assert not is_admin_token(None)
+    assert not is_admin_token("s3cre")
+    assert is_admin_token("s3cret")
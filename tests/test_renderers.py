@@ -0,0 +1,30 @@
+import json
+
+from renderers import render_list, render_notice
+
+
+RECORDS = [
+    {"id": "1", "subject": "주간 보고", "sender": "boss@company.com", "preview": None},
+    {"id": "2", "subject": "장애 공유", "sender": "ops@company.com", "preview": "DB 지연"},
+]
+TEXT_FIELDS = [("제목", "subject"), ("message_id", "id")]
+
+
+def test_render_list_text_keeps_numbered_layout():
+    text = render_list(
+        RECORDS, output_format="text", fields=None, header="총 2건", empty_message="없음", text_fields=TEXT_FIELDS
+    )
+    assert text.splitlines()[:4] == ["총 2건", "", "1. 제목: 주간 보고", "   message_id: 1"]
+    assert text.count("-" * 30) == 2
+
+
+def test_render_list_json_projects_fields_and_drops_none():
+    raw = render_list(
+        RECORDS, output_format="json", fields="id,preview", header="", empty_message="", text_fields=TEXT_FIELDS
+    )
+    assert ", " not in raw and ": " not in raw
+    assert json.loads(raw) == {"count": 2, "items": [{"id": "1"}, {"id": "2", "preview": "DB 지연"}]}
+
+
+def test_render_notice_json():
+    assert json.loads(render_notice("없음", output_format="json")) == {"status": "not_found", "message": "없음"}
@@ -0,0 +1,58 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from scheduling import find_common_slots, merge_intervals, subtract_intervals
+
+SEOUL = ZoneInfo("Asia/Seoul")
+
+
+def _dt(hour: int, minute: int = 0, day: int = 16) -> datetime:
+    # 2026-02-16은 월요일
+    return datetime(2026, 2, day, hour, minute, tzinfo=SEOUL)
+
+
+def test_merge_and_subtract_intervals():
+    busy = merge_intervals([(_dt(11), _dt(12)), (_dt(9), _dt(10)), (_dt(9, 30), _dt(10, 30)), (_dt(12), _dt(13))])
+    assert busy == [(_dt(9), _dt(10, 30)), (_dt(11), _dt(13))]
+
+    free = subtract_intervals([(_dt(9), _dt(18))], busy)
+    assert free == [(_dt(10, 30), _dt(11)), (_dt(13), _dt(18))]
+
+
+def test_find_common_slots_respects_busy_and_attendee_working_hours():
+    schedules = [
+        {
+            "scheduleId": "me@company.com",
+            "scheduleItems": [
+                {"status": "busy", "start": {"dateTime": "2026-02-16T09:00:00.0000000"}, "end": {"dateTime": "2026-02-16T12:00:00.0000000"}},
+                {"status": "free", "start": {"dateTime": "2026-02-16T13:00:00.0000000"}, "end": {"dateTime": "2026-02-16T14:00:00.0000000"}},
+            ],
+        },
+        {
+            # UTC 타임존 근무자: 00:00~05:00 UTC = 서울 09:00~14:00
+            "scheduleId": "utc@company.com",
+            "scheduleItems": [],
+            "workingHours": {
+                "daysOfWeek": ["monday", "tuesday", "wednesday", "thursday", "friday"],
+                "startTime": "00:00:00.0000000",
+                "endTime": "05:00:00.0000000",
+                "timeZone": {"name": "UTC"},
+            },
+        },
+        {"scheduleId": "external@other.com", "error": {"message": "권한 없음"}},
+    ]
+
+    slots, unavailable = find_common_slots(
+        schedules,
+        _dt(0),
+        _dt(0, day=17),
+        SEOUL,
+        timedelta(minutes=60),
+        time(9),
+        time(18),
+    )
+
+    # 09~12시는 busy -> 12:00~14:00 중 1시간 슬롯. 앞 일정과 붙은 12:00 슬롯은 뒤로 밀린다.
+    assert [(s["start"].hour, s["start"].minute) for s in slots] == [(12, 30), (13, 0), (12, 0)]
+    assert slots[2]["buffer"] is False
+    assert unavailable == {"external@other.com": "권한 없음"}
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from shared_store import MemoryStore, SharedStore, build_store
+
+
+def test_memory_store_ttl_and_add():
+    store = MemoryStore()
+    store.set("k", b"v", ttl_seconds=0.05)
+    assert store.get("k") == b"v"
+    assert store.add("k", b"other") is False
+
+    time.sleep(0.06)
+    assert store.get("k") is None
+    assert store.add("k", b"other") is True
+    assert store.get("k") == b"other"
+
+
+def test_memory_store_json_incr_and_lock():
+    store = build_store("", "test:")
+    store.set_json("cache", {"subject": "주간 보고"})
+    assert store.get_json("cache") == {"subject": "주간 보고"}
+    assert store.incr("hits") == 1
+    assert store.incr("hits", 2) == 3
+
+    with store.lock("refresh", wait_seconds=0) as first:
+        assert first is True
+        with store.lock("refresh", wait_seconds=0) as second:
+            assert second is False
+    with store.lock("refresh", wait_seconds=0) as again:
+        assert again is True
+
+
+class _ThreadRecordingStore(MemoryStore):
+    """원격 저장소처럼 기본 _offload(스레드 실행)를 쓰는 MemoryStore."""
+
+    _offload = SharedStore._offload
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.threads: set[int] = set()
+
+    def get(self, key: str) -> bytes | None:
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+
+def test_async_api_runs_blocking_calls_off_the_loop():
+    store = _ThreadRecordingStore()
+
+    async def scenario():
+        await store.async_set_json("cache", {"n": 1})
+        async with store.async_lock("refresh", wait_seconds=0) as first:
+            async with store.async_lock("refresh", wait_seconds=0) as second:
+                pass
+        return await store.async_get_json("cache"), first, second, threading.get_ident()
+
+    value, first, second, loop_thread = asyncio.run(scenario())
+    assert value == {"n": 1}
+    assert (first, second) == (True, False)
+    assert store.threads and loop_thread not in store.threads
+    assert store.get("lock:refresh") is None
+
+
+def test_shared_store_is_abstract():
+    with pytest.raises(TypeError):
+        SharedStore()
@@ -0,0 +1,72 @@
+import asyncio
+
+from shared_store import MemoryStore, get_shared_store, set_shared_store
+from subscriptions import WEBHOOK_PATH, LocalNotificationPublisher, desired_resources, subscription_manager
+
+
+def test_desired_resources_per_kind():
+    resources = desired_resources("me@company.com", {"mail", "todo"}, ["L1", "L2"])
+    assert resources == {
+        "/users/me@company.com/messages": "mail",
+        "/users/me@company.com/todo/lists/L1/tasks": "todo",
+        "/users/me@company.com/todo/lists/L2/tasks": "todo",
+    }
+
+
+def test_webhook_validates_and_invalidates_only_verified_notifications():
+    import main
+
+    set_shared_store(MemoryStore())
+    store = get_shared_store()
+    store.set_json("mail:detail:me@company.com:m1", {"id": "m1"})
+    store.set_json("mail:detail:me@company.com:m2", {"id": "m2"})
+
+    async def scenario():
+        await subscription_manager.register_local("sub-mail", "mail", "me@company.com")
+        publisher = LocalNotificationPublisher(main.create_http_app(), await subscription_manager.get_client_state())
+        try:
+            validation = await publisher.validate("abc123")
+            forged = await publisher.publish("sub-mail", "updated", "m2", client_state="wrong")
+            accepted = await publisher.publish("sub-mail", "updated", "m1")
+        finally:
+            await publisher.aclose()
+        return validation, forged, accepted
+
+    validation, forged, accepted = asyncio.run(scenario())
+
+    assert (validation.status_code, validation.text) == (200, "abc123")
+    assert validation.headers["content-type"].startswith("text/plain")
+    assert (forged.status_code, accepted.status_code) == (202, 202)
+    assert store.get("mail:detail:me@company.com:m1") is None
+    assert store.get("mail:detail:me@company.com:m2") is not None
+
+
+def test_webhook_rejects_malformed_input_without_500():
+    import httpx
+
+    import main
+
+    set_shared_store(MemoryStore())
+    store = get_shared_store()
+    store.set_json("mail:detail:me@company.com:m1", {"id": "m1"})
+
+    async def scenario():
+        await subscription_manager.register_local("sub-mail", "mail", "me@company.com")
+        app = main.create_http_app()
+        publisher = LocalNotificationPublisher(app, await subscription_manager.get_client_state())
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://local")
+        try:
+            non_ascii = await publisher.publish("sub-mail", "updated", "m1", client_state="é")
+            not_object = await client.post(WEBHOOK_PATH, json=[1])
+            bad_items = await client.post(WEBHOOK_PATH, json={"value": [1, "x", None]})
+        finally:
+            await publisher.aclose()
+            await client.aclose()
+        return non_ascii, not_object, bad_items
+
+    non_ascii, not_object, bad_items = asyncio.run(scenario())
+
+    assert non_ascii.status_code == 202
+    assert not_object.status_code == 400
+    assert bad_items.status_code == 202
+    assert store.get("mail:detail:me@company.com:m1") is not None
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+
+import todo_service
+from shared_store import MemoryStore, set_shared_store
+from todo_service import create_tasks_batch, resolve_task_list_id
+
+
+def _response(method: str, body: dict) -> httpx.Response:
+    return httpx.Response(200, json=body, request=httpx.Request(method, "https://graph"))
+
+
+def test_resolve_task_list_id_uses_cache_and_refreshes_once(monkeypatch):
+    set_shared_store(MemoryStore())
+    calls: list[str] = []
+    lists = [{"id": "L1", "displayName": "업무", "wellknownListName": "defaultList"}]
+
+    async def fake_graph_request(method, path, *, params=None, headers=None, json=None, timeout=None):
+        calls.append(path)
+        return _response(method, {"value": list(lists)})
+
+    monkeypatch.setattr(todo_service, "graph_request", fake_graph_request)
+
+    async def scenario():
+        by_name = await resolve_task_list_id("me@company.com", "업무")
+        by_alias = await resolve_task_list_id("me@company.com", "default")
+        # 캐시에 없는 이름은 한 번 새로 읽어 확인한다.
+        lists.append({"id": "L2", "displayName": "Shopping"})
+        new_list = await resolve_task_list_id("me@company.com", "shopping")
+        missing = await resolve_task_list_id("me@company.com", "없는 목록")
+        return by_name, by_alias, new_list, missing
+
+    assert asyncio.run(scenario()) == ("L1", "L1", "L2", None)
+    assert len(calls) == 3  # 최초 1회 + shopping 재조회 1회 + 없는 목록 재조회 1회
+
+
+def test_create_tasks_batch_chunks_and_retries_throttled(monkeypatch):
+    batches: list[list[str]] = []
+
+    async def fake_graph_request(method, path, *, params=None, headers=None, json=None, timeout=None):
+        ids = [r["id"] for r in json["requests"]]
+        batches.append(ids)
+        responses = []
+        for r in json["requests"]:
+            if r["id"] == "3" and len(batches) <= 2:
+                responses.append({"id": r["id"], "status": 429, "headers": {"Retry-After": "0"}, "body": {}})
+            elif r["id"] == "21":
+                responses.append({"id": r["id"], "status": 400, "body": {"error": {"message": "bad title"}}})
+            else:
+                responses.append({"id": r["id"], "status": 201, "body": {"id": f"T{r['id']}", "title": r["body"]["title"]}})
+        return _response(method, {"responses": responses})
+
+    monkeypatch.setattr(todo_service, "graph_request", fake_graph_request)
+
+    results = asyncio.run(create_tasks_batch("me@company.com", "L1", [{"title": f"t{i}"} for i in range(25)]))
+
+    assert [len(b) for b in batches] == [20, 5, 1]  # 20개 단위 분할 + 스로틀된 1건 재시도
+    assert results[3]["task"]["id"] == "T3"
+    assert results[21] == {"index": 21, "status": 400, "error": "bad title"}
+    assert sum("task" in r for r in results) == 24
@@ -0,0 +1,22 @@
+from token_cache import FileTokenCache
+
+
+def test_file_token_cache_round_trip_is_encrypted_and_atomic(tmp_path):
+    cache = FileTokenCache(tmp_path / "msal.bin", "secret-1")
+    blob = '{"AccessToken": {"k": {"secret": "eyJ0eXAi"}}}'
+
+    cache.save(blob)
+
+    assert b"eyJ0eXAi" not in (tmp_path / "msal.bin").read_bytes()
+    assert FileTokenCache(tmp_path / "msal.bin", "secret-1").load() == blob
+    # 임시 파일은 교체 후 남지 않는다(락 파일만 남음).
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["msal.bin", "msal.bin.lock"]
+
+
+def test_file_token_cache_misses_on_missing_file_or_wrong_key(tmp_path):
+    cache = FileTokenCache(tmp_path / "msal.bin", "secret-1")
+    assert cache.load() is None
+
+    cache.save("{}")
+
+    assert FileTokenCache(tmp_path / "msal.bin", "rotated-secret").load() is None